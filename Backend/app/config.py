@@ -3,4 +3,117 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
\ No newline at end of file
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+# Ingestion
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+# Scraping
+SCRAPER_MAX_CONCURRENCY = int(os.getenv("SCRAPER_MAX_CONCURRENCY", "10"))
+SCRAPER_HOST_DELAY = float(os.getenv("SCRAPER_HOST_DELAY", "1.0"))
+SCRAPER_MAX_RETRIES = int(os.getenv("SCRAPER_MAX_RETRIES", "2"))
+SCRAPER_TIMEOUT = float(os.getenv("SCRAPER_TIMEOUT", "15"))
+# Analyse HTML : lxml (rapide) ou html.parser (BeautifulSoup, Python pur)
+HTML_PARSER = os.getenv("HTML_PARSER", "lxml")
+
+# Jobs d'ingestion
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "16"))
+INGEST_MAX_JOBS_KEPT = int(os.getenv("INGEST_MAX_JOBS_KEPT", "100"))
+
+# Exécution
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+
+# Micro-batching des questions
+QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "5"))
+QUERY_BATCH_MAX = int(os.getenv("QUERY_BATCH_MAX", "32"))
+
+# Index vectoriel : flat, ivf_flat, ivf_pq ou hnsw
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "flat")
+# Taille de corpus à partir de laquelle on quitte l'index exact
+VECTOR_INDEX_MIN_TRAIN = int(os.getenv("VECTOR_INDEX_MIN_TRAIN", "20000"))
+# Réentraîner l'IVF quand le corpus a grossi de ce facteur
+VECTOR_INDEX_REBUILD_FACTOR = float(os.getenv("VECTOR_INDEX_REBUILD_FACTOR", "4"))
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # 0 = automatique
+PQ_M = int(os.getenv("PQ_M", "48"))
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+SEARCH_NPROBE = int(os.getenv("SEARCH_NPROBE", "16"))
+SEARCH_EF = int(os.getenv("SEARCH_EF", "64"))
+
+# Nombre de vecteurs journalisés avant un snapshot complet de l'index
+WAL_SNAPSHOT_ROWS = int(os.getenv("WAL_SNAPSHOT_ROWS", "50000"))
+
+# Modèle d'embedding
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+# Cache d'embeddings : LRU en mémoire puis SQLite sur disque (chemin vide = désactivé)
+EMBED_CACHE_MAX_MB = float(os.getenv("EMBED_CACHE_MAX_MB", "64"))
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "data/embeddings_cache.sqlite")
+
+# Cache des réponses du LLM
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+
+# Conversations (session_id de /api/ask) : inactivité avant expiration (secondes),
+# mémoire totale, tours gardés par session et caractères gardés par réponse
+CONVERSATION_TTL = float(os.getenv("CONVERSATION_TTL", "1800"))
+CONVERSATION_MAX_MB = float(os.getenv("CONVERSATION_MAX_MB", "16"))
+CONVERSATION_MAX_TURNS = int(os.getenv("CONVERSATION_MAX_TURNS", "10"))
+CONVERSATION_ANSWER_CHARS = int(os.getenv("CONVERSATION_ANSWER_CHARS", "1000"))
+CONVERSATION_SWEEP_INTERVAL = float(os.getenv("CONVERSATION_SWEEP_INTERVAL", "60"))
+# Score minimal (1 / (1 + distance)) d'un chunk du tour précédent pour le réutiliser sans nouvelle recherche
+CONVERSATION_REUSE_MIN_SCORE = float(os.getenv("CONVERSATION_REUSE_MIN_SCORE", "0.5"))
+
+# Recherche : "dense" (vecteurs seuls) ou "hybrid" (BM25 + vecteurs, fusion RRF).
+# "hybrid" construit au préchargement un index BM25 en mémoire sur tous les chunks
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense")
+# Candidats pris dans chaque classement avant la fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Recherche filtrée (URL, domaine) : jusqu'à ce nombre de chunks, distances exactes
+# sur les seuls chunks autorisés plutôt qu'un parcours filtré de l'index
+FILTER_EXACT_MAX = int(os.getenv("FILTER_EXACT_MAX", "10000"))
+# Au-delà, nprobe / efSearch multipliés par l'inverse de la part de chunks autorisés
+# (plafonné) : autant de candidats qu'une recherche sans filtre dans les index approchés
+FILTER_SEARCH_BOOST_MAX = float(os.getenv("FILTER_SEARCH_BOOST_MAX", "16"))
+
+# /api/ask/batch : taille maximale d'un lot et appels au LLM en parallèle
+ASK_BATCH_MAX = int(os.getenv("ASK_BATCH_MAX", "256"))
+ASK_BATCH_CONCURRENCY = int(os.getenv("ASK_BATCH_CONCURRENCY", "8"))
+
+# Nombre de shards de la base vectorielle (1 = un seul index dans le processus,
+# N > 1 = N processus locaux, répartition par domaine ; Linux uniquement)
+VECTOR_SHARDS = int(os.getenv("VECTOR_SHARDS", "1"))
+
+# Déploiement multi-workers (python -m app.serve) : un worker écrivain, les autres lecteurs
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+# Socket Unix du worker écrivain (les lecteurs lui relaient l'ingestion)
+WRITER_SOCKET = os.getenv("WRITER_SOCKET", "data/writer.sock")
+# Délai maximal avant qu'un lecteur voie les nouvelles données (secondes)
+INDEX_RELOAD_INTERVAL = float(os.getenv("INDEX_RELOAD_INTERVAL", "2"))
+
+# Moteur d'embedding : torch (référence), int8 (PyTorch quantifié),
+# onnx ou onnx_int8 (ONNX Runtime, pip install onnxruntime)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# Threads de calcul par encodage (0 = défaut de la bibliothèque)
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0"))
+# Modèles exportés en ONNX
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "data/onnx")
+
+# Découpage : mots par chunk et mots repris d'un chunk au suivant
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "300"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "2"))
+# Tokens par chunk (0 = fenêtre du modèle, -1 = pas de limite) : au-delà, le modèle tronque
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "0"))
+
+# Profilage à la demande (en-tête X-Profile: 1 ou ?profile=1), désactivé par défaut
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true")
+# Intervalle d'échantillonnage des piles (ms) et dossier des profils
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
@@ -1,12 +1,50 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import ingest, ask, health, verify, stats
+from app.routers import ingest, ask, health, verify, stats, metrics, sources
+from app.services.scraper import fetcher
+from app.services.jobs import job_manager
+from app.services.vector_store import vector_store
+from app.services.sources import source_registry
+from app.services.workers import is_writer, index_reloader, writer_proxy
+from app.services.warmup import warmup
+from app.services.conversation import conversation_manager
+from app.services import executor
+from app.services.metrics import HTTP_SECONDS, IN_FLIGHT
+from app.services.profiler import profiling_requested, try_start, finish
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Index, modèle et premier encodage chargés en arrière-plan :
+    # le serveur accepte les connexions tout de suite (voir /api/health/ready)
+    warmup.start()
+    if is_writer():
+        # Démarrer le pool de workers d'ingestion (les jobs attendent le chargement de l'index)
+        job_manager.start()
+    else:
+        # Worker lecteur : suivre les versions publiées par l'écrivain
+        index_reloader.start(vector_store, ready=warmup.wait(), registry=source_registry)
+    # Suppression périodique des conversations expirées
+    conversation_manager.start()
+    
+    yield
+    
+    await warmup.stop()
+    await conversation_manager.stop()
+    await job_manager.stop()
+    await index_reloader.stop()
+    await writer_proxy.aclose()
+    # Fermer le pool de connexions HTTP
+    await fetcher.aclose()
+    executor.shutdown()
 
 # Créer l'instance app
 app = FastAPI(
     title="Nextraction 2 - Backend",
     description="API pour le RAG avec scraping web",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS
@@ -18,12 +56,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def observe(request: Request, call_next):
+    # Durée par route (gabarit, pas le chemin : /api/ingest/{job_id}) ;
+    # pour une réponse en flux, jusqu'à l'envoi des en-têtes
+    profiler = try_start() if profiling_requested(request.headers, request.query_params) else None
+    start = time.perf_counter()
+    status = 500
+    try:
+        with IN_FLIGHT.track(operation="http"):
+            response = await call_next(request)
+        status = response.status_code
+    finally:
+        route = request.scope.get("route")
+        HTTP_SECONDS.observe(time.perf_counter() - start, method=request.method,
+                             route=getattr(route, "path", "other"), status=status)
+        if profiler is not None:
+            path = finish(profiler, f"{request.method}-{request.url.path}")
+    if profiler is not None:
+        response.headers["X-Profile"] = path
+    return response
+
 # Routers
 app.include_router(ingest.router)
 app.include_router(ask.router)
 app.include_router(health.router)
 app.include_router(verify.router)
 app.include_router(stats.router)
+app.include_router(metrics.router)
+app.include_router(sources.router)
 
 @app.get("/")
 async def root():
@@ -31,9 +92,19 @@ async def root():
         "message": "Nextraction 2 Backend API",
         "endpoints": {
             "ingest": "POST /api/ingest",
+            "ingest-status": "GET /api/ingest/{job_id}",
+            "ingest-cancel": "DELETE /api/ingest/{job_id}",
             "ask": "POST /api/ask",
+            "ask-stream": "POST /api/ask/stream",
+            "ask-batch": "POST /api/ask/batch",
+            "conversation": "GET /api/conversations/{session_id}",
+            "sources": "GET /api/sources",
+            "source-delete": "DELETE /api/sources?url=...",
             "health": "GET /api/health",
+            "liveness": "GET /api/health/live",
+            "readiness": "GET /api/health/ready",
             "verify-urls": "POST /api/verify-urls",
-            "stats": "GET /api/stats"
+            "stats": "GET /api/stats",
+            "metrics": "GET /api/metrics"
         }
     }
\ No newline at end of file
@@ -1,17 +1,77 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from app.services.qa import answer_question
+from typing import Dict, List, Optional
+import json
+from app.services.qa import answer_question, answer_many, stream_answer
+from app.services.conversation import conversation_manager
+from app.config import ASK_BATCH_MAX
 
 router = APIRouter(prefix="/api")
 
+class SearchFilter(BaseModel):
+    # Recherche limitée à des URLs et/ou des domaines (sous-domaines compris) ;
+    # since / until (timestamps Unix) : chunks ajoutés pendant cette période
+    urls: Optional[List[str]] = None
+    domains: Optional[List[str]] = None
+    since: Optional[float] = None
+    until: Optional[float] = None
+
 class QuestionRequest(BaseModel):
     question: str
+    # Identifiant de conversation choisi par le client : les questions de suite
+    # réutilisent les chunks du tour précédent s'ils restent pertinents
+    session_id: Optional[str] = None
+    filter: Optional[SearchFilter] = None
+
+class BatchQuestionRequest(BaseModel):
+    questions: List[str]
+    filter: Optional[SearchFilter] = None
+
+def _filter(search_filter: Optional[SearchFilter]) -> Optional[Dict]:
+    return search_filter.model_dump(exclude_none=True) if search_filter else None
 
 @router.post("/ask")
 async def ask(request: QuestionRequest):
-    answer = answer_question(request.question)
-    return {
+    result = await answer_question(request.question, request.session_id, _filter(request.filter))
+    response = {
         "question": request.question,
-        "answer": answer,
+        "answer": result["answer"],
         "status": "success"
-    }
\ No newline at end of file
+    }
+    if request.session_id:
+        response.update({"session_id": request.session_id, "context_reused": result["context_reused"]})
+    return response
+
+@router.post("/ask/stream")
+async def ask_stream(request: QuestionRequest):
+    # Server-sent events : sources, puis tokens, puis done
+    async def events():
+        async for event in stream_answer(request.question, request.session_id, _filter(request.filter)):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/ask/batch")
+async def ask_batch(request: BatchQuestionRequest):
+    if len(request.questions) > ASK_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"Maximum {ASK_BATCH_MAX} questions par lot")
+
+    # Embeddings et recherche en un seul passage, appels au LLM en parallèle
+    results = await answer_many(request.questions, filter=_filter(request.filter))
+    return {
+        "total": len(results),
+        "results": results,
+        "status": "success"
+    }
+
+@router.get("/conversations/{session_id}")
+async def get_conversation(session_id: str):
+    history = conversation_manager.history(session_id)
+    if not history:
+        raise HTTPException(status_code=404, detail="Conversation inconnue ou expirée")
+    return {"session_id": session_id, "turns": history}
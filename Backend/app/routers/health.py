@@ -1,5 +1,8 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from app.services.vector_store import vector_store
+from app.services.workers import is_writer
+from app.services.warmup import warmup
 
 router = APIRouter(prefix="/api")
 
@@ -8,5 +11,17 @@ async def health():
     return {
         "status": "healthy",
         "service": "Nextraction 2 Backend",
-        "vector_store": vector_store.index.ntotal
-    }
\ No newline at end of file
+        "vector_store": vector_store.count,
+        "worker": "writer" if is_writer() else "reader",
+        "ready": warmup.ready
+    }
+
+@router.get("/health/live")
+async def liveness():
+    # Le processus répond : ne dépend d'aucun chargement
+    return {"status": "alive"}
+
+@router.get("/health/ready")
+async def readiness():
+    # Index, modèle et premier encodage chargés : le trafic peut être routé ici
+    return JSONResponse(status_code=200 if warmup.ready else 503, content=warmup.to_dict())
@@ -0,0 +1,45 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services.metrics import registry, Counter, Gauge
+from app.services.vector_store import vector_store
+from app.services.embeddings import embedding_cache
+from app.services.answer_cache import answer_cache
+from app.services.conversation import conversation_manager
+
+router = APIRouter(prefix="/api")
+
+def _cache_requests():
+    embeddings = embedding_cache.stats()
+    answers = answer_cache.stats()
+    return {
+        ("embedding", "hit_memory"): embeddings["hits_memory"],
+        ("embedding", "hit_disk"): embeddings["hits_disk"],
+        ("embedding", "miss"): embeddings["misses"],
+        ("answer", "hit"): answers["hits"],
+        ("answer", "miss"): answers["misses"]
+    }
+
+def _index():
+    info = vector_store.info()
+    return {
+        ("vectors",): info["count"],
+        ("deleted",): info["deleted"],
+        ("index_bytes",): info["index_bytes"]
+    }
+
+# Valeurs déjà tenues par les services, lues au moment de l'export
+registry.register(Counter(
+    "rag_cache_requests_total", "Consultations des caches", ["cache", "result"], func=_cache_requests))
+registry.register(Gauge(
+    "rag_index", "Taille de la base vectorielle", ["quantity"], func=_index))
+registry.register(Gauge(
+    "rag_embedding_cache_bytes", "Mémoire du cache d'embeddings",
+    func=lambda: {(): embedding_cache.stats()["memory_bytes"]}))
+registry.register(Gauge(
+    "rag_conversations", "Conversations en mémoire",
+    func=lambda: {(): conversation_manager.stats()["sessions"]}))
+
+@router.get("/metrics")
+async def metrics():
+    # Format texte Prometheus (propre à ce processus)
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
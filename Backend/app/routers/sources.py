@@ -0,0 +1,40 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
+from typing import Optional
+from app.services.vector_store import vector_store
+from app.services.sources import source_registry
+from app.services.warmup import warmup
+from app.services.workers import is_writer, writer_proxy
+
+router = APIRouter(prefix="/api")
+
+@router.get("/sources")
+async def list_sources(domain: Optional[str] = None):
+    # Compté sur l'index des métadonnées : pas de lecture des chunks
+    sources = await asyncio.to_thread(vector_store.url_stats, domain)
+    for source in sources:
+        state = source_registry.get(source["url"])
+        source["ingested_at"] = state.get("ingested_at")
+        source["checked_at"] = state.get("checked_at")
+    sources.sort(key=lambda source: source["url"])
+    return {
+        "total": len(sources),
+        "chunks": sum(source["chunks"] for source in sources),
+        "sources": sources
+    }
+
+@router.delete("/sources")
+async def delete_source(url: str, raw: Request):
+    # Les suppressions sont faites par le worker écrivain
+    if not is_writer():
+        return await writer_proxy.forward(raw)
+    # L'index doit être chargé avant toute écriture
+    await warmup.wait()
+    known = bool(source_registry.get(url))
+    deleted = await asyncio.to_thread(vector_store.delete_url, url)
+    if not deleted and not known:
+        raise HTTPException(status_code=404, detail="Source inconnue")
+    source_registry.remove(url)
+    await asyncio.to_thread(vector_store.save)
+    await asyncio.to_thread(source_registry.save)
+    return {"url": url, "chunks_deleted": deleted, "status": "success"}
@@ -1,13 +1,23 @@
 from fastapi import APIRouter
 from app.services.vector_store import vector_store
+from app.services.embeddings import embedding_cache
+from app.services.answer_cache import answer_cache
+from app.services.conversation import conversation_manager
 
 router = APIRouter(prefix="/api")
 
 @router.get("/stats")
 async def get_stats():
+    info = vector_store.info()
     return {
-        "total_vectors": vector_store.index.ntotal,
-        "dimension": vector_store.dimension,
-        "chunks_count": len(vector_store.chunks),
-        "index_size": f"{vector_store.index.ntotal * vector_store.dimension * 4 / 1024:.2f} KB"
+        "total_vectors": info["count"],
+        "deleted_vectors": info["deleted"],
+        "dimension": info["dimension"],
+        "chunks_count": info["chunks"],
+        "index_size": f"{info['index_bytes'] / 1024:.2f} KB",
+        "index_type": info["index_type"],
+        "shards": info.get("shards"),
+        "embedding_cache": embedding_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "conversations": conversation_manager.stats()
     }
\ No newline at end of file
@@ -1,42 +1,40 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
 from typing import List
-import requests
+import asyncio
+from app.services.scraper import fetcher
 
 router = APIRouter(prefix="/api")
 
 class VerifyRequest(BaseModel):
     urls: List[str]
 
+async def verify_url(url: str) -> dict:
+    try:
+        response = await fetcher.request("HEAD", url, retries=0, timeout=5)
+        
+        if response.status_code == 200:
+            return {
+                "url": url,
+                "accessible": True,
+                "status_code": response.status_code,
+                "content_type": response.headers.get('content-type', '')
+            }
+        return {
+            "url": url,
+            "accessible": False,
+            "status_code": response.status_code,
+            "error": f"Code HTTP: {response.status_code}"
+        }
+            
+    except Exception as e:
+        return {
+            "url": url,
+            "accessible": False,
+            "error": str(e)
+        }
+
 @router.post("/verify-urls")
 async def verify_urls(request: VerifyRequest):
-    results = []
-    
-    for url in request.urls:
-        try:
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.head(url, headers=headers, timeout=5, allow_redirects=True)
-            
-            if response.status_code == 200:
-                results.append({
-                    "url": url,
-                    "accessible": True,
-                    "status_code": response.status_code,
-                    "content_type": response.headers.get('content-type', '')
-                })
-            else:
-                results.append({
-                    "url": url,
-                    "accessible": False,
-                    "status_code": response.status_code,
-                    "error": f"Code HTTP: {response.status_code}"
-                })
-                
-        except Exception as e:
-            results.append({
-                "url": url,
-                "accessible": False,
-                "error": str(e)
-            })
-    
-    return results
\ No newline at end of file
+    # Vérifier toutes les URLs en parallèle (ordre conservé)
+    return list(await asyncio.gather(*(verify_url(url) for url in request.urls)))
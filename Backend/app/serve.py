@@ -0,0 +1,101 @@
+"""Lancement multi-workers (Linux) : python -m app.serve
+
+Le modèle d'embedding est chargé avant le fork (pages partagées entre workers).
+Le worker 0 est l'unique écrivain : il ingère et publie chaque sauvegarde.
+Les autres mappent l'index en lecture seule, le rechargent à chaque nouvelle
+version et lui relaient les requêtes d'ingestion via une socket Unix."""
+import logging
+import os
+import signal
+import socket
+import uvicorn
+from app.config import WEB_WORKERS, HOST, PORT, WRITER_SOCKET, VECTOR_SHARDS
+
+logger = logging.getLogger(__name__)
+
+def bind_sockets():
+    public = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    public.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    public.bind((HOST, PORT))
+    public.listen(2048)
+    public.set_inheritable(True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(WRITER_SOCKET)), exist_ok=True)
+    if os.path.exists(WRITER_SOCKET):
+        os.remove(WRITER_SOCKET)
+    private = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    private.bind(WRITER_SOCKET)
+    private.listen(128)
+    return public, private
+
+def run_worker(role: str, public: socket.socket, private: socket.socket):
+    os.environ["WORKER_ROLE"] = role
+    # Le rôle est lu à l'import de l'application, après le fork
+    config = uvicorn.Config("app.main:app", log_level="info")
+    sockets = [public, private] if role == "writer" else [public]
+    if role != "writer":
+        private.close()
+    uvicorn.Server(config).run(sockets=sockets)
+
+def spawn(role: str, public: socket.socket, private: socket.socket) -> int:
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        try:
+            run_worker(role, public, private)
+        finally:
+            os._exit(0)
+    return pid
+
+def main():
+    if not hasattr(os, "fork"):
+        raise SystemExit("Le mode multi-workers nécessite Linux")
+    if VECTOR_SHARDS > 1 and WEB_WORKERS > 1:
+        raise SystemExit("VECTOR_SHARDS > 1 et WEB_WORKERS > 1 ne se combinent pas")
+    logging.basicConfig(level=logging.INFO)
+
+    public, private = bind_sockets()
+
+    # Chargé une fois ici, partagé en copie-sur-écriture par tous les workers
+    from app.services.embeddings import get_model
+    get_model()
+
+    children = {}
+    for i in range(max(1, WEB_WORKERS)):
+        role = "writer" if i == 0 else "reader"
+        children[spawn(role, public, private)] = role
+    logger.info(f"{len(children)} workers démarrés sur {HOST}:{PORT}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        role = children.pop(pid, None)
+        if role is not None and not stopping:
+            # Relancer un worker arrêté, avec le même rôle
+            logger.warning(f"Worker {role} {pid} arrêté (statut {status}), relancé")
+            children[spawn(role, public, private)] = role
+
+    if os.path.exists(WRITER_SOCKET):
+        os.remove(WRITER_SOCKET)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from app.config import ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, ANSWER_CACHE_THRESHOLD
+from app.services.vector_store import vector_store
+
+class AnswerCache:
+    """Cache des réponses du LLM. Une entrée est retrouvée si les chunks du contexte
+    sont les mêmes et si la question est assez proche (similarité cosinus)."""
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL,
+                 threshold: float = ANSWER_CACHE_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        # (ids des chunks, n° d'entrée) -> (vecteur normalisé de la question, réponse, date)
+        self._entries: "OrderedDict[Tuple, Tuple[np.ndarray, str, float]]" = OrderedDict()
+        # ids des chunks -> clés des entrées correspondantes
+        self._by_chunks: Dict[Tuple[int, ...], Set[Tuple]] = {}
+        self._counter = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype="float32")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, chunk_ids: List[int], question_vector: List[float]) -> Optional[str]:
+        chunks = tuple(chunk_ids)
+        query = self._normalize(question_vector)
+        now = time.time()
+        with self.lock:
+            for key in list(self._by_chunks.get(chunks, ())):
+                vector, answer, created_at = self._entries[key]
+                if now - created_at > self.ttl:
+                    self._remove(key)
+                    continue
+                if float(np.dot(vector, query)) >= self.threshold:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return answer
+            self.misses += 1
+        return None
+
+    def put(self, chunk_ids: List[int], question_vector: List[float], answer: str):
+        chunks = tuple(chunk_ids)
+        with self.lock:
+            self._counter += 1
+            key = (chunks, self._counter)
+            self._entries[key] = (self._normalize(question_vector), answer, time.time())
+            self._by_chunks.setdefault(chunks, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, chunk_ids: List[int]):
+        """Oublier les réponses construites sur ces chunks"""
+        ids = set(chunk_ids)
+        with self.lock:
+            for chunks in [chunks for chunks in self._by_chunks if ids.intersection(chunks)]:
+                for key in list(self._by_chunks.get(chunks, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def _remove(self, key: Tuple):
+        self._entries.pop(key, None)
+        keys = self._by_chunks.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_chunks[key[0]]
+
+    def stats(self) -> Dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "invalidations": self.invalidations
+            }
+
+# Instance globale
+answer_cache = AnswerCache()
+
+# Les réponses basées sur des chunks remplacés ou supprimés sont oubliées
+vector_store.delete_listeners.append(answer_cache.invalidate)
@@ -0,0 +1,260 @@
+import json
+import mmap
+import os
+from typing import Dict, List, Optional
+import numpy as np
+from app.services.wal import atomic_replace
+
+class Column:
+    """Colonne append-only sur disque : un blob d'octets et une table d'offsets
+    (uint64, fin de chaque enregistrement). Le blob est lu via mmap."""
+
+    def __init__(self, prefix: str):
+        self.blob_path = f"{prefix}.bin"
+        self.offsets_path = f"{prefix}.off"
+        self._offsets = np.zeros(0, dtype="<u8")
+        self._blob: Optional[mmap.mmap] = None
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.offsets_path)
+
+    def _release(self):
+        # Libérer les mappings avant de tronquer les fichiers (requis sous Windows)
+        if self._blob is not None:
+            self._blob.close()
+        self._blob = None
+        self._offsets = np.zeros(0, dtype="<u8")
+
+    def open(self, read_only: bool = False):
+        """Mapper les fichiers existants (aucune lecture des données).
+
+        En lecture seule, une écriture en cours n'est pas réparée mais ignorée."""
+        if not self.exists():
+            self._offsets = np.zeros(0, dtype="<u8")
+            self._blob = None
+            return
+
+        if os.path.getsize(self.offsets_path) % 8 and not read_only:
+            # Offset partiellement écrit : on l'ignore
+            self._release()
+            with open(self.offsets_path, "r+b") as f:
+                f.truncate(os.path.getsize(self.offsets_path) // 8 * 8)
+
+        size = os.path.getsize(self.offsets_path) // 8
+        self._offsets = np.memmap(self.offsets_path, dtype="<u8", mode="r", shape=(size,)) if size else np.zeros(0, dtype="<u8")
+
+        end = int(self._offsets[-1]) if size else 0
+        if os.path.exists(self.blob_path) and os.path.getsize(self.blob_path) > end and not read_only:
+            # Données écrites sans offset (écriture interrompue) : on les retire
+            self._release()
+            with open(self.blob_path, "r+b") as f:
+                f.truncate(end)
+
+        self._blob = None
+        if end:
+            with open(self.blob_path, "rb") as f:
+                self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def clamp(self, n: int):
+        """Ne voir que les n premiers enregistrements (sans toucher aux fichiers)"""
+        self._offsets = self._offsets[:n]
+
+    def get(self, i: int) -> bytes:
+        start = int(self._offsets[i - 1]) if i > 0 else 0
+        end = int(self._offsets[i])
+        return self._blob[start:end]
+
+    def append(self, records: List[bytes]):
+        """Ajouter à la fin des fichiers : coût proportionnel aux nouvelles données"""
+        if not records:
+            return
+        end = int(self._offsets[-1]) if len(self._offsets) else 0
+        ends = end + np.cumsum([len(record) for record in records], dtype="<u8")
+
+        with open(self.blob_path, "ab") as f:
+            f.write(b"".join(records))
+            f.flush()
+            os.fsync(f.fileno())
+        # Les offsets en dernier : ils valident les données du blob
+        with open(self.offsets_path, "ab") as f:
+            f.write(ends.astype("<u8").tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def truncate(self, n: int):
+        """Ne garder que les n premiers enregistrements"""
+        if n >= len(self):
+            return
+        end = int(self._offsets[n - 1]) if n > 0 else 0
+        self._release()
+        with open(self.offsets_path, "r+b") as f:
+            f.truncate(n * 8)
+        with open(self.blob_path, "a+b") as f:
+            f.truncate(end)
+        self.open()
+
+class VectorColumn:
+    """Vecteurs float32 de taille fixe, un par chunk dans l'ordre des ids (append-only)"""
+
+    def __init__(self, path: str, dimension: int):
+        self.path = path
+        self.dimension = dimension
+        self.row_bytes = dimension * 4
+
+    def __len__(self) -> int:
+        # Une ligne partiellement écrite n'est pas comptée
+        return os.path.getsize(self.path) // self.row_bytes if os.path.exists(self.path) else 0
+
+    def read(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        stop = len(self) if stop is None else stop
+        if stop <= start:
+            return np.zeros((0, self.dimension), dtype="float32")
+        with open(self.path, "rb") as f:
+            f.seek(start * self.row_bytes)
+            data = f.read((stop - start) * self.row_bytes)
+        return np.frombuffer(data, dtype="<f4").reshape(-1, self.dimension).astype("float32")
+
+    def append(self, vectors: np.ndarray):
+        if not len(vectors):
+            return
+        with open(self.path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype="<f4").tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def write(self, vectors: np.ndarray):
+        """Réécrire tout le fichier (remplacement atomique)"""
+        with open(f"{self.path}.tmp", "wb") as f:
+            f.write(np.ascontiguousarray(vectors, dtype="<f4").tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        atomic_replace(f"{self.path}.tmp", self.path)
+
+    def truncate(self, n: int):
+        """Ne garder que les n premiers vecteurs (et aucune ligne partielle)"""
+        if os.path.exists(self.path) and os.path.getsize(self.path) > n * self.row_bytes:
+            with open(self.path, "r+b") as f:
+                f.truncate(n * self.row_bytes)
+
+class ChunkStore:
+    """Textes et métadonnées des chunks, stockés en colonnes sur disque.
+
+    Les ajouts restent en mémoire jusqu'à save(), qui n'écrit que les
+    nouveaux enregistrements. Les textes sont lus à la demande."""
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        # (colonne textes, colonne métadonnées, textes en attente, métadonnées en attente)
+        # remplacé d'un bloc pour que les lectures concurrentes restent cohérentes
+        self._state = (None, None, [], [])
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return Column(f"{path}.texts").exists()
+
+    @staticmethod
+    def _open(path: str, read_only: bool = False):
+        texts, metadata = Column(f"{path}.texts"), Column(f"{path}.meta")
+        texts.open(read_only)
+        metadata.open(read_only)
+        return texts, metadata
+
+    def __len__(self) -> int:
+        texts, _, pending, _ = self._state
+        return (len(texts) if texts else 0) + len(pending)
+
+    def text(self, i: int) -> str:
+        texts, _, pending, _ = self._state
+        persisted = len(texts) if texts else 0
+        if i < persisted:
+            return texts.get(i).decode("utf-8")
+        return pending[i - persisted]
+
+    def metadata(self, i: int) -> Dict:
+        texts, metadata, _, pending = self._state
+        persisted = len(texts) if texts else 0
+        if i < persisted:
+            return json.loads(metadata.get(i))
+        return pending[i - persisted]
+
+    def append(self, texts: List[str], metadatas: List[Dict]):
+        _, _, pending_texts, pending_metadata = self._state
+        pending_texts.extend(texts)
+        pending_metadata.extend(metadatas)
+
+    def load(self, path: str, read_only: bool = False, limit: Optional[int] = None) -> bool:
+        """Ouvrir les colonnes ; en lecture seule (un autre processus écrit),
+        seuls les `limit` premiers chunks complets sont visibles"""
+        if not self.exists(path):
+            return False
+        texts, metadata = self._open(path, read_only)
+        # Les deux colonnes doivent avoir la même longueur
+        n = min(len(texts), len(metadata))
+        if limit is not None:
+            n = min(n, limit)
+        if read_only:
+            texts.clamp(n)
+            metadata.clamp(n)
+        else:
+            texts.truncate(n)
+            metadata.truncate(n)
+        self.path = path
+        self._state = (texts, metadata, [], [])
+        return True
+
+    def save(self, path: str):
+        old_texts, old_metadata, pending_texts, pending_metadata = self._state
+        if path != self.path:
+            # Nouvel emplacement : tout réécrire
+            texts = [self.text(i) for i in range(len(self))]
+            metadatas = [self.metadata(i) for i in range(len(self))]
+            new_texts, new_metadata = Column(f"{path}.texts"), Column(f"{path}.meta")
+            for column in (new_texts, new_metadata):
+                for file_path in (column.blob_path, column.offsets_path):
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+        else:
+            texts, metadatas = pending_texts, pending_metadata
+            new_texts, new_metadata = old_texts, old_metadata
+
+        new_texts.append([text.encode("utf-8") for text in texts])
+        new_metadata.append([json.dumps(metadata, ensure_ascii=False).encode("utf-8") for metadata in metadatas])
+
+        self.path = path
+        self._state = (*self._open(path), [], [])
+
+    def truncate(self, n: int):
+        """Ne garder que les n premiers chunks"""
+        texts, metadata, pending_texts, pending_metadata = self._state
+        persisted = len(texts) if texts else 0
+        if n >= persisted:
+            keep = n - persisted
+            self._state = (texts, metadata, pending_texts[:keep], pending_metadata[:keep])
+            return
+        texts.truncate(n)
+        metadata.truncate(n)
+        self._state = (texts, metadata, [], [])
+
+class ChunkView:
+    """Vue en lecture seule (len / index) sur une colonne du ChunkStore"""
+
+    def __init__(self, store: ChunkStore, getter):
+        self._store = store
+        self._getter = getter
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __getitem__(self, i: int):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._getter(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._getter(i)
@@ -1,15 +1,110 @@
+import re
+from collections import deque
+from functools import lru_cache
+from itertools import accumulate, chain, islice
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+def token_counter(tokenizer) -> Callable[[str], int]:
+    """Nombre de tokens d'un mot (mis en cache : les mots se répètent beaucoup)"""
+    @lru_cache(maxsize=100_000)
+    def count(word: str) -> int:
+        return max(1, len(tokenizer.tokenize(word)))
+    return count
+
+@lru_cache(maxsize=4096)
+def words_re(n: int) -> "re.Pattern":
+    """Jusqu'à n mots consécutifs en une seule correspondance"""
+    return re.compile(r'\S+(?:\s+\S+){0,%d}' % (n - 1))
+
+def iter_chunks(text: str, spans: Iterable[Tuple[int, int]], size: int = 50, overlap: int = 2,
+                max_tokens: int = 0, count_tokens: Optional[Callable[[str], int]] = None) -> Iterator[Dict]:
+    """Découpe les passages `spans` de `text` en chunks avec overlap, au fil de l'eau.
+
+    Un chunk fait au plus `size` mots et, si `count_tokens` est fourni, au plus
+    `max_tokens` tokens. Chaque chunk porte ses positions (début, fin) dans `text`.
+    Les mots sont lus par paquets d'au plus `size` + 1 (une longue ligne n'est jamais
+    découpée d'un bloc) ; leurs positions ne sont calculées qu'aux bornes des chunks."""
+    overlap = min(overlap, size - 1)
+    # Paquets de mots en attente : [position du premier mot, mots, tokens de chaque mot]
+    pieces: Deque[List] = deque()
+    count = 0  # mots en attente
+    tokens = 0
+    carried = 0  # mots repris du chunk précédent en tête
+
+    def word_span(piece: List, j: int) -> Tuple[int, int]:
+        # Positions du j-ième mot d'un paquet
+        end = words_re(j + 1).match(text, piece[0]).end()
+        return end - len(piece[1][j]), end
+
+    def fit() -> int:
+        # Nombre de mots en tête qui tiennent dans un chunk
+        n = min(size, count)
+        if count_tokens:
+            costs = chain.from_iterable(piece[2] for piece in pieces)
+            for i, total in enumerate(accumulate(islice(costs, n))):
+                if total > max_tokens:
+                    return i
+        return n
+
+    def emit(n: int) -> Dict:
+        words = list(islice(chain.from_iterable(piece[1] for piece in pieces), n))
+        for piece in pieces:
+            if n <= len(piece[1]):
+                break
+            n -= len(piece[1])
+        return {"text": " ".join(words), "start": pieces[0][0], "end": word_span(piece, n - 1)[1]}
+
+    def drop(n: int) -> int:
+        # Retirer n mots en tête, retourne leurs tokens
+        removed = 0
+        while n:
+            piece = pieces[0]
+            if n >= len(piece[1]):
+                pieces.popleft()
+                removed += sum(piece[2])
+                n -= len(piece[1])
+                continue
+            removed += sum(piece[2][:n])
+            pieces[0] = [word_span(piece, n)[0], piece[1][n:], piece[2][n:]]
+            break
+        return removed
+
+    for span_start, span_end in spans:
+        position = span_start
+        while True:
+            match = words_re(size + 1 - count).search(text, position, span_end)
+            if match is None:
+                break
+            position = match.end()
+            words = match.group().split()
+            count += len(words)
+            if count_tokens:
+                costs = [count_tokens(word) for word in words]
+                tokens += sum(costs)
+            else:
+                costs = ()
+            pieces.append([match.start(), words, costs])
+
+            while count > size or (count_tokens and tokens > max_tokens):
+                n = fit()
+                if n <= carried and carried:
+                    # L'overlap ne laisse pas de place au mot suivant : on l'abandonne
+                    tokens -= drop(carried)
+                    count -= carried
+                    carried = 0
+                    continue
+                # Un mot seul plus long que la fenêtre forme son propre chunk
+                n = max(n, 1)
+                if n == count:
+                    break
+                yield emit(n)
+                carried = min(overlap, n - 1)
+                tokens -= drop(n - carried)
+                count -= n - carried
+
+    if count > carried:
+        yield emit(count)
+
 def chunk_text(text: str, size: int = 50, overlap: int = 2) -> list:
     """Découpe le texte en chunks avec overlap"""
-    words = text.split()
-    chunks = []
-    
-    if len(words) <= size:
-        return [" ".join(words)]
-    
-    i = 0
-    while i < len(words):
-        chunk = words[i:i + size]
-        chunks.append(" ".join(chunk))
-        i += size - overlap
-    
-    return chunks
\ No newline at end of file
+    return [chunk["text"] for chunk in iter_chunks(text, [(0, len(text))], size, overlap)] or [""]
@@ -1,17 +1,25 @@
+import hashlib
 import re
+from typing import Iterator, Tuple
 
-def clean_text(text: str) -> str:
-    # Supprimer les espaces multiples
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Supprimer les lignes vides
-    lines = [line.strip() for line in text.split('\n') if line.strip()]
-    
-    # Garder seulement les lignes avec un contenu significatif
-    meaningful_lines = []
-    for line in lines:
+MIN_LINE_LENGTH = 30
+# Lignes assez longues pour être gardées : les plus courtes sont écartées sans les lire
+LINE_RE = re.compile(r'[^\n]{%d,}' % (MIN_LINE_LENGTH + 1))
+ALNUM_RE = re.compile(r'[^\W_]')
+
+def iter_clean_lines(text: str) -> Iterator[Tuple[int, int]]:
+    """Positions (début, fin) des lignes significatives, sans copier le texte"""
+    for match in LINE_RE.finditer(text):
+        line = match.group()
         # Ignorer les lignes trop courtes ou qui ne contiennent que des caractères spéciaux
-        if len(line) > 30 and any(c.isalnum() for c in line):
-            meaningful_lines.append(line)
-    
-    return ' '.join(meaningful_lines)
\ No newline at end of file
+        if len(line.strip()) > MIN_LINE_LENGTH and ALNUM_RE.search(line):
+            yield match.start(), match.end()
+
+def clean_text(text: str) -> str:
+    # Garder seulement les lignes avec un contenu significatif, espaces multiples réduits
+    return ' '.join(' '.join(text[start:end].split()) for start, end in iter_clean_lines(text))
+
+def content_hash(text: str) -> str:
+    """Hash du texte normalisé (casse et espaces ignorés)"""
+    normalized = ' '.join(text.lower().split())
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
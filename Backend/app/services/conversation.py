@@ -1,39 +1,178 @@
-from datetime import datetime, timedelta
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+from app.config import (
+    CONVERSATION_TTL,
+    CONVERSATION_MAX_MB,
+    CONVERSATION_MAX_TURNS,
+    CONVERSATION_ANSWER_CHARS,
+    CONVERSATION_SWEEP_INTERVAL,
+)
+from app.services.vector_store import vector_store
 
-class ConversationManager:
-    def __init__(self, ttl_minutes=30):
-        self.conversations = {}
-        self.ttl = timedelta(minutes=ttl_minutes)
-    
-    def get_conversation(self, session_id: str):
-        if session_id in self.conversations:
-            conv_data = self.conversations[session_id]
-            if datetime.now() - conv_data['last_activity'] < self.ttl:
-                return conv_data
-            else:
-                del self.conversations[session_id]
-        return None
-    
-    def start_conversation(self, session_id: str):
-        self.conversations[session_id] = {
-            'history': [],
-            'last_activity': datetime.now(),
-            'sources': []
+logger = logging.getLogger(__name__)
+
+# Coût mémoire approximatif d'un tour et d'une session en plus des textes
+TURN_OVERHEAD = 200
+SESSION_OVERHEAD = 400
+
+class Turn:
+    """Un échange : question, début de la réponse, ids des chunks utilisés"""
+    __slots__ = ("question", "answer", "chunk_ids", "reused", "timestamp")
+
+    def __init__(self, question: str, answer: str, chunk_ids: Tuple[int, ...], reused: bool):
+        self.question = question
+        self.answer = answer
+        self.chunk_ids = chunk_ids
+        self.reused = reused
+        self.timestamp = time.time()
+
+    @property
+    def size(self) -> int:
+        return sys.getsizeof(self.question) + sys.getsizeof(self.answer) + 8 * len(self.chunk_ids) + TURN_OVERHEAD
+
+    def to_dict(self) -> Dict:
+        return {
+            "question": self.question,
+            "answer": self.answer,
+            "chunk_ids": list(self.chunk_ids),
+            "context_reused": self.reused,
+            "timestamp": self.timestamp
         }
-    
-    def add_message(self, session_id: str, role: str, content: str, sources=None):
-        if session_id not in self.conversations:
-            self.start_conversation(session_id)
-        
-        self.conversations[session_id]['history'].append({
-            'role': role,
-            'content': content,
-            'timestamp': datetime.now()
-        })
-        
-        if sources:
-            self.conversations[session_id]['sources'].extend(sources)
-        
-        self.conversations[session_id]['last_activity'] = datetime.now()
-
-conversation_manager = ConversationManager()
\ No newline at end of file
+
+class Conversation:
+    def __init__(self, max_turns: int):
+        self.turns: Deque[Turn] = deque(maxlen=max_turns)
+        self.last_activity = time.time()
+        self.size = SESSION_OVERHEAD
+
+class ConversationManager:
+    """Sessions de conversation en mémoire bornée : ordre LRU (la moins récemment
+    utilisée est évincée au-delà de `max_bytes`), expiration après `ttl` secondes
+    d'inactivité, nettoyée en tâche de fond"""
+
+    def __init__(self, ttl: float = CONVERSATION_TTL, max_bytes: int = int(CONVERSATION_MAX_MB * 1024 * 1024),
+                 max_turns: int = CONVERSATION_MAX_TURNS, answer_chars: int = CONVERSATION_ANSWER_CHARS,
+                 sweep_interval: float = CONVERSATION_SWEEP_INTERVAL):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_turns = max_turns
+        self.answer_chars = answer_chars
+        self.sweep_interval = sweep_interval
+        self.conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._bytes = 0
+        self.lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._sweeper())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _sweeper(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            removed = self.sweep()
+            if removed:
+                logger.info(f"{removed} conversations expirées supprimées")
+
+    def sweep(self) -> int:
+        """Supprimer les sessions expirées (les plus anciennes sont en tête)"""
+        deadline = time.time() - self.ttl
+        removed = 0
+        with self.lock:
+            while self.conversations:
+                session_id, conversation = next(iter(self.conversations.items()))
+                if conversation.last_activity >= deadline:
+                    break
+                self._remove(session_id)
+                removed += 1
+            self.expired += removed
+        return removed
+
+    def _remove(self, session_id: str):
+        conversation = self.conversations.pop(session_id)
+        self._bytes -= conversation.size
+
+    def _get(self, session_id: str) -> Optional[Conversation]:
+        conversation = self.conversations.get(session_id)
+        if conversation is None:
+            return None
+        if time.time() - conversation.last_activity >= self.ttl:
+            self._remove(session_id)
+            self.expired += 1
+            return None
+        return conversation
+
+    def history(self, session_id: str) -> List[Dict]:
+        with self.lock:
+            conversation = self._get(session_id)
+            return [turn.to_dict() for turn in conversation.turns] if conversation else []
+
+    def last_chunks(self, session_id: str) -> List[int]:
+        """Chunks utilisés au tour précédent de la session"""
+        with self.lock:
+            conversation = self._get(session_id)
+            if conversation is None or not conversation.turns:
+                return []
+            return list(conversation.turns[-1].chunk_ids)
+
+    def add_turn(self, session_id: str, question: str, answer: str, chunk_ids: List[int], reused: bool = False):
+        turn = Turn(question, answer[:self.answer_chars], tuple(int(i) for i in chunk_ids), reused)
+        with self.lock:
+            conversation = self._get(session_id)
+            if conversation is None:
+                conversation = self.conversations[session_id] = Conversation(self.max_turns)
+                self._bytes += conversation.size
+            if len(conversation.turns) == conversation.turns.maxlen:
+                dropped = conversation.turns[0].size
+                conversation.size -= dropped
+                self._bytes -= dropped
+            conversation.turns.append(turn)
+            conversation.size += turn.size
+            self._bytes += turn.size
+            conversation.last_activity = turn.timestamp
+            self.conversations.move_to_end(session_id)
+
+            # Au-delà du plafond : évincer les sessions les moins récemment utilisées
+            while self._bytes > self.max_bytes and len(self.conversations) > 1:
+                self._remove(next(iter(self.conversations)))
+                self.evicted += 1
+
+    def forget_chunks(self, chunk_ids: List[int]):
+        """Les chunks supprimés ne sont plus réutilisés : le tour suivant refait une recherche"""
+        ids = set(chunk_ids)
+        with self.lock:
+            for conversation in self.conversations.values():
+                if conversation.turns and ids.intersection(conversation.turns[-1].chunk_ids):
+                    turn = conversation.turns[-1]
+                    size = turn.size
+                    turn.chunk_ids = tuple(i for i in turn.chunk_ids if i not in ids)
+                    conversation.size -= size - turn.size
+                    self._bytes -= size - turn.size
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                "sessions": len(self.conversations),
+                "turns": sum(len(conversation.turns) for conversation in self.conversations.values()),
+                "memory_kb": round(self._bytes / 1024, 1),
+                "expired": self.expired,
+                "evicted": self.evicted
+            }
+
+# Instance globale
+conversation_manager = ConversationManager()
+
+vector_store.delete_listeners.append(conversation_manager.forget_chunks)
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+
+# Coût mémoire approximatif d'une entrée en plus du vecteur (clé, objets Python)
+ENTRY_OVERHEAD = 160
+
+def cache_key(model_name: str, text: str) -> str:
+    """Clé (modèle, hash du texte). Seuls les espaces sont normalisés :
+    la casse peut compter selon le modèle."""
+    normalized = ' '.join(text.split())
+    digest = hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+    return f"{model_name}:{digest}"
+
+class EmbeddingCache:
+    """Cache d'embeddings à deux niveaux : LRU en mémoire bornée en octets,
+    puis une base SQLite sur disque"""
+
+    def __init__(self, max_bytes: int, path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.path = path or None
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._memory_bytes = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self.lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self.path is None:
+            return None
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+        return self._db
+
+    def _remember(self, key: str, vector: np.ndarray):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = vector
+        self._memory_bytes += vector.nbytes + ENTRY_OVERHEAD
+        while self._memory_bytes > self.max_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes + ENTRY_OVERHEAD
+
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        results: List[Optional[np.ndarray]] = [None] * len(keys)
+        with self.lock:
+            missing = []
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                    self.hits_memory += 1
+                else:
+                    missing.append(i)
+
+            db = self._connection()
+            if missing and db is not None:
+                wanted = list({keys[i] for i in missing})
+                found: Dict[str, np.ndarray] = {}
+                # SQLite limite le nombre de paramètres par requête
+                for start in range(0, len(wanted), 500):
+                    part = wanted[start:start + 500]
+                    rows = db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                    ).fetchall()
+                    for key, blob in rows:
+                        found[key] = np.frombuffer(blob, dtype="float32")
+                still_missing = []
+                for i in missing:
+                    vector = found.get(keys[i])
+                    if vector is None:
+                        still_missing.append(i)
+                        continue
+                    results[i] = vector
+                    self._remember(keys[i], vector)
+                    self.hits_disk += 1
+                missing = still_missing
+
+            self.misses += len(missing)
+        return results
+
+    def put_many(self, keys: List[str], vectors: List[np.ndarray]):
+        if not keys:
+            return
+        with self.lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+            db = self._connection()
+            if db is not None:
+                db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, np.asarray(vector, dtype="float32").tobytes()) for key, vector in zip(keys, vectors)]
+                )
+                db.commit()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            db = self._connection()
+            disk_items = db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] if db is not None else 0
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": round((self.hits_memory + self.hits_disk) / lookups, 4) if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_max_bytes": self.max_bytes,
+                "disk_items": disk_items,
+                "disk_bytes": os.path.getsize(self.path) if self.path and os.path.exists(self.path) else 0
+            }
@@ -1,24 +1,273 @@
-from sentence_transformers import SentenceTransformer
-from typing import List
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import os
+import threading
+import numpy as np
+from app.config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_BACKEND,
+    EMBED_THREADS,
+    ONNX_MODEL_DIR,
+    QUERY_BATCH_WINDOW_MS,
+    QUERY_BATCH_MAX,
+    EMBED_CACHE_MAX_MB,
+    EMBED_CACHE_PATH,
+)
+from app.services.executor import run_inference
+from app.services.embedding_cache import EmbeddingCache, cache_key
+from app.services.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "int8", "onnx", "onnx_int8")
+
+class EmbeddingBackend:
+    """Moteur d'encodage : encode(textes) -> matrice float32 (un vecteur par texte)"""
+    name = "base"
+    # Tokenizer du modèle et longueur maximale d'entrée (au-delà, le texte est tronqué)
+    tokenizer = None
+    max_seq_length = 0
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        raise NotImplementedError
+
+class TorchBackend(EmbeddingBackend):
+    """SentenceTransformer PyTorch en pleine précision (référence)"""
+    name = "torch"
+
+    def __init__(self, model_name: str, threads: int = 0):
+        # Import coûteux (torch) : seulement quand le modèle est demandé
+        from sentence_transformers import SentenceTransformer
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.tokenizer = self.model.tokenizer
+        self.max_seq_length = self.model.max_seq_length
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, batch_size=batch_size), dtype="float32")
+
+class Int8TorchBackend(TorchBackend):
+    """Couches linéaires quantifiées en int8 (quantification dynamique PyTorch)"""
+    name = "int8"
+
+    def __init__(self, model_name: str, threads: int = 0):
+        super().__init__(model_name, threads)
+        import torch
+        self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def export_onnx(model_name: str, directory: str, quantize: bool = False) -> str:
+    """Exporter le transformer d'un SentenceTransformer en ONNX, avec son tokenizer
+    et sa configuration de pooling ; fait une fois, réutilisé ensuite"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize
+
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer, pooling = model[0], model[1]
+    if pooling.pooling_mode_mean_tokens:
+        mode = "mean"
+    elif pooling.pooling_mode_cls_token:
+        mode = "cls"
+    else:
+        raise ValueError(f"Pooling non supporté pour l'export ONNX de {model_name}")
+
+    class Encoder(torch.nn.Module):
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, input_ids, attention_mask, token_type_ids=None):
+            return self.auto_model(input_ids=input_ids, attention_mask=attention_mask,
+                                   token_type_ids=token_type_ids)[0]
+
+    os.makedirs(directory, exist_ok=True)
+    tokenizer = transformer.tokenizer
+    sample = tokenizer(["exemple"], return_tensors="pt")
+    inputs = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    axes = {name: {0: "batch", 1: "sequence"} for name in inputs + ["last_hidden_state"]}
+    path = os.path.join(directory, "model.onnx")
+    torch.onnx.export(
+        Encoder(transformer.auto_model).eval(), tuple(sample[name] for name in inputs), path,
+        input_names=inputs, output_names=["last_hidden_state"], dynamic_axes=axes, opset_version=14
+    )
+    tokenizer.save_pretrained(directory)
+    with open(os.path.join(directory, "pooling.json"), "w") as f:
+        json.dump({
+            "pooling": mode,
+            "normalize": any(isinstance(module, Normalize) for module in model),
+            "max_seq_length": model.max_seq_length,
+            "inputs": inputs
+        }, f)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(path, os.path.join(directory, "model_int8.onnx"), weight_type=QuantType.QInt8)
+    return directory
+
+class OnnxBackend(EmbeddingBackend):
+    """ONNX Runtime sur CPU, pooling et normalisation refaits en numpy.
+
+    Le modèle est exporté au premier lancement dans ONNX_MODEL_DIR ;
+    ensuite ni torch ni sentence_transformers ne sont importés."""
+    name = "onnx"
+
+    def __init__(self, model_name: str, threads: int = 0, quantized: bool = False, directory: str = ONNX_MODEL_DIR):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError("EMBEDDING_BACKEND=onnx nécessite onnxruntime (pip install onnxruntime)")
+        from transformers import AutoTokenizer
+
+        directory = os.path.join(directory, model_name.replace("/", "__"))
+        filename = "model_int8.onnx" if quantized else "model.onnx"
+        if not os.path.exists(os.path.join(directory, filename)):
+            logger.info(f"Export ONNX de {model_name} vers {directory}")
+            export_onnx(model_name, directory, quantize=quantized)
+
+        with open(os.path.join(directory, "pooling.json")) as f:
+            config = json.load(f)
+        self.pooling = config["pooling"]
+        self.normalize = config["normalize"]
+        self.max_seq_length = config["max_seq_length"]
+        self.inputs = config["inputs"]
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(directory, filename), options, providers=["CPUExecutionProvider"]
+        )
+        if quantized:
+            self.name = "onnx_int8"
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            batch = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                   max_length=self.max_seq_length, return_tensors="np")
+            hidden = self.session.run(None, {name: batch[name].astype("int64") for name in self.inputs})[0]
+            if self.pooling == "mean":
+                mask = batch["attention_mask"][..., None].astype("float32")
+                vectors = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            else:
+                vectors = hidden[:, 0]
+            if self.normalize:
+                vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+            outputs.append(vectors.astype("float32"))
+        return np.concatenate(outputs) if outputs else np.zeros((0, 0), dtype="float32")
+
+def make_backend(backend: str, model_name: str = EMBEDDING_MODEL, threads: int = EMBED_THREADS) -> EmbeddingBackend:
+    if backend == "torch":
+        return TorchBackend(model_name, threads)
+    if backend == "int8":
+        return Int8TorchBackend(model_name, threads)
+    if backend in ("onnx", "onnx_int8"):
+        return OnnxBackend(model_name, threads, quantized=backend == "onnx_int8")
+    raise ValueError(f"Backend d'embedding inconnu: {backend} (attendu: {', '.join(BACKENDS)})")
+
+# Les vecteurs d'un backend approché ne sont pas mélangés à ceux de la référence dans le cache
+MODEL_KEY = EMBEDDING_MODEL if EMBEDDING_BACKEND == "torch" else f"{EMBEDDING_MODEL}@{EMBEDDING_BACKEND}"
 
 # Modèle global
-_model = None
+_model: Optional[EmbeddingBackend] = None
+_model_lock = threading.Lock()
+
+# Cache d'embeddings partagé par les questions et l'ingestion
+embedding_cache = EmbeddingCache(int(EMBED_CACHE_MAX_MB * 1024 * 1024), EMBED_CACHE_PATH)
 
-def get_model():
+def get_model() -> EmbeddingBackend:
     """Singleton pour charger le modèle une fois"""
     global _model
     if _model is None:
-        _model = SentenceTransformer('all-MiniLM-L6-v2')
+        # Plusieurs threads d'inférence peuvent arriver en même temps
+        with _model_lock:
+            if _model is None:
+                _model = make_backend(EMBEDDING_BACKEND)
     return _model
 
 def embed(text: str) -> List[float]:
     """Convertir un texte en vecteur d'embedding"""
-    model = get_model()
-    vector = model.encode(text)
-    return vector.tolist()
+    return embed_batch([text])[0]
 
-def embed_batch(texts: List[str]) -> List[List[float]]:
+def embed_batch(texts: List[str], batch_size: int = 32) -> List[List[float]]:
     """Convertir plusieurs textes en une fois (plus efficace)"""
-    model = get_model()
-    vectors = model.encode(texts)
-    return vectors.tolist()
\ No newline at end of file
+    if not texts:
+        return []
+    
+    # Seuls les textes absents du cache passent par le modèle
+    keys = [cache_key(MODEL_KEY, text) for text in texts]
+    vectors = embedding_cache.get_many(keys)
+    # Un texte répété dans le lot n'est encodé qu'une fois
+    missing: Dict[str, int] = {}
+    for i, vector in enumerate(vectors):
+        if vector is None:
+            missing.setdefault(keys[i], i)
+    
+    if missing:
+        model = get_model()
+        with stage("embed"):
+            encoded = model.encode([texts[i] for i in missing.values()], batch_size=batch_size)
+        encoded = dict(zip(missing, np.asarray(encoded, dtype="float32")))
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                vectors[i] = encoded[keys[i]]
+        embedding_cache.put_many(list(encoded), list(encoded.values()))
+    
+    return [vector.tolist() for vector in vectors]
+
+class QueryBatcher:
+    """Regroupe les questions concurrentes dans une fenêtre de temps courte
+    pour ne faire qu'un seul encode par lot"""
+
+    def __init__(self, window_ms: float = QUERY_BATCH_WINDOW_MS, max_batch: int = QUERY_BATCH_MAX):
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Lots en cours : la boucle ne garde qu'une référence faible sur les tâches
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        texts = [text for text, _ in batch]
+        try:
+            vectors = await run_inference(embed_batch, texts, batch_size=len(texts))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+# Instance globale pour les questions de /api/ask
+query_batcher = QueryBatcher()
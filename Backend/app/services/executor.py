@@ -0,0 +1,17 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from app.config import INFERENCE_WORKERS
+
+# Pool dédié à l'inférence du modèle et à la recherche FAISS.
+# Des threads suffisent : torch et faiss relâchent le GIL pendant le calcul,
+# et le modèle n'est chargé qu'une fois en mémoire.
+inference_pool = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+
+async def run_inference(func, *args, **kwargs):
+    """Exécuter une fonction bloquante dans le pool d'inférence"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(inference_pool, partial(func, *args, **kwargs))
+
+def shutdown():
+    inference_pool.shutdown(wait=False, cancel_futures=True)
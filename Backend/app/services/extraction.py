@@ -0,0 +1,192 @@
+import logging
+import re
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlparse
+from app.config import HTML_PARSER
+
+logger = logging.getLogger(__name__)
+
+# Éléments jamais utiles au contenu
+DROP_TAGS = ('script', 'style', 'nav', 'footer', 'header',
+             'iframe', 'noscript', 'svg', 'img', 'form')
+
+# Lignes plus courtes ignorées (menus, boutons, légendes)
+MIN_LINE_LENGTH = 20
+
+PARSERS = ("lxml", "html.parser")
+
+class Strategy:
+    """Extraction propre à un site : sélecteurs CSS simples (tag, #id, .classe,
+    [attribut=valeur]) essayés dans l'ordre pour trouver le contenu principal,
+    et éléments à retirer de ce contenu"""
+
+    def __init__(self, roots: List[str], drop: Iterable[str] = (), fallback: bool = True):
+        self.roots = roots
+        self.drop = list(drop)
+        # Sans contenu principal : toute la page, ou rien
+        self.fallback = fallback
+
+DEFAULT_STRATEGY = Strategy(["main", "article", "div.content"])
+
+# Stratégies par domaine (sous-domaines compris)
+STRATEGIES: Dict[str, Strategy] = {}
+
+def register(domain: str, strategy: Strategy):
+    STRATEGIES[domain] = strategy
+
+def strategy_for(url: str) -> Strategy:
+    host = (urlparse(url).hostname or "").lower()
+    # Du domaine le plus précis au plus général : fr.wikipedia.org, wikipedia.org, org
+    parts = host.split(".")
+    for i in range(len(parts)):
+        strategy = STRATEGIES.get(".".join(parts[i:]))
+        if strategy is not None:
+            return strategy
+    return DEFAULT_STRATEGY
+
+# Wikipedia : l'article, sans les appels de note
+register("wikipedia.org", Strategy(["div#mw-content-text"], drop=[".reference"]))
+# Documentation Python : le corps de la page uniquement
+register("docs.python.org", Strategy(["div[role=main]", "main"], fallback=False))
+
+SELECTOR_RE = re.compile(r'^([\w-]*)(?:#([\w-]+))?(?:\.([\w-]+))?(?:\[([\w-]+)=["\']?([^"\'\]]*)["\']?\])?$')
+
+def selector_to_xpath(selector: str) -> str:
+    """Sélecteur CSS simple -> XPath relatif (descendants de l'élément de départ)"""
+    match = SELECTOR_RE.match(selector)
+    if not match:
+        raise ValueError(f"Sélecteur non supporté: {selector}")
+    tag, element_id, class_name, attribute, value = match.groups()
+    conditions = []
+    if element_id:
+        conditions.append(f"@id='{element_id}'")
+    if class_name:
+        conditions.append(f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')")
+    if attribute:
+        conditions.append(f"@{attribute}='{value}'")
+    return f".//{tag or '*'}" + "".join(f"[{condition}]" for condition in conditions)
+
+class HtmlParser:
+    """Moteur d'analyse : strings(html, stratégie) -> textes du contenu principal"""
+    name = "base"
+
+    def strings(self, html: str, strategy: Strategy) -> Iterator[str]:
+        raise NotImplementedError
+
+class SoupParser(HtmlParser):
+    """BeautifulSoup avec html.parser (Python pur, référence)"""
+    name = "html.parser"
+
+    def strings(self, html: str, strategy: Strategy) -> Iterator[str]:
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html, 'html.parser')
+        for element in soup(list(DROP_TAGS)):
+            element.decompose()
+
+        root = next((node for node in map(soup.select_one, strategy.roots) if node is not None), None)
+        if root is None:
+            if not strategy.fallback:
+                return iter(())
+            root = soup
+        for selector in strategy.drop:
+            for element in root.select(selector):
+                element.decompose()
+        return root.stripped_strings
+
+class LxmlParser(HtmlParser):
+    """lxml (libxml2, en C) : analyse une dizaine de fois plus rapide que html.parser"""
+    name = "lxml"
+
+    def __init__(self):
+        try:
+            from lxml import etree, html
+        except ImportError:
+            raise ImportError("HTML_PARSER=lxml nécessite lxml (pip install lxml)")
+        self._html = html
+        self._etree = etree
+        self._parser = html.HTMLParser(encoding="utf-8")
+        self._drop = etree.XPath("|".join(f".//{tag}" for tag in DROP_TAGS))
+        self._xpaths: Dict[str, object] = {}
+
+    def _xpath(self, selector: str):
+        if selector not in self._xpaths:
+            self._xpaths[selector] = self._etree.XPath(selector_to_xpath(selector))
+        return self._xpaths[selector]
+
+    def strings(self, html: str, strategy: Strategy) -> Iterator[str]:
+        if not html.strip():
+            return iter(())
+        # Octets + encodage explicite : accepte aussi les pages avec déclaration <?xml encoding=...?>
+        try:
+            document = self._html.document_fromstring(html.encode("utf-8", "replace"), parser=self._parser)
+        except self._etree.ParserError:
+            # Document vide (que des commentaires ou des espaces)
+            return iter(())
+        # Éléments ignorés sans toucher à l'arbre : comme avec BeautifulSoup, les textes
+        # situés de part et d'autre d'un élément retiré restent distincts
+        skipped = set(self._drop(document))
+
+        root = None
+        for selector in strategy.roots:
+            for element in self._xpath(selector)(document):
+                if not any(parent in skipped for parent in element.iterancestors()):
+                    root = element
+                    break
+            if root is not None:
+                break
+        if root is None:
+            if not strategy.fallback:
+                return iter(())
+            root = document
+        for selector in strategy.drop:
+            skipped.update(self._xpath(selector)(root))
+        return (text.strip() for text in iter_text(root, skipped) if not text.isspace())
+
+def iter_text(root, skipped) -> Iterator[str]:
+    """Textes d'un sous-arbre lxml dans l'ordre du document, sans les éléments
+    de `skipped` (leur texte de queue est conservé) ni les commentaires"""
+    if root.text:
+        yield root.text
+    stack = [(None, iter(root))]
+    while stack:
+        for child in stack[-1][1]:
+            if isinstance(child.tag, str) and child not in skipped:
+                if child.text:
+                    yield child.text
+                stack.append((child, iter(child)))
+                break
+            if child.tail:
+                yield child.tail
+        else:
+            element = stack.pop()[0]
+            if element is not None and element.tail:
+                yield element.tail
+
+def make_parser(name: str = HTML_PARSER) -> HtmlParser:
+    if name == "lxml":
+        try:
+            return LxmlParser()
+        except ImportError as e:
+            logger.warning(f"{e} ; repli sur html.parser")
+            return SoupParser()
+    if name == "html.parser":
+        return SoupParser()
+    raise ValueError(f"Analyseur HTML inconnu: {name} (attendu: {', '.join(PARSERS)})")
+
+class Extractor:
+    """Texte utile d'une page : stratégie du domaine appliquée par le moteur configuré"""
+
+    def __init__(self, parser: Optional[HtmlParser] = None):
+        self.parser = parser or make_parser()
+
+    def extract(self, html: str, url: str) -> str:
+        lines = []
+        for text in self.parser.strings(html, strategy_for(url)):
+            for line in text.split('\n'):
+                line = line.strip()
+                if len(line) > MIN_LINE_LENGTH:
+                    lines.append(line)
+        return '\n'.join(lines)
+
+# Instance globale
+extractor = Extractor()
@@ -0,0 +1,86 @@
+import logging
+from typing import Callable, Dict, List, Optional
+from app.config import EMBED_BATCH_SIZE
+from app.services.embeddings import embed, embed_batch
+from app.services.vector_store import vector_store
+from app.services.metrics import stage, CHUNKS
+
+logger = logging.getLogger(__name__)
+
+class BatchIndexer:
+    """Accumule les chunks et les indexe par lots (un seul encode + un seul add FAISS par lot)"""
+
+    def __init__(self, batch_size: Optional[int] = None):
+        self.batch_size = max(1, batch_size or EMBED_BATCH_SIZE)
+        self.pending_texts: List[str] = []
+        self.pending_metadata: List[Dict] = []
+        # Vecteur déjà connu (chunk identique réutilisé) ou None à calculer
+        self.pending_vectors: List[Optional[List[float]]] = []
+        # Nombre de chunks indexés (ou en échec) par URL
+        self.counts: Dict[str, int] = {}
+        self.failed: Dict[str, int] = {}
+        # Actions en attente de l'indexation des chunks déjà ajoutés
+        self.pending_callbacks: List[Callable[[], None]] = []
+
+    def add(self, text: str, metadata: Dict, vector: Optional[List[float]] = None):
+        self.pending_texts.append(text)
+        self.pending_metadata.append(metadata)
+        self.pending_vectors.append(vector)
+        if len(self.pending_texts) >= self.batch_size:
+            self.flush()
+
+    def after_flush(self, callback: Callable[[], None]):
+        """Appeler `callback` une fois indexés les chunks déjà ajoutés (tout de suite s'il n'y en a aucun)"""
+        if self.pending_texts:
+            self.pending_callbacks.append(callback)
+        else:
+            callback()
+
+    def flush(self) -> int:
+        """Indexer le lot en attente, retourne le nombre de chunks ajoutés"""
+        if not self.pending_texts:
+            return 0
+
+        texts, metadatas, vectors = self.pending_texts, self.pending_metadata, self.pending_vectors
+        self.pending_texts, self.pending_metadata, self.pending_vectors = [], [], []
+        callbacks, self.pending_callbacks = self.pending_callbacks, []
+        added = self._add(texts, metadatas, vectors)
+        for callback in callbacks:
+            callback()
+        return added
+
+    def _add(self, texts: List[str], metadatas: List[Dict], vectors: List[Optional[List[float]]]) -> int:
+
+        try:
+            # N'encoder que les chunks sans vecteur connu
+            missing = [i for i, vector in enumerate(vectors) if vector is None]
+            embedded = embed_batch([texts[i] for i in missing], batch_size=self.batch_size)
+            vectors = list(vectors)
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+            with stage("index_add"):
+                vector_store.add_documents(vectors, texts, metadatas)
+            for metadata in metadatas:
+                self._count(metadata)
+            return len(texts)
+        except Exception as e:
+            logger.error(f"Erreur sur le lot de {len(texts)} chunks, reprise chunk par chunk: {e}")
+
+        # Isoler les chunks fautifs
+        added = 0
+        for text, metadata, vector in zip(texts, metadatas, vectors):
+            try:
+                vector_store.add_vector(vector if vector is not None else embed(text), text, metadata)
+                self._count(metadata)
+                added += 1
+            except Exception as e:
+                logger.error(f"Erreur sur chunk {metadata.get('chunk_index')} de {metadata.get('url')}: {e}")
+                url = metadata.get("url")
+                self.failed[url] = self.failed.get(url, 0) + 1
+                CHUNKS.inc(result="failed")
+        return added
+
+    def _count(self, metadata: Dict):
+        url = metadata.get("url")
+        self.counts[url] = self.counts.get(url, 0) + 1
+        CHUNKS.inc(result="added")
@@ -0,0 +1,326 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional
+from app.config import (
+    INGEST_WORKERS,
+    INGEST_QUEUE_SIZE,
+    INGEST_MAX_JOBS_KEPT,
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    CHUNK_MAX_TOKENS,
+)
+from app.services.scraper import fetch_page
+from app.services.cleaner import iter_clean_lines, content_hash
+from app.services.chunker import iter_chunks, token_counter
+from app.services.embeddings import get_model
+from app.services.indexer import BatchIndexer
+from app.services.vector_store import vector_store
+from app.services.sources import source_registry
+from app.services.warmup import warmup
+from app.services.executor import run_inference
+from app.services.metrics import stage, TimedIterator, CHUNKS, PAGES, IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+# Statuts terminaux d'un job
+FINISHED = {"completed", "cancelled", "failed"}
+
+class IngestJob:
+    """Un job d'ingestion et sa progression URL par URL"""
+
+    def __init__(self, urls: List[str]):
+        self.id = uuid.uuid4().hex
+        self.urls = list(dict.fromkeys(urls))
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.indexer = BatchIndexer()
+        self.progress: Dict[str, Dict] = {
+            url: {"url": url, "status": "pending"} for url in urls
+        }
+        self.errors: List[Dict] = []
+        # Nombre de chunks remplacés lors des réingestions
+        self.deleted = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def fail_url(self, url: str, reason: str):
+        self.progress[url].update({"status": "failed", "reason": reason})
+        self.errors.append({"url": url, "reason": reason})
+        PAGES.inc(result="failed")
+
+    def to_dict(self) -> Dict:
+        # Les compteurs de l'indexeur sont mis à jour à chaque lot
+        results = []
+        for url in self.urls:
+            entry = dict(self.progress[url])
+            if entry["status"] in ("indexing", "success"):
+                entry["chunks_added"] = self.indexer.counts.get(url, 0)
+            results.append(entry)
+
+        chunks_added = sum(self.indexer.counts.values())
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        done = len([r for r in results if r["status"] in ("success", "failed")])
+
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "results": results,
+            "errors": self.errors,
+            "total_urls": len(self.urls),
+            "processed_urls": done,
+            "successful": len([r for r in results if r["status"] == "success"]),
+            "chunks_added": chunks_added,
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput": {
+                "urls_per_second": round(done / elapsed, 3) if elapsed else 0.0,
+                "chunks_per_second": round(chunks_added / elapsed, 3) if elapsed else 0.0
+            },
+            "total_vectors": vector_store.count
+        }
+
+class JobManager:
+    """File de jobs d'ingestion traitée par un pool borné de workers"""
+
+    def __init__(self, workers: int = INGEST_WORKERS, max_jobs_kept: int = INGEST_MAX_JOBS_KEPT):
+        self.workers = max(1, workers)
+        self.max_jobs_kept = max_jobs_kept
+        self.jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._count_tokens: Optional[Callable[[str], int]] = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for job in self.jobs.values():
+            if job.status not in FINISHED:
+                self.cancel(job.id)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, urls: List[str]) -> IngestJob:
+        job = IngestJob(urls)
+        self.jobs[job.id] = job
+        self._prune()
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[IngestJob]:
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        if job.task is not None:
+            job.status = "cancelling"
+            job.task.cancel()
+        else:
+            # Pas encore démarré : le worker l'ignorera
+            self._finish(job, "cancelled")
+        return job
+
+    def _prune(self):
+        # Oublier les plus anciens jobs terminés
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED]
+        while len(self.jobs) > self.max_jobs_kept and finished:
+            del self.jobs[finished.pop(0)]
+
+    def _finish(self, job: IngestJob, status: str):
+        job.status = status
+        job.finished_at = time.time()
+        for entry in job.progress.values():
+            if entry["status"] not in ("success", "failed"):
+                entry["status"] = "cancelled" if status == "cancelled" else "failed"
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status == "queued":
+                    job.task = asyncio.create_task(self._run(job))
+                    with IN_FLIGHT.track(operation="ingest_job"):
+                        await asyncio.wait([job.task])
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: IngestJob):
+        # L'index doit être chargé avant toute écriture
+        await warmup.wait()
+        job.status = "running"
+        job.started_at = time.time()
+        # File bornée entre le scraping et le traitement
+        pages: asyncio.Queue = asyncio.Queue(maxsize=INGEST_QUEUE_SIZE)
+
+        async def fetch(url: str):
+            job.progress[url]["status"] = "fetching"
+            # Requête conditionnelle seulement si la page a encore des chunks dans la base :
+            # sinon un 304 ne laisserait rien à indexer
+            known = bool(await asyncio.to_thread(vector_store.ids_for_url, url))
+            source = source_registry.get(url) if known else {}
+            page = await fetch_page(url, source.get("etag"), source.get("last_modified"))
+            await pages.put((url, page))
+
+        async def produce():
+            await asyncio.gather(*(fetch(url) for url in job.urls))
+            await pages.put(None)
+
+        producer = asyncio.create_task(produce())
+        # Traitement en cours dans un thread : attendu avant la sauvegarde, même après une annulation
+        current: Optional[asyncio.Future] = None
+        try:
+            while True:
+                item = await pages.get()
+                if item is None:
+                    break
+                url, page = item
+                # Nettoyage, découpage et embedding hors de la boucle d'événements
+                current = asyncio.ensure_future(run_inference(self._process, job, url, page))
+                await asyncio.shield(current)
+
+            # Indexer le dernier lot
+            current = asyncio.ensure_future(run_inference(job.indexer.flush))
+            await asyncio.shield(current)
+            for entry in job.progress.values():
+                if entry["status"] == "indexing":
+                    entry["status"] = "success"
+            self._finish(job, "completed")
+        except asyncio.CancelledError:
+            # Les chunks déjà indexés sont conservés
+            self._finish(job, "cancelled")
+        except Exception as e:
+            logger.error(f"Erreur sur le job {job.id}: {e}")
+            job.errors.append({"url": None, "reason": str(e)})
+            self._finish(job, "failed")
+        finally:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+            if current is not None:
+                await asyncio.gather(current, return_exceptions=True)
+            if job.indexer.counts or job.deleted:
+                with stage("save"):
+                    await asyncio.to_thread(vector_store.save)
+            await asyncio.to_thread(source_registry.save)
+            logger.info(f"Job {job.id} terminé: {job.status}")
+
+    def _process(self, job: IngestJob, url: str, page: Dict):
+        try:
+            logger.info(f"Traitement de l'URL: {url}")
+
+            source = source_registry.get(url)
+            known = bool(vector_store.ids_for_url(url))
+
+            # Page inchangée (304) : rien à faire
+            if page["not_modified"] and known:
+                job.progress[url].update({"status": "success", "unchanged": True})
+                PAGES.inc(result="unchanged")
+                source_registry.update(url)
+                return
+
+            text = page["text"]
+            if not text or len(text.strip()) < 50:
+                job.fail_url(url, "Contenu insuffisant")
+                return
+
+            page_hash = content_hash(text)
+            if known and source.get("content_hash") == page_hash:
+                job.progress[url].update({"status": "success", "unchanged": True})
+                PAGES.inc(result="unchanged")
+                source_registry.update(url, etag=page["etag"], last_modified=page["last_modified"])
+                return
+
+            job.progress[url]["status"] = "processing"
+
+            # Chunks déjà présents pour cette URL : conservés tels quels
+            old_ids: Dict[str, int] = {}
+            stale: List[int] = []
+            for i in vector_store.ids_for_url(url):
+                h = vector_store.metadata[i].get("hash") or content_hash(vector_store.chunks[i])
+                if h in old_ids:
+                    # Doublon laissé par une ingestion précédente
+                    stale.append(i)
+                else:
+                    old_ids[h] = i
+
+            job.progress[url].update({"status": "indexing", "total_chars": len(text)})
+            # Nettoyage et découpage au fil de l'eau : ni texte nettoyé ni liste de chunks en mémoire
+            new_hashes = set()
+            skipped = 0
+            count = 0
+            for i, chunk in enumerate(self._chunks(text)):
+                if job.status != "running":
+                    return
+                count += 1
+                h = content_hash(chunk["text"])
+                if h in old_ids or h in new_hashes:
+                    new_hashes.add(h)
+                    skipped += 1
+                    continue
+                new_hashes.add(h)
+
+                # Contenu identique ailleurs dans la base : réutiliser son vecteur
+                existing = vector_store.find_hash(h)
+                vector = vector_store.get_vector(existing) if existing is not None else None
+                job.indexer.add(chunk["text"], {
+                    "url": url,
+                    "chunk_index": i,
+                    "char_count": len(chunk["text"]),
+                    "char_start": chunk["start"],
+                    "char_end": chunk["end"],
+                    "hash": h
+                }, vector)
+            logger.info(f"{url}: {len(text)} caractères, {count} chunks")
+            job.progress[url]["chunks_skipped"] = skipped
+            CHUNKS.inc(skipped, result="skipped")
+
+            # Les anciens chunks absents de la nouvelle version sont supprimés
+            stale += [i for h, i in old_ids.items() if h not in new_hashes]
+            job.indexer.after_flush(lambda: self._replace(job, url, page, page_hash, stale))
+        except Exception as e:
+            logger.error(f"Erreur sur l'URL {url}: {e}")
+            job.fail_url(url, str(e))
+
+    def _replace(self, job: IngestJob, url: str, page: Dict, page_hash: str, stale: List[int]):
+        """Une fois les nouveaux chunks indexés : supprimer les anciens et enregistrer la version.
+        Un job annulé ou un lot en échec laisse l'ancienne version en place, réingérée au prochain passage"""
+        try:
+            if job.indexer.failed.get(url):
+                job.fail_url(url, f"{job.indexer.failed[url]} chunks non indexés")
+                return
+            deleted = vector_store.delete(stale)
+            job.deleted += deleted
+            job.progress[url]["chunks_deleted"] = deleted
+            CHUNKS.inc(deleted, result="deleted")
+            PAGES.inc(result="indexed")
+            source_registry.update(url, etag=page["etag"], last_modified=page["last_modified"],
+                                   content_hash=page_hash, ingested_at=time.time())
+        except Exception as e:
+            logger.error(f"Erreur sur l'URL {url}: {e}")
+            job.fail_url(url, str(e))
+
+    def _chunks(self, text: str) -> Iterator[Dict]:
+        """Chunks du texte extrait, limités à la fenêtre du modèle si possible"""
+        model = get_model()
+        limit = model.max_seq_length if CHUNK_MAX_TOKENS == 0 else CHUNK_MAX_TOKENS
+        count_tokens = None
+        if limit > 0 and model.tokenizer is not None:
+            if self._count_tokens is None:
+                self._count_tokens = token_counter(model.tokenizer)
+            count_tokens = self._count_tokens
+        # Étapes au fil de l'eau : le temps de nettoyage est déduit de celui du découpage
+        lines = TimedIterator(iter_clean_lines(text), "clean")
+        # [CLS] et [SEP] occupent deux places de la fenêtre
+        chunks = iter_chunks(text, lines, CHUNK_SIZE, CHUNK_OVERLAP, limit - 2, count_tokens)
+        return TimedIterator(chunks, "chunk", inner=lines)
+
+# Instance globale
+job_manager = JobManager()
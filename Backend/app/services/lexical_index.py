@@ -0,0 +1,85 @@
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Container, Dict, List, Optional, Tuple
+from app.config import BM25_K1, BM25_B
+
+TOKEN_RE = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    """Mots en minuscules, sans accents (les codes et nombres sont gardés)"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [token for token in TOKEN_RE.findall(text) if len(token) > 1 or token.isdigit()]
+
+class BM25Index:
+    """Index inversé (terme -> {id du chunk: fréquence}) avec score BM25.
+
+    Mis à jour à chaque ajout / suppression de chunk, sans reconstruction."""
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.total_length = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, doc_id: int, text: str):
+        terms = Counter(tokenize(text))
+        with self.lock:
+            if doc_id in self.doc_lengths:
+                return
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+            length = sum(terms.values())
+            self.doc_lengths[doc_id] = length
+            self.total_length += length
+
+    def remove(self, doc_id: int, text: str):
+        with self.lock:
+            length = self.doc_lengths.pop(doc_id, None)
+            if length is None:
+                return
+            self.total_length -= length
+            for term in set(tokenize(text)):
+                docs = self.postings.get(term)
+                if docs is not None:
+                    docs.pop(doc_id, None)
+                    if not docs:
+                        del self.postings[term]
+
+    def search(self, query: str, k: int = 10, allowed: Optional[Container[int]] = None) -> List[Tuple[int, float]]:
+        """Les k meilleurs (id, score) pour la requête, parmi les ids de `allowed` si donné"""
+        terms = set(tokenize(query))
+        scores: Dict[int, float] = {}
+        with self.lock:
+            n = len(self.doc_lengths)
+            if n == 0 or not terms:
+                return []
+            average = self.total_length / n or 1.0
+            for term in terms:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    if allowed is not None and doc_id not in allowed:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / average)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """Fusionner plusieurs classements d'ids : score = somme des 1 / (k + rang)"""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,129 @@
+import bisect
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+import faiss
+import numpy as np
+
+def domain_of(url: Optional[str]) -> str:
+    return (urlparse(url or "").hostname or "").lower()
+
+class MetadataIndex:
+    """Ids des chunks vivants par hash du contenu, URL, domaine, et par date d'ajout.
+
+    Les ids sont attribués dans l'ordre d'ajout : une période d'ingestion correspond
+    à un intervalle d'ids. Seuls les points où la date maximale progresse sont gardés,
+    l'intervalle se retrouve par dichotomie."""
+
+    def __init__(self):
+        self.by_hash: Dict[str, Set[int]] = {}
+        self.by_url: Dict[Optional[str], Set[int]] = {}
+        self.by_domain: Dict[str, Set[int]] = {}
+        self._times: List[float] = []
+        self._time_ids: List[int] = []
+
+    def add(self, i: int, h: str, metadata: Dict):
+        url = metadata.get("url")
+        self.by_hash.setdefault(h, set()).add(i)
+        self.by_url.setdefault(url, set()).add(i)
+        self.by_domain.setdefault(domain_of(url), set()).add(i)
+        # Chunks ajoutés avant le suivi des dates : date 0
+        t = metadata.get("ingested_at") or 0
+        if not self._times or t > self._times[-1]:
+            self._times.append(t)
+            self._time_ids.append(i)
+
+    def remove(self, i: int, h: str, metadata: Dict):
+        url = metadata.get("url")
+        for lookup, key in ((self.by_hash, h), (self.by_url, url), (self.by_domain, domain_of(url))):
+            ids = lookup.get(key)
+            if ids is not None:
+                ids.discard(i)
+                if not ids:
+                    del lookup[key]
+
+    def find_hash(self, h: str) -> Optional[int]:
+        ids = self.by_hash.get(h)
+        return min(ids) if ids else None
+
+    def ids_for_url(self, url: str) -> List[int]:
+        return sorted(self.by_url.get(url, ()))
+
+    def domains(self, domain: str) -> List[str]:
+        """Domaines indexés égaux à `domain` ou sous-domaines (fr.wikipedia.org pour wikipedia.org)"""
+        domain = domain.lower().strip(".")
+        return [d for d in self.by_domain if d == domain or d.endswith("." + domain)]
+
+    def id_range(self, since: Optional[float], until: Optional[float], end: int) -> Tuple[int, int]:
+        """Intervalle [début, fin) des ids ajoutés entre `since` et `until`"""
+        lo, hi = 0, end
+        if since is not None:
+            j = bisect.bisect_left(self._times, since)
+            lo = self._time_ids[j] if j < len(self._times) else end
+        if until is not None:
+            j = bisect.bisect_right(self._times, until)
+            hi = self._time_ids[j] if j < len(self._times) else end
+        return lo, max(lo, hi)
+
+    def resolve(self, filter: Dict, end: int) -> "IdFilter":
+        """Filtre {urls, domains, since, until} -> ids autorisés. URLs et domaines
+        s'additionnent ; la période restreint le résultat"""
+        urls, domains = filter.get("urls") or [], filter.get("domains") or []
+        lo, hi = self.id_range(filter.get("since"), filter.get("until"), end)
+        if not urls and not domains:
+            return IdFilter(lo=lo, hi=hi)
+        sets = [self.by_url.get(url, ()) for url in urls]
+        sets += [self.by_domain[d] for domain in domains for d in self.domains(domain)]
+        ids = np.fromiter(set().union(*sets), dtype="int64")
+        ids.sort()
+        return IdFilter(ids[(ids >= lo) & (ids < hi)])
+
+    def url_stats(self, domain: Optional[str] = None) -> List[Dict]:
+        """Nombre de chunks vivants par URL, sans lire les métadonnées"""
+        urls: Iterable = self.by_url.items()
+        if domain is not None:
+            matching = set(self.domains(domain))
+            urls = ((url, ids) for url, ids in urls if domain_of(url) in matching)
+        return [{"url": url, "domain": domain_of(url), "chunks": len(ids)} for url, ids in urls if url is not None]
+
+class IdFilter:
+    """Ids autorisés : liste explicite triée (URLs, domaines) ou intervalle [lo, hi) (dates)"""
+
+    def __init__(self, ids: Optional[np.ndarray] = None, lo: int = 0, hi: int = 0):
+        self.ids = ids
+        self.lo = lo
+        self.hi = hi
+        self._set: Optional[Set[int]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids) if self.ids is not None else self.hi - self.lo
+
+    def __contains__(self, i: int) -> bool:
+        if self.ids is None:
+            return self.lo <= i < self.hi
+        if self._set is None:
+            self._set = set(self.ids.tolist())
+        return i in self._set
+
+    def mask(self, indices: np.ndarray) -> np.ndarray:
+        if self.ids is None:
+            return (indices >= self.lo) & (indices < self.hi)
+        return np.isin(indices, self.ids)
+
+    def selector(self, ntotal: int, exclude=None):
+        """Sélecteur FAISS (ids < ntotal) ; `exclude` : sélecteur des ids supprimés à écarter"""
+        if self.ids is None:
+            selector = faiss.IDSelectorRange(self.lo, min(self.hi, ntotal))
+            if exclude is not None:
+                combined = faiss.IDSelectorAnd(selector, exclude)
+                # Garder des références : le sélecteur C++ ne possède pas ses membres
+                combined.referenced = (selector, exclude)
+                selector = combined
+            return selector
+        # Bitmap plutôt qu'un ensemble haché : construit en une opération numpy,
+        # quel que soit le nombre d'ids. Les ids d'une URL ou d'un domaine sont vivants.
+        bits = np.zeros(ntotal, dtype=bool)
+        bits[self.ids[self.ids < ntotal]] = True
+        bitmap = np.packbits(bits, bitorder="little")
+        selector = faiss.IDSelectorBitmap(ntotal, faiss.swig_ptr(bitmap))
+        selector.referenced = bitmap
+        return selector
@@ -0,0 +1,203 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Bornes (secondes) des histogrammes de durée : de la recherche FAISS à l'appel LLM
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Metric:
+    """Série nommée, éventuellement découpée par étiquettes (format texte Prometheus)"""
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+class Counter(Metric):
+    """Valeur cumulée ; `func` la lit au moment de l'export (compteurs déjà tenus ailleurs)"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (),
+                 func: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, help, labels)
+        self.func = func
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        if self.func is not None:
+            try:
+                values = self.func()
+            except Exception:
+                return []
+            with self.lock:
+                self._values = {key if isinstance(key, tuple) else (key,): value for key, value in values.items()}
+        with self.lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}" for key, value in items]
+
+class Gauge(Counter):
+    """Valeur instantanée"""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """Opérations en cours pendant le bloc"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # étiquettes -> (effectifs par borne, somme, nombre)
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if position < len(self.buckets):
+                entry[0][position] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            items = sorted((key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+# Instance globale
+registry = Registry()
+
+# Durée de chaque étape : fetch, extract, clean, chunk, embed, index_add, save, search, llm
+STAGE_SECONDS = registry.register(Histogram(
+    "rag_stage_duration_seconds", "Durée des étapes du pipeline RAG", ["stage"]))
+HTTP_SECONDS = registry.register(Histogram(
+    "rag_http_request_duration_seconds", "Durée des requêtes HTTP", ["method", "route", "status"]))
+CHUNKS = registry.register(Counter(
+    "rag_ingest_chunks_total", "Chunks traités à l'ingestion", ["result"]))
+PAGES = registry.register(Counter(
+    "rag_ingest_pages_total", "Pages traitées à l'ingestion", ["result"]))
+ERRORS = registry.register(Counter(
+    "rag_errors_total", "Erreurs par étape", ["stage"]))
+CONTEXT_REUSED = registry.register(Counter(
+    "rag_context_reused_total", "Questions de suite répondues avec les chunks du tour précédent"))
+IN_FLIGHT = registry.register(Gauge(
+    "rag_in_flight", "Opérations en cours", ["operation"]))
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Chronométrer une étape ; une exception est comptée comme erreur de l'étape"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ERRORS.inc(stage=name)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+
+class TimedIterator:
+    """Temps passé à produire les éléments d'un générateur (étapes au fil de l'eau),
+    enregistré une fois l'itération terminée. Le temps de `inner` (générateur
+    consommé par celui-ci) est déduit pour ne compter que cette étape."""
+
+    def __init__(self, iterable: Iterable, name: str, inner: Optional["TimedIterator"] = None):
+        self._iterator = iter(iterable)
+        self.name = name
+        self.inner = inner
+        self.elapsed = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            self.elapsed += time.perf_counter() - start
+            start = None
+            STAGE_SECONDS.observe(self.elapsed - (self.inner.elapsed if self.inner else 0.0), stage=self.name)
+            raise
+        finally:
+            if start is not None:
+                self.elapsed += time.perf_counter() - start
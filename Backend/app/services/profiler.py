@@ -0,0 +1,84 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+from app.config import PROFILING_ENABLED, PROFILE_INTERVAL_MS, PROFILE_DIR
+
+class SamplingProfiler:
+    """Échantillonneur de piles : toutes les `interval` secondes, relève la pile de
+    chaque thread du processus (boucle d'événements et pool d'inférence compris).
+
+    Le résultat est au format « piles repliées » (une pile par ligne, suivie du
+    nombre d'échantillons), lisible par flamegraph.pl ou speedscope."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident not in names:
+                    # Nom du thread sans son numéro : les threads d'un même pool sont regroupés
+                    names.update({t.ident: re.sub(r"[-_]?\d+$", "", t.name) for t in threading.enumerate()})
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, "thread"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def save(self, label: str, directory: str = PROFILE_DIR) -> str:
+        os.makedirs(directory, exist_ok=True)
+        name = re.sub(r"[^\w.-]+", "_", label).strip("_") or "request"
+        path = os.path.join(directory, f"{int(time.time() * 1000)}-{name}.folded")
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+        return path
+
+# Un seul profil à la fois : l'échantillonnage voit tous les threads du processus
+_profile_lock = threading.Lock()
+
+def profiling_requested(headers, query_params) -> bool:
+    """Profil demandé pour cette requête (en-tête X-Profile: 1 ou ?profile=1), si activé"""
+    if not PROFILING_ENABLED:
+        return False
+    return headers.get("x-profile") == "1" or query_params.get("profile") == "1"
+
+def try_start() -> Optional[SamplingProfiler]:
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    profiler = SamplingProfiler()
+    profiler.start()
+    return profiler
+
+def finish(profiler: SamplingProfiler, label: str) -> str:
+    try:
+        profiler.stop()
+        return profiler.save(label)
+    finally:
+        _profile_lock.release()
@@ -1,35 +1,41 @@
-from typing import List
-from app.services.embeddings import embed
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Union
+from app.services.embeddings import embed_batch, query_batcher
 from app.services.vector_store import vector_store
-from app.config import GEMINI_API_KEY
+from app.services.executor import run_inference
+from app.services.answer_cache import answer_cache
+from app.services.warmup import warmup
+from app.services.conversation import conversation_manager
+from app.services.metrics import stage, CONTEXT_REUSED, IN_FLIGHT
+from app.config import GEMINI_API_KEY, RETRIEVAL_MODE, ASK_BATCH_CONCURRENCY, CONVERSATION_REUSE_MIN_SCORE
 
-def answer_question(question: str) -> str:
-    # 1. Embedding de la question
-    try:
-        question_vector = embed(question)
-    except Exception as e:
-        return f"Erreur d'embedding: {str(e)}"
-    
-    # 2. Recherche dans la base vectorielle
-    try:
-        relevant_chunks = vector_store.search_vector(question_vector, k=5)
-    except Exception as e:
-        return f"Erreur de recherche: {str(e)}"
-    
-    if not relevant_chunks:
-        return "Je n'ai pas d'information sur ce sujet dans ma base de connaissances."
-    
-    # 3. Préparer le contexte
-    context = "\n\n".join(relevant_chunks[:3])  # Limiter à 3 chunks
-    
-    # 4. Utiliser Gemini si disponible
-    if GEMINI_API_KEY and GEMINI_API_KEY != "PUT_YOUR_KEY_HERE":
-        try:
-            from google import genai
-            
-            client = genai.Client(api_key=GEMINI_API_KEY)
-            
-            prompt = f"""Tu es un assistant IA qui répond aux questions en utilisant uniquement le contexte fourni.
+# Client Gemini partagé
+_client = None
+
+def get_client():
+    """Singleton pour le client Gemini"""
+    global _client
+    if _client is None:
+        from google import genai
+        _client = genai.Client(api_key=GEMINI_API_KEY)
+    return _client
+
+def llm_enabled() -> bool:
+    return bool(GEMINI_API_KEY and GEMINI_API_KEY != "PUT_YOUR_KEY_HERE")
+
+async def stream_llm(prompt: str) -> AsyncIterator[str]:
+    """Morceaux de texte générés par Gemini, au fil de l'eau"""
+    client = get_client()
+    stream = await client.aio.models.generate_content_stream(
+        model="gemini-2.5-flash",
+        contents=prompt
+    )
+    async for chunk in stream:
+        if chunk.text:
+            yield chunk.text
+
+def build_prompt(context: str, question: str) -> str:
+    return f"""Tu es un assistant IA qui répond aux questions en utilisant uniquement le contexte fourni.
 
 CONTEXTE:
 {context}
@@ -42,19 +48,219 @@ INSTRUCTIONS:
 3. Sois précis et concis
 
 RÉPONSE:"""
-            
-            response = client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=prompt
-            )
-            
+
+class RetrievalError(Exception):
+    """Erreur de recherche, avec le message à renvoyer à l'utilisateur"""
+    pass
+
+NO_INFORMATION = "Je n'ai pas d'information sur ce sujet dans ma base de connaissances."
+
+class Retrieval:
+    """Résultat de l'étape de recherche pour une question"""
+
+    def __init__(self, question_vector: List[float], results: List[Dict], reused: bool = False):
+        self.question_vector = question_vector
+        self.results = results
+        # Chunks repris du tour précédent de la conversation
+        self.reused = reused
+        # Limiter à 3 chunks
+        self.used = results[:3]
+        self.context = "\n\n".join(result["text"] for result in self.used)
+        self.chunk_ids = [result["id"] for result in self.used]
+
+    def sources(self) -> List[Dict]:
+        return [{
+            "id": result["id"],
+            "url": result["metadata"].get("url"),
+            "score": result["score"],
+            "excerpt": result["text"][:200]
+        } for result in self.used]
+
+async def retrieve(question: str, session_id: Optional[str] = None, filter: Optional[Dict] = None) -> Retrieval:
+    """Embedding de la question puis recherche dans la base vectorielle,
+    restreinte aux chunks du filtre (urls, domains, since, until) si donné"""
+    # Requête arrivée avant la fin du préchargement : attendre plutôt que chercher dans une base vide
+    await warmup.wait()
+    # 1. Embedding de la question
+    try:
+        # Les questions concurrentes sont encodées en un seul lot
+        question_vector = await query_batcher.embed(question)
+    except Exception as e:
+        raise RetrievalError(f"Erreur d'embedding: {str(e)}")
+
+    # Question de suite : les chunks du tour précédent suffisent s'ils restent pertinents
+    previous = conversation_manager.last_chunks(session_id) if session_id else []
+    if previous:
+        try:
+            with stage("search"):
+                results = await run_inference(vector_store.rescore, question_vector, previous, filter=filter)
+        except Exception:
+            results = []
+        if results and results[0]["score"] >= CONVERSATION_REUSE_MIN_SCORE:
+            CONTEXT_REUSED.inc()
+            return Retrieval(question_vector, results, reused=True)
+
+    # 2. Recherche dans la base vectorielle
+    try:
+        with stage("search"):
+            if RETRIEVAL_MODE == "hybrid":
+                # Les termes exacts (codes, noms) via BM25, le sens via les vecteurs
+                results = await run_inference(vector_store.hybrid_search, question_vector, question, k=5, filter=filter)
+            else:
+                results = await run_inference(vector_store.search, question_vector, k=5, filter=filter)
+    except Exception as e:
+        raise RetrievalError(f"Erreur de recherche: {str(e)}")
+
+    if not results:
+        raise RetrievalError(NO_INFORMATION)
+
+    return Retrieval(question_vector, results)
+
+async def retrieve_many(questions: List[str], filter: Optional[Dict] = None) -> List[Union[Retrieval, RetrievalError]]:
+    """Recherche de plusieurs questions : un seul lot d'embeddings, une seule recherche FAISS"""
+    if not questions:
+        return []
+    await warmup.wait()
+
+    try:
+        question_vectors = await run_inference(embed_batch, questions)
+    except Exception as e:
+        return [RetrievalError(f"Erreur d'embedding: {str(e)}") for _ in questions]
+
+    try:
+        with stage("search"):
+            if RETRIEVAL_MODE == "hybrid":
+                all_results = await run_inference(vector_store.hybrid_search_many, question_vectors, questions, k=5, filter=filter)
+            else:
+                all_results = await run_inference(vector_store.search_many, question_vectors, k=5, filter=filter)
+    except Exception as e:
+        return [RetrievalError(f"Erreur de recherche: {str(e)}") for _ in questions]
+
+    return [
+        Retrieval(vector, results) if results else RetrievalError(NO_INFORMATION)
+        for vector, results in zip(question_vectors, all_results)
+    ]
+
+def fallback_answer(context: str, limit: int = 1000) -> str:
+    return f"Contexte pertinent trouvé:\n\n{context[:limit]}..."
+
+async def answer_question(question: str, session_id: Optional[str] = None, filter: Optional[Dict] = None) -> Dict:
+    """Réponse à une question ; avec `session_id`, le tour est gardé pour la question suivante"""
+    try:
+        retrieval = await retrieve(question, session_id, filter)
+    except RetrievalError as e:
+        return {"answer": str(e), "context_reused": False}
+
+    answer = await generate_answer(retrieval, question)
+    if session_id:
+        conversation_manager.add_turn(session_id, question, answer, retrieval.chunk_ids, retrieval.reused)
+    return {"answer": answer, "context_reused": retrieval.reused}
+
+async def generate_answer(retrieval: Retrieval, question: str) -> str:
+    """Réponse à partir du contexte trouvé (cache, Gemini ou contexte brut)"""
+    # Utiliser Gemini si disponible
+    if llm_enabled():
+        # Question proche déjà posée sur les mêmes chunks
+        cached = answer_cache.get(retrieval.chunk_ids, retrieval.question_vector)
+        if cached is not None:
+            return cached
+
+        try:
+            client = get_client()
+
+            # Appel asynchrone : la boucle d'événements reste libre
+            with stage("llm"), IN_FLIGHT.track(operation="llm"):
+                response = await client.aio.models.generate_content(
+                    model="gemini-2.5-flash",
+                    contents=build_prompt(retrieval.context, question)
+                )
+
+            answer_cache.put(retrieval.chunk_ids, retrieval.question_vector, response.text)
             return response.text
-            
+
         except ImportError:
             # Fallback sans Gemini
-            return f"Contexte pertinent trouvé:\n\n{context[:500]}..."
+            return fallback_answer(retrieval.context, 500)
         except Exception as e:
-            return f"Erreur Gemini: {str(e)}\n\nContexte: {context[:500]}..."
-    
+            return f"Erreur Gemini: {str(e)}\n\nContexte: {retrieval.context[:500]}..."
+
     # Fallback sans Gemini
-    return f"Contexte pertinent trouvé:\n\n{context[:1000]}..."
\ No newline at end of file
+    return fallback_answer(retrieval.context)
+
+async def answer_many(questions: List[str], concurrency: int = ASK_BATCH_CONCURRENCY,
+                      filter: Optional[Dict] = None) -> List[Dict]:
+    """Répondre à un lot de questions, avec au plus `concurrency` appels au LLM en parallèle"""
+    retrievals = await retrieve_many(questions, filter)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def answer_one(question: str, retrieval: Union[Retrieval, RetrievalError]) -> Dict:
+        if isinstance(retrieval, RetrievalError):
+            return {"question": question, "answer": str(retrieval), "sources": [], "status": "success"}
+        try:
+            async with semaphore:
+                answer = await generate_answer(retrieval, question)
+        except Exception as e:
+            return {"question": question, "answer": None, "sources": retrieval.sources(), "status": "error", "error": str(e)}
+        return {"question": question, "answer": answer, "sources": retrieval.sources(), "status": "success"}
+
+    return await asyncio.gather(*(answer_one(q, r) for q, r in zip(questions, retrievals)))
+
+def _pieces(text: str, size: int = 40) -> List[str]:
+    # Découper un texte déjà disponible pour le diffuser comme un flux
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+async def stream_answer(question: str, session_id: Optional[str] = None,
+                        filter: Optional[Dict] = None) -> AsyncIterator[Dict]:
+    """Événements de réponse : d'abord les sources, puis le texte au fil de l'eau"""
+    try:
+        retrieval = await retrieve(question, session_id, filter)
+    except RetrievalError as e:
+        yield {"event": "sources", "data": []}
+        yield {"event": "token", "data": str(e)}
+        yield {"event": "done", "data": {"cached": False, "context_reused": False}}
+        return
+
+    yield {"event": "sources", "data": retrieval.sources()}
+    parts: List[str] = []
+    async for event in _stream_text(retrieval, question):
+        if event["event"] == "token":
+            parts.append(event["data"])
+        elif event["event"] == "done":
+            event["data"]["context_reused"] = retrieval.reused
+            if session_id:
+                conversation_manager.add_turn(session_id, question, "".join(parts), retrieval.chunk_ids, retrieval.reused)
+        yield event
+
+async def _stream_text(retrieval: Retrieval, question: str) -> AsyncIterator[Dict]:
+    """Texte de la réponse diffusé par morceaux (cache, Gemini ou contexte brut)"""
+    cached: Optional[str] = None
+    if llm_enabled():
+        cached = answer_cache.get(retrieval.chunk_ids, retrieval.question_vector)
+
+    if cached is not None:
+        for piece in _pieces(cached):
+            yield {"event": "token", "data": piece}
+        yield {"event": "done", "data": {"cached": True}}
+        return
+
+    if llm_enabled():
+        parts: List[str] = []
+        try:
+            with stage("llm"), IN_FLIGHT.track(operation="llm"):
+                async for piece in stream_llm(build_prompt(retrieval.context, question)):
+                    parts.append(piece)
+                    yield {"event": "token", "data": piece}
+        except ImportError:
+            for piece in _pieces(fallback_answer(retrieval.context, 500)):
+                yield {"event": "token", "data": piece}
+        except Exception as e:
+            yield {"event": "error", "data": f"Erreur Gemini: {str(e)}\n\nContexte: {retrieval.context[:500]}..."}
+        else:
+            answer_cache.put(retrieval.chunk_ids, retrieval.question_vector, "".join(parts))
+        yield {"event": "done", "data": {"cached": False}}
+        return
+
+    # Fallback sans Gemini, diffusé de la même façon
+    for piece in _pieces(fallback_answer(retrieval.context)):
+        yield {"event": "token", "data": piece}
+    yield {"event": "done", "data": {"cached": False}}
@@ -1,49 +1,146 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import charset_normalizer
+import httpx
 import logging
 from urllib.parse import urlparse
 import time
+from typing import Dict, Optional
+from app.config import (
+    SCRAPER_MAX_CONCURRENCY,
+    SCRAPER_HOST_DELAY,
+    SCRAPER_MAX_RETRIES,
+    SCRAPER_TIMEOUT,
+)
+from app.services.extraction import extractor
+from app.services.metrics import stage
 
 logger = logging.getLogger(__name__)
 
-def fetch_text(url: str) -> str:
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+# Codes HTTP pour lesquels on réessaie
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class Fetcher:
+    """Client HTTP partagé : pool de connexions, limite globale de concurrence,
+    délai minimal entre deux requêtes vers un même hôte et retries avec backoff"""
+
+    def __init__(self, max_concurrency: int = SCRAPER_MAX_CONCURRENCY,
+                 host_delay: float = SCRAPER_HOST_DELAY,
+                 max_retries: int = SCRAPER_MAX_RETRIES,
+                 timeout: float = SCRAPER_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.host_delay = host_delay
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._loop = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+        self._host_last: Dict[str, float] = {}
+
+    def _ensure_loop(self):
+        # Le client et les primitives asyncio sont liés à la boucle courante
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                headers=HEADERS,
+                timeout=self.timeout,
+                follow_redirects=True,
+                max_redirects=5,
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._host_locks = {}
+
+    async def _acquire(self, host: str):
+        """Politesse : espacer les requêtes vers un même hôte, puis prendre une place
+        dans la limite globale. Le sémaphore n'est pas tenu pendant l'attente de l'hôte"""
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            delay = self._host_last.get(host, 0.0) + self.host_delay - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._semaphore.acquire()
+            self._host_last[host] = time.monotonic()
+
+    async def request(self, method: str, url: str, retries: Optional[int] = None, **kwargs) -> httpx.Response:
+        self._ensure_loop()
+        retries = self.max_retries if retries is None else retries
+        host = urlparse(url).netloc
+
+        attempt = 0
+        while True:
+            await self._acquire(host)
+            try:
+                response = await self._client.request(method, url, **kwargs)
+                if response.status_code not in RETRY_STATUS or attempt >= retries:
+                    return response
+                logger.warning(f"HTTP {response.status_code} pour {url}, tentative {attempt + 1}")
+            except httpx.TransportError as e:
+                if attempt >= retries:
+                    raise
+                logger.warning(f"Erreur réseau pour {url}, tentative {attempt + 1}: {e}")
+            finally:
+                self._semaphore.release()
+
+            # Backoff exponentiel hors du sémaphore
+            await asyncio.sleep(0.5 * (2 ** attempt))
+            attempt += 1
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+# Instance globale
+fetcher = Fetcher()
+
+async def fetch_page(url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Dict:
+    """Récupérer une page, en requête conditionnelle si on connaît son ETag / Last-Modified"""
+    page = {"url": url, "text": "", "not_modified": False, "etag": None, "last_modified": None}
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        }
-        
-        # Délai pour éviter de surcharger les serveurs
-        time.sleep(1)
-        
-        # Gérer les redirections
-        session = requests.Session()
-        session.max_redirects = 5
-        
         # Pour Wikipedia, utiliser l'API est plus fiable
         if 'wikipedia.org' in url:
-            return fetch_wikipedia_content(url, session, headers)
+            with stage("fetch"):
+                page["text"] = await fetch_wikipedia_content(url)
+            return page
         
-        response = session.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
         
-        # Vérifier l'encodage
-        response.encoding = response.apparent_encoding or 'utf-8'
+        with stage("fetch"):
+            response = await fetcher.request("GET", url, headers=headers)
+            if response.status_code != 304:
+                response.raise_for_status()
+        if response.status_code == 304:
+            page.update({"not_modified": True, "etag": etag, "last_modified": last_modified})
+            return page
         
-        return extract_content(response.text, url)
+        page["etag"] = response.headers.get('etag')
+        page["last_modified"] = response.headers.get('last-modified')
+        # Décodage et extraction hors de la boucle d'événements
+        page["text"] = await asyncio.to_thread(extract_response, response, url)
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Erreur de requête pour {url}: {e}")
-        return ""
     except Exception as e:
         logger.error(f"Erreur inattendue pour {url}: {e}")
-        return ""
+    
+    return page
 
-def fetch_wikipedia_content(url: str, session: requests.Session, headers: dict) -> str:
+async def fetch_wikipedia_content(url: str) -> str:
     """Récupérer le contenu de Wikipedia via l'API"""
     try:
         # Extraire le titre de la page Wikipedia
@@ -55,7 +152,7 @@ def fetch_wikipedia_content(url: str, session: requests.Session, headers: dict)
             # Utiliser l'API REST de Wikipedia
             api_url = f"https://fr.wikipedia.org/api/rest_v1/page/summary/{page_title}"
             
-            response = session.get(api_url, headers=headers, timeout=10)
+            response = await fetcher.request("GET", api_url, timeout=10)
             response.raise_for_status()
             
             data = response.json()
@@ -73,48 +170,19 @@ def fetch_wikipedia_content(url: str, session: requests.Session, headers: dict)
     
     # Fallback: scraping normal
     try:
-        response = session.get(url, headers=headers, timeout=10)
+        response = await fetcher.request("GET", url, timeout=10)
         response.raise_for_status()
-        return extract_content(response.text, url)
+        return await asyncio.to_thread(extract_response, response, url)
     except:
         return ""
 
+def extract_response(response: httpx.Response, url: str) -> str:
+    """Décoder la réponse puis en extraire le texte (bloquant)"""
+    # Vérifier l'encodage : le charset annoncé est souvent absent ou faux
+    response.encoding = charset_normalizer.detect(response.content)["encoding"] or "utf-8"
+    return extract_content(response.text, url)
+
 def extract_content(html: str, url: str) -> str:
-    """Extraire le texte utile du HTML"""
-    soup = BeautifulSoup(html, 'html.parser')
-    
-    # Supprimer les éléments inutiles
-    for element in soup(['script', 'style', 'nav', 'footer', 'header', 
-                         'iframe', 'noscript', 'svg', 'img', 'form']):
-        element.decompose()
-    
-    # Stratégie d'extraction selon le site
-    if 'wikipedia.org' in url:
-        # Pour Wikipedia, prendre le contenu principal
-        content_div = soup.find('div', {'id': 'mw-content-text'})
-        if content_div:
-            # Enlever les références
-            for ref in content_div.find_all(class_='reference'):
-                ref.decompose()
-            text = content_div.get_text(separator='\n', strip=True)
-        else:
-            text = soup.get_text(separator='\n', strip=True)
-    
-    elif 'docs.python.org' in url:
-        # Pour la doc Python
-        main_content = soup.find('div', {'role': 'main'}) or soup.find('main')
-        text = main_content.get_text(separator='\n', strip=True) if main_content else ""
-    
-    else:
-        # Stratégie générique
-        main_content = soup.find('main') or soup.find('article') or soup.find('div', class_='content')
-        if main_content:
-            text = main_content.get_text(separator='\n', strip=True)
-        else:
-            text = soup.get_text(separator='\n', strip=True)
-    
-    # Nettoyer le texte
-    lines = [line.strip() for line in text.split('\n') if line.strip()]
-    lines = [line for line in lines if len(line) > 20]  # Enlever les lignes trop courtes
-    
-    return '\n'.join(lines)
\ No newline at end of file
+    """Extraire le texte utile du HTML (stratégie selon le site, voir extraction.py)"""
+    with stage("extract"):
+        return extractor.extract(html, url)
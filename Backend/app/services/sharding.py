@@ -0,0 +1,328 @@
+import atexit
+import hashlib
+import heapq
+import logging
+import multiprocessing
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+import faiss
+import numpy as np
+from app.services.vector_store import VectorStore, fuse_candidates
+from app.config import VECTOR_INDEX_TYPE, HYBRID_CANDIDATES
+
+logger = logging.getLogger(__name__)
+
+def shard_for(url: Optional[str], n_shards: int) -> int:
+    """Shard d'une URL : hash de son domaine (les pages d'un site restent ensemble)"""
+    domain = urlparse(url or "").netloc.lower()
+    digest = hashlib.blake2b(domain.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % n_shards
+
+def _serve(conn, inherited, path: str, dimension: int, index_type: str, threads: int):
+    """Boucle d'un processus shard : exécute les appels reçus sur son VectorStore"""
+    # Fermer les connexions des autres shards héritées du fork
+    for other in inherited:
+        other.close()
+    faiss.omp_set_num_threads(threads)
+    store = VectorStore(dimension, index_type)
+    store.load(path)
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        method, args, kwargs = message
+        try:
+            if method == "chunk":
+                result = store.chunks[args[0]]
+            elif method == "chunk_metadata":
+                result = store.metadata[args[0]]
+            else:
+                result = getattr(store, method)(*args, **kwargs)
+            conn.send(("ok", result))
+        except Exception as e:
+            conn.send(("error", e))
+    conn.close()
+
+class _ShardView:
+    """Vue (len / index par id global) sur les chunks ou métadonnées des shards"""
+
+    def __init__(self, store: "ShardedVectorStore", method: str):
+        self._store = store
+        self._method = method
+
+    def __len__(self) -> int:
+        return self._store.info()["chunks"]
+
+    def __getitem__(self, i: int):
+        shard, local = self._store.split_id(i)
+        return self._store._call(shard, self._method, local)
+
+class ShardedVectorStore:
+    """Base vectorielle répartie sur N processus locaux, un VectorStore par shard.
+
+    Les chunks sont placés selon le hash du domaine de leur URL. Les recherches
+    sont envoyées à tous les shards en parallèle puis les top-k sont fusionnés.
+    Id global = id local * N + numéro du shard."""
+
+    def __init__(self, n_shards: int, path: str = "data/vector_store",
+                 dimension: int = 384, index_type: str = VECTOR_INDEX_TYPE):
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise ValueError("VECTOR_SHARDS > 1 nécessite Linux (processus créés par fork)")
+        self.n_shards = n_shards
+        self.path = path
+        self.dimension = dimension
+        self.index_type = index_type
+        self.chunks = _ShardView(self, "chunk")
+        self.metadata = _ShardView(self, "chunk_metadata")
+        self.delete_listeners: List[Callable[[List[int]], None]] = []
+        self.lock = threading.RLock()
+        self._processes = []
+        self._connections = []
+        # Un seul échange en cours par shard
+        self._locks = [threading.Lock() for _ in range(n_shards)]
+
+    def shard_path(self, shard: int, path: Optional[str] = None) -> str:
+        base = os.path.dirname(path or self.path)
+        return os.path.join(base, "shards", f"{shard}-of-{self.n_shards}", "vector_store")
+
+    def split_id(self, global_id: int):
+        return int(global_id) % self.n_shards, int(global_id) // self.n_shards
+
+    def _global_id(self, shard: int, local_id: int) -> int:
+        return local_id * self.n_shards + shard
+
+    def _start(self):
+        if self._processes:
+            return
+        context = multiprocessing.get_context("fork")
+        # Les cœurs sont partagés entre les shards
+        threads = max(1, (os.cpu_count() or 1) // self.n_shards)
+        for shard in range(self.n_shards):
+            path = self.shard_path(shard)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_serve, args=(child, list(self._connections), path, self.dimension, self.index_type, threads),
+                name=f"vector-shard-{shard}", daemon=True
+            )
+            process.start()
+            child.close()
+            self._processes.append(process)
+            self._connections.append(parent)
+        atexit.register(self.close)
+        logger.info(f"{self.n_shards} shards démarrés")
+
+    def close(self):
+        """Arrêter les processus shards"""
+        for connection, process in zip(self._connections, self._processes):
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(timeout=5)
+            connection.close()
+        self._processes, self._connections = [], []
+
+    def _fan_out(self, method: str, calls: Dict[int, tuple], **kwargs) -> Dict[int, object]:
+        """Envoyer un appel à plusieurs shards puis attendre les réponses (exécution en parallèle)"""
+        self._start()
+        shards = sorted(calls)
+        # Verrous pris dans l'ordre des shards : pas d'interblocage entre threads
+        for shard in shards:
+            self._locks[shard].acquire()
+        try:
+            for shard in shards:
+                self._connections[shard].send((method, calls[shard], kwargs))
+            replies = {}
+            for shard in shards:
+                try:
+                    replies[shard] = self._connections[shard].recv()
+                except EOFError:
+                    replies[shard] = ("error", RuntimeError(f"Shard {shard} arrêté"))
+        finally:
+            for shard in shards:
+                self._locks[shard].release()
+
+        results = {}
+        for shard in shards:
+            status, result = replies[shard]
+            if status == "error":
+                raise result
+            results[shard] = result
+        return results
+
+    def _all(self, method: str, *args, **kwargs) -> Dict[int, object]:
+        return self._fan_out(method, {shard: args for shard in range(self.n_shards)}, **kwargs)
+
+    def _shards_for(self, filter: Optional[Dict]) -> List[int]:
+        """Shards concernés par un filtre : ceux des URLs demandées seulement ;
+        tous dès qu'un domaine est filtré (ses sous-domaines sont placés ailleurs)"""
+        if filter and filter.get("urls") and not filter.get("domains"):
+            return sorted({shard_for(url, self.n_shards) for url in filter["urls"]})
+        return list(range(self.n_shards))
+
+    def _some(self, shards: List[int], method: str, *args, **kwargs) -> Dict[int, object]:
+        return self._fan_out(method, {shard: args for shard in shards}, **kwargs)
+
+    def _call(self, shard: int, method: str, *args, **kwargs):
+        return self._fan_out(method, {shard: args}, **kwargs)[shard]
+
+    def _globalize(self, shard: int, results: List[Dict]) -> List[Dict]:
+        for result in results:
+            result["id"] = self._global_id(shard, result["id"])
+        return results
+
+    # --- Ajouts et suppressions ---
+
+    def add_vector(self, vector: List[float], text: str, metadata: Optional[Dict] = None):
+        shard = shard_for((metadata or {}).get("url"), self.n_shards)
+        self._call(shard, "add_vector", vector, text, metadata)
+
+    def add_documents(self, vectors: List[List[float]], texts: List[str], metadatas: Optional[List[Dict]] = None):
+        if len(vectors) != len(texts):
+            raise ValueError("Nombre de vecteurs et textes doit être égal")
+        metadatas = metadatas or [{} for _ in texts]
+        calls: Dict[int, tuple] = {}
+        for vector, text, metadata in zip(vectors, texts, metadatas):
+            shard = shard_for(metadata.get("url"), self.n_shards)
+            calls.setdefault(shard, ([], [], []))
+            for column, value in zip(calls[shard], (vector, text, metadata)):
+                column.append(value)
+        self._fan_out("add_documents", calls)
+
+    def delete(self, ids: List[int]) -> int:
+        return len(self.delete_ids(ids))
+
+    def delete_ids(self, ids: List[int]) -> List[int]:
+        calls: Dict[int, tuple] = {}
+        for global_id in ids:
+            shard, local = self.split_id(global_id)
+            calls.setdefault(shard, ([],))[0].append(local)
+        if not calls:
+            return []
+        # Seuls les ids réellement supprimés par les shards sont diffusés
+        deleted = [self._global_id(shard, local)
+                   for shard, found in sorted(self._fan_out("delete_ids", calls).items()) for local in found]
+
+        for listener in self.delete_listeners:
+            listener(deleted)
+        return deleted
+
+    def delete_url(self, url: str) -> int:
+        return self.delete(self.ids_for_url(url))
+
+    # --- Lectures ---
+
+    def ids_for_url(self, url: str) -> List[int]:
+        shard = shard_for(url, self.n_shards)
+        return [self._global_id(shard, i) for i in self._call(shard, "ids_for_url", url)]
+
+    def find_hash(self, h: str) -> Optional[int]:
+        # Un contenu identique peut exister sous un autre domaine
+        for shard, found in sorted(self._all("find_hash", h).items()):
+            if found is not None:
+                return self._global_id(shard, found)
+        return None
+
+    def url_stats(self, domain: Optional[str] = None) -> List[Dict]:
+        return [source for _, sources in sorted(self._all("url_stats", domain).items()) for source in sources]
+
+    def get_vector(self, vector_id: int) -> List[float]:
+        shard, local = self.split_id(vector_id)
+        return self._call(shard, "get_vector", local)
+
+    def info(self) -> Dict:
+        shards = [info for _, info in sorted(self._all("info").items())]
+        return {
+            "count": sum(info["count"] for info in shards),
+            "deleted": sum(info["deleted"] for info in shards),
+            "chunks": sum(info["chunks"] for info in shards),
+            "ntotal": sum(info["ntotal"] for info in shards),
+            "index_bytes": sum(info["index_bytes"] for info in shards),
+            "dimension": self.dimension,
+            "index_type": self.index_type,
+            "shards": shards
+        }
+
+    @property
+    def count(self) -> int:
+        return self.info()["count"]
+
+    # --- Recherche ---
+
+    def search(self, query_vector: List[float], k: int = 5,
+               nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+               filter: Optional[Dict] = None) -> List[Dict]:
+        return self.search_many([query_vector], k, nprobe, ef_search, filter)[0]
+
+    def search_many(self, query_vectors, k: int = 5,
+                    nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                    filter: Optional[Dict] = None) -> List[List[Dict]]:
+        """Top-k de chaque shard (filtre appliqué dans chaque shard), fusionnés par distance"""
+        query_np = np.atleast_2d(np.asarray(query_vectors, dtype="float32"))
+        per_shard = self._some(self._shards_for(filter), "search_many", query_np, k, nprobe, ef_search, filter=filter)
+        merged = []
+        for q in range(len(query_np)):
+            results = [r for shard, rows in per_shard.items() for r in self._globalize(shard, rows[q])]
+            merged.append(heapq.nsmallest(k, results, key=lambda r: r["distance"]))
+        return merged
+
+    def rescore(self, query_vector: List[float], ids: List[int], filter: Optional[Dict] = None) -> List[Dict]:
+        calls: Dict[int, tuple] = {}
+        for global_id in ids:
+            shard, local = self.split_id(global_id)
+            calls.setdefault(shard, (query_vector, []))[1].append(local)
+        if not calls:
+            return []
+        per_shard = self._fan_out("rescore", calls, filter=filter)
+        results = [r for shard, rows in per_shard.items() for r in self._globalize(shard, rows)]
+        return sorted(results, key=lambda r: r["distance"])
+
+    def lexical_search(self, query: str, k: int = 5, filter: Optional[Dict] = None) -> List[Dict]:
+        per_shard = self._some(self._shards_for(filter), "lexical_search", query, k, filter=filter)
+        results = [r for shard, rows in per_shard.items() for r in self._globalize(shard, rows)]
+        return heapq.nlargest(k, results, key=lambda r: r["bm25"])
+
+    def hybrid_search(self, query_vector: List[float], query: str, k: int = 5,
+                      candidates: int = HYBRID_CANDIDATES, filter: Optional[Dict] = None) -> List[Dict]:
+        return self.hybrid_search_many([query_vector], [query], k, candidates, filter)[0]
+
+    def hybrid_search_many(self, query_vectors, queries: List[str], k: int = 5,
+                           candidates: int = HYBRID_CANDIDATES, filter: Optional[Dict] = None) -> List[List[Dict]]:
+        """Candidats de chaque shard fusionnés globalement, puis fusion RRF"""
+        query_np = np.atleast_2d(np.asarray(query_vectors, dtype="float32"))
+        candidates = max(k, candidates)
+        per_shard = self._some(self._shards_for(filter), "hybrid_candidates", query_np, queries, candidates, filter=filter)
+        merged = []
+        for q in range(len(queries)):
+            dense, lexical = [], []
+            for shard, rows in per_shard.items():
+                dense += self._globalize(shard, rows[q][0])
+                lexical += self._globalize(shard, rows[q][1])
+            # Scores BM25 calculés avec les statistiques de chaque shard
+            dense = heapq.nsmallest(candidates, dense, key=lambda r: r["distance"])
+            lexical = heapq.nlargest(candidates, lexical, key=lambda r: r["bm25"])
+            merged.append(fuse_candidates(dense, lexical, k))
+        return merged
+
+    # --- Persistance ---
+
+    def save(self, path: Optional[str] = None):
+        self._fan_out("save", {shard: (self.shard_path(shard, path),) for shard in range(self.n_shards)})
+
+    def snapshot(self, path: Optional[str] = None):
+        self._fan_out("snapshot", {shard: (self.shard_path(shard, path),) for shard in range(self.n_shards)})
+
+    def load(self, path: Optional[str] = None) -> bool:
+        """Démarrer les shards ; chacun charge son propre index"""
+        if path and path != self.path:
+            self.close()
+            self.path = path
+        self._start()
+        return True
@@ -0,0 +1,79 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+from app.services.wal import atomic_replace
+
+class SourceRegistry:
+    """État de la dernière ingestion de chaque URL (ETag, Last-Modified, hash du contenu)"""
+
+    def __init__(self):
+        self.sources: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+        # Date, inode et taille du fichier lu en dernier (relecture par les workers lecteurs)
+        self.stamp: Optional[Tuple[int, int, int]] = None
+
+    def get(self, url: str) -> Dict:
+        return dict(self.sources.get(url, {}))
+
+    def update(self, url: str, **fields):
+        with self.lock:
+            source = self.sources.setdefault(url, {})
+            source.update({key: value for key, value in fields.items() if value is not None})
+            source["checked_at"] = time.time()
+
+    def remove(self, url: str):
+        with self.lock:
+            self.sources.pop(url, None)
+
+    def retain(self, urls: Set[str]) -> int:
+        """Oublier les URLs absentes de `urls`, retourne leur nombre"""
+        with self.lock:
+            orphans = [url for url in self.sources if url not in urls]
+            for url in orphans:
+                del self.sources[url]
+        return len(orphans)
+
+    def save(self, path: str = "data/vector_store"):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.lock:
+            with open(f"{path}.sources.json.tmp", "w", encoding="utf-8") as f:
+                json.dump(self.sources, f, ensure_ascii=False)
+            atomic_replace(f"{path}.sources.json.tmp", f"{path}.sources.json")
+
+    def load(self, path: str = "data/vector_store") -> bool:
+        if not os.path.exists(f"{path}.sources.json"):
+            return False
+        try:
+            # Lu en premier : une écriture pendant la lecture sera relue au prochain refresh
+            stamp = self._stamp(path)
+            with open(f"{path}.sources.json", encoding="utf-8") as f:
+                self.sources = json.load(f)
+            self.stamp = stamp
+            return True
+        except Exception as e:
+            print(f"Erreur de chargement des sources: {e}")
+            return False
+
+    @staticmethod
+    def _stamp(path: str) -> Tuple[int, int, int]:
+        # Chaque sauvegarde remplace le fichier : nouvel inode
+        stat = os.stat(f"{path}.sources.json")
+        return stat.st_mtime_ns, stat.st_ino, stat.st_size
+
+    def refresh(self, path: str = "data/vector_store") -> bool:
+        """Lecteur : relire le registre si l'écrivain l'a réenregistré"""
+        try:
+            stamp = self._stamp(path)
+        except FileNotFoundError:
+            return False
+        if stamp == self.stamp:
+            return False
+        return self.load(path)
+
+# Instance globale
+source_registry = SourceRegistry()
+
+# Charger au démarrage si existant
+source_registry.load()
@@ -1,15 +1,195 @@
 import faiss
 import numpy as np
+import json
 import pickle
 import os
-from typing import List, Dict, Optional
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Dict, Optional, Set
+from app.services.chunk_store import ChunkStore, ChunkView, VectorColumn
+from app.services.cleaner import content_hash
+from app.services.lexical_index import BM25Index, reciprocal_rank_fusion
+from app.services.metadata_index import MetadataIndex, IdFilter
+from app.services.wal import WriteAheadLog, atomic_replace
+from app.services.workers import is_writer
+from app.config import (
+    VECTOR_INDEX_TYPE,
+    VECTOR_INDEX_MIN_TRAIN,
+    VECTOR_INDEX_REBUILD_FACTOR,
+    IVF_NLIST,
+    PQ_M,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    SEARCH_NPROBE,
+    SEARCH_EF,
+    WAL_SNAPSHOT_ROWS,
+    HYBRID_CANDIDATES,
+    RRF_K,
+    VECTOR_SHARDS,
+    FILTER_EXACT_MAX,
+    FILTER_SEARCH_BOOST_MAX,
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+# Index qui ne gardent qu'une approximation des vecteurs
+LOSSY_INDEX_TYPES = ("ivf_pq",)
+
+def make_index(index_type: str, dimension: int, n: int = 0):
+    """Créer un index FAISS vide (à entraîner pour les variantes IVF)"""
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dimension)
+    
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        return index
+    
+    if index_type in ("ivf_flat", "ivf_pq"):
+        # ~4*sqrt(n) listes, en gardant au moins 39 points d'entraînement par liste
+        nlist = IVF_NLIST or int(4 * np.sqrt(max(n, 1)))
+        nlist = max(1, min(nlist, n // 39 if n else nlist))
+        quantizer = faiss.IndexFlatL2(dimension)
+        if index_type == "ivf_flat":
+            return faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        if dimension % PQ_M != 0:
+            raise ValueError(f"PQ_M ({PQ_M}) doit diviser la dimension ({dimension})")
+        return faiss.IndexIVFPQ(quantizer, dimension, nlist, PQ_M, 8)
+    
+    raise ValueError(f"Type d'index inconnu: {index_type} (attendu: {', '.join(INDEX_TYPES)})")
+
+def index_type_of(index) -> str:
+    """Retrouver le type d'un index FAISS existant"""
+    if isinstance(index, faiss.IndexHNSWFlat):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFFlat):
+        return "ivf_flat"
+    return "flat"
+
+def index_bytes(index) -> int:
+    """Mémoire approximative d'un index FAISS (codes, ids, centroïdes, graphe)"""
+    if index is None:
+        return 0
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        # Codes et ids des listes inversées, plus les centroïdes
+        return index.ntotal * (ivf.code_size + 8) + ivf.nlist * index.d * 4
+    if isinstance(index, faiss.IndexHNSWFlat):
+        # Vecteurs, plus ~2*M voisins par vecteur au niveau 0
+        return index.ntotal * (index.d * 4 + 2 * HNSW_M * 4)
+    return index.ntotal * index.d * 4
+
+def fuse_candidates(dense: List[Dict], lexical: List[Dict], k: int) -> List[Dict]:
+    """Fusion RRF des candidats vectoriels (par distance) et BM25 (par score)"""
+    by_id = {result["id"]: result for result in lexical}
+    by_id.update({result["id"]: result for result in dense})
+    ranking = reciprocal_rank_fusion([[r["id"] for r in dense], [r["id"] for r in lexical]], RRF_K)
+    
+    results = []
+    for idx, rrf_score in ranking[:k]:
+        result = {key: value for key, value in by_id[idx].items() if key != "bm25"}
+        result["rrf_score"] = rrf_score
+        results.append(result)
+    return results
+
+class ReadWriteLock:
+    """Lectures simultanées, écriture exclusive ; un écrivain en attente passe
+    avant les nouvelles lectures. Non réentrant : ne pas imbriquer."""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writing = False
+        self._waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writing or self._waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._waiting += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
 
 class VectorStore:
-    def __init__(self, dimension: int = 384):
+    def __init__(self, dimension: int = 384, index_type: str = VECTOR_INDEX_TYPE, read_only: bool = False):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Type d'index inconnu: {index_type} (attendu: {', '.join(INDEX_TYPES)})")
         self.dimension = dimension
+        # Type visé : on reste en recherche exacte tant que le corpus est trop petit pour l'entraînement
+        self.index_type = index_type
         self.index = faiss.IndexFlatL2(dimension)
-        self.chunks: List[str] = []
-        self.metadata: List[Dict] = []
+        # Taille du corpus lors du dernier (ré)entraînement
+        self.trained_size = 0
+        # Textes et métadonnées sur disque, lus à la demande
+        self.store = ChunkStore()
+        self.chunks = ChunkView(self.store, self.store.text)
+        self.metadata = ChunkView(self.store, self.store.metadata)
+        # Vecteurs ajoutés depuis la dernière sauvegarde, à journaliser
+        self._pending_vectors: List[np.ndarray] = []
+        # Index avec perte (IVF-PQ) : vecteurs exacts gardés dans {path}.vectors pour les
+        # réentraînements, ceux pas encore écrits ici ; None s'ils ne sont pas disponibles
+        self._exact_pending: Optional[List[np.ndarray]] = None
+        # Base sur disque chargée (ou absente) : une sauvegarde ne peut plus l'écraser
+        self.loaded = False
+        # Emplacement et journal de la dernière sauvegarde / du dernier chargement
+        self.path: Optional[str] = None
+        self.wal: Optional[WriteAheadLog] = None
+        # L'index a été reconstruit : le prochain save écrit un snapshot complet
+        self._needs_snapshot = False
+        # Ids supprimés (pierres tombales) : exclus des recherches via un IDSelector
+        self.deleted: Set[int] = set()
+        self._pending_deleted: List[int] = []
+        self._selector = None
+        # Index hash / url / domaine / date d'ajout -> ids des chunks vivants, construit à la demande
+        self._lookup: Optional[MetadataIndex] = None
+        # Index inversé BM25 des chunks vivants, construit à la demande
+        self._lexical: Optional[BM25Index] = None
+        # Appelés avec les ids supprimés (invalidation des caches)
+        self.delete_listeners: List[Callable[[List[int]], None]] = []
+        # Les ajouts et la sauvegarde peuvent venir de plusieurs threads
+        self.lock = threading.RLock()
+        # FAISS interdit de modifier un index pendant une recherche : les recherches
+        # (threads d'inférence) lisent l'index et le delta en lecture, les modifications
+        # (toujours faites en tenant aussi self.lock) les prennent en écriture
+        self._index_lock = ReadWriteLock()
+        # Numéro du dernier snapshot et version publiée après chaque sauvegarde
+        self.generation = 0
+        self.version: Optional[str] = None
+        # Lecture seule (workers lecteurs) : index du snapshot mappé en mémoire
+        # et vecteurs journalisés depuis, dans un petit index séparé
+        self.read_only = read_only
+        self.delta: Optional[faiss.IndexFlatL2] = None
+        self._delta_deleted = 0
+    
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError("Base vectorielle en lecture seule dans ce worker")
     
     def add_vector(self, vector: List[float], text: str, metadata: Optional[Dict] = None):
         """Ajouter un seul vecteur"""
@@ -19,12 +199,24 @@ class VectorStore:
         # Convertir en numpy
         vector_np = np.array([vector]).astype("float32")
         
-        # Ajouter à FAISS
-        self.index.add(vector_np)
+        self._check_writable()
+        metadata = self._with_hash(text, metadata)
         
-        # Stocker le texte et métadonnées
-        self.chunks.append(text)
-        self.metadata.append(metadata or {})
+        with self.lock:
+            first_id = self.index.ntotal
+            
+            # Ajouter à FAISS
+            with self._index_lock.write():
+                self.index.add(vector_np)
+            self._pending_vectors.append(vector_np)
+            if self._exact_pending is not None:
+                self._exact_pending.append(vector_np)
+            
+            # Stocker le texte et métadonnées
+            self.store.append([text], [metadata])
+            self._track(first_id, [text], [metadata])
+            
+            self._maybe_rebuild()
     
     def add_documents(self, vectors: List[List[float]], texts: List[str], metadatas: Optional[List[Dict]] = None):
         """Ajouter plusieurs documents"""
@@ -38,21 +230,371 @@ class VectorStore:
         # Convertir en numpy
         vectors_np = np.array(vectors).astype("float32")
         
-        # Ajouter à FAISS
-        self.index.add(vectors_np)
+        self._check_writable()
+        metadatas = [self._with_hash(text, metadata) for text, metadata in zip(texts, metadatas or [None] * len(texts))]
+        
+        with self.lock:
+            first_id = self.index.ntotal
+            
+            # Ajouter à FAISS
+            with self._index_lock.write():
+                self.index.add(vectors_np)
+            self._pending_vectors.append(vectors_np)
+            if self._exact_pending is not None:
+                self._exact_pending.append(vectors_np)
+            
+            # Stocker textes et métadonnées
+            self.store.append(list(texts), metadatas)
+            self._track(first_id, texts, metadatas)
+            
+            self._maybe_rebuild()
+    
+    @staticmethod
+    def _with_hash(text: str, metadata: Optional[Dict]) -> Dict:
+        """Ajouter le hash du texte normalisé et la date d'ajout aux métadonnées"""
+        metadata = dict(metadata or {})
+        metadata.setdefault("hash", content_hash(text))
+        metadata.setdefault("ingested_at", round(time.time(), 3))
+        return metadata
+    
+    def _track(self, first_id: int, texts: List[str], metadatas: List[Dict]):
+        # Tenir à jour l'index des métadonnées et BM25 s'ils sont déjà construits
+        if self._lexical is not None:
+            for i, text in enumerate(texts):
+                self._lexical.add(first_id + i, text)
+        if self._lookup is None:
+            return
+        for i, metadata in enumerate(metadatas):
+            self._lookup.add(first_id + i, metadata["hash"], metadata)
+    
+    def _ensure_lookup(self) -> MetadataIndex:
+        """Construire l'index des métadonnées (une lecture des métadonnées), ensuite tenu à jour"""
+        lookup = self._lookup
+        if lookup is not None:
+            return lookup
+        with self.lock:
+            if self._lookup is None:
+                lookup = MetadataIndex()
+                for i in range(len(self.store)):
+                    if i in self.deleted:
+                        continue
+                    metadata = self.store.metadata(i)
+                    # Chunks indexés avant le suivi des hash
+                    h = metadata.get("hash") or content_hash(self.store.text(i))
+                    lookup.add(i, h, metadata)
+                self._lookup = lookup
+            return self._lookup
+    
+    def _ensure_lexical(self) -> BM25Index:
+        """Construire l'index BM25 (une lecture des textes), ensuite tenu à jour"""
+        lexical = self._lexical
+        if lexical is not None:
+            return lexical
+        with self.lock:
+            if self._lexical is None:
+                lexical = BM25Index()
+                for i in range(len(self.store)):
+                    if i not in self.deleted:
+                        lexical.add(i, self.store.text(i))
+                self._lexical = lexical
+            return self._lexical
+    
+    def find_hash(self, h: str) -> Optional[int]:
+        """Id d'un chunk vivant ayant ce contenu normalisé"""
+        lookup = self._ensure_lookup()
+        with self.lock:
+            return lookup.find_hash(h)
+    
+    def ids_for_url(self, url: str) -> List[int]:
+        lookup = self._ensure_lookup()
+        with self.lock:
+            return lookup.ids_for_url(url)
+    
+    def url_stats(self, domain: Optional[str] = None) -> List[Dict]:
+        """Chunks vivants par URL (éventuellement d'un domaine), sans lire le stockage"""
+        lookup = self._ensure_lookup()
+        with self.lock:
+            return lookup.url_stats(domain)
+    
+    def _resolve(self, filter: Optional[Dict]) -> Optional[IdFilter]:
+        """Filtre de recherche {urls, domains, since, until} -> ids autorisés"""
+        if not filter:
+            return None
+        lookup = self._ensure_lookup()
+        with self.lock:
+            return lookup.resolve(filter, self.ntotal)
+    
+    def get_vector(self, vector_id: int) -> List[float]:
+        """Relire un vecteur (exact, sauf IVF-PQ sans vecteurs exacts)"""
+        with self.lock:
+            if self._exact_pending is not None:
+                return self._exact_vectors(int(vector_id), int(vector_id) + 1)[0].tolist()
+        self._ensure_direct_map(self.index)
+        with self._index_lock.read():
+            base = self.index.ntotal
+            if vector_id >= base and self.delta is not None:
+                return self.delta.reconstruct(int(vector_id) - base).tolist()
+            return self.index.reconstruct(int(vector_id)).tolist()
+    
+    def _ensure_direct_map(self, index):
+        """Table id -> position nécessaire pour relire un vecteur d'un index IVF"""
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+            with self.lock, self._index_lock.write():
+                ivf.make_direct_map()
+    
+    def delete(self, ids: List[int]) -> int:
+        """Supprimer des chunks (exclus des recherches, persisté au prochain save)"""
+        return len(self.delete_ids(ids))
+    
+    def delete_ids(self, ids: List[int]) -> List[int]:
+        """Comme delete, retourne les ids réellement supprimés (ni inconnus ni déjà supprimés)"""
+        self._check_writable()
+        with self.lock:
+            ids = self._forget(ids)
+            self._pending_deleted.extend(ids)
+        
+        for listener in self.delete_listeners:
+            listener(ids)
+        return ids
+    
+    def _forget(self, ids: List[int]) -> List[int]:
+        """Marquer des ids supprimés et les retirer des index des métadonnées et BM25"""
+        with self.lock:
+            ids = [i for i in dict.fromkeys(int(i) for i in ids) if 0 <= i < self.ntotal and i not in self.deleted]
+            if not ids:
+                return []
+            lookup = self._ensure_lookup()
+            for i in ids:
+                metadata = self.store.metadata(i)
+                h = metadata.get("hash") or content_hash(self.store.text(i))
+                lookup.remove(i, h, metadata)
+                if self._lexical is not None:
+                    self._lexical.remove(i, self.store.text(i))
+            self.deleted.update(ids)
+            self._selector = None
+        return ids
+    
+    def delete_url(self, url: str) -> int:
+        """Supprimer tous les chunks d'une URL"""
+        return self.delete(self.ids_for_url(url))
+    
+    @property
+    def ntotal(self) -> int:
+        """Nombre de vecteurs, supprimés compris"""
+        return self.index.ntotal + (self.delta.ntotal if self.delta is not None else 0)
+    
+    @property
+    def count(self) -> int:
+        """Nombre de chunks vivants"""
+        return self.ntotal - len(self.deleted)
+    
+    def _maybe_rebuild(self):
+        """Passer à l'index configuré quand le corpus franchit les seuils"""
+        current = index_type_of(self.index)
+        if current in LOSSY_INDEX_TYPES and self._exact_pending is None:
+            # Sans vecteurs exacts l'index est gardé tel quel (voir rebuild)
+            return
+        if self.index_type == "flat":
+            if current != "flat":
+                self.rebuild()
+            return
         
-        # Stocker textes
-        self.chunks.extend(texts)
+        ntotal = self.index.ntotal
+        if ntotal < VECTOR_INDEX_MIN_TRAIN:
+            return
         
-        # Stocker métadonnées
-        if metadatas:
-            self.metadata.extend(metadatas)
+        # Premier passage de l'index exact vers l'index approché
+        if current != self.index_type:
+            self.rebuild()
+        # Réentraîner les centroïdes IVF quand le corpus a assez grossi
+        elif current != "hnsw" and ntotal >= self.trained_size * VECTOR_INDEX_REBUILD_FACTOR:
+            self.rebuild()
+    
+    def rebuild(self, index_type: Optional[str] = None):
+        """(Ré)entraîner et reconstruire l'index à partir des vecteurs exacts"""
+        self._check_writable()
+        with self.lock:
+            index_type = index_type or self.index_type
+            lossy = index_type_of(self.index) in LOSSY_INDEX_TYPES
+            if lossy and self._exact_pending is None:
+                # Réentraîner sur des vecteurs reconstruits cumulerait l'erreur de quantification
+                raise ValueError("Index IVF-PQ sans vecteurs exacts enregistrés : reconstruction refusée")
+            vectors = self._exact_vectors()
+            
+            index = self._build(index_type, vectors)
+            with self._index_lock.write():
+                self.index = index
+            self.index_type = index_type
+            self.trained_size = len(vectors)
+            self._needs_snapshot = True
+            
+            if index_type not in LOSSY_INDEX_TYPES:
+                self._exact_pending = None
+                if self.path and os.path.exists(f"{self.path}.vectors"):
+                    os.remove(f"{self.path}.vectors")
+            elif not lossy:
+                # Passage à un index avec perte : garder les vecteurs exacts à côté
+                self._exact_pending = [vectors]
+                if self.path:
+                    VectorColumn(f"{self.path}.vectors", self.dimension).write(vectors)
+                    self._exact_pending = []
+    
+    def _build(self, index_type: str, vectors: np.ndarray):
+        index = make_index(index_type, self.dimension, len(vectors))
+        if not index.is_trained:
+            index.train(vectors)
+        index.add(vectors)
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            # Permet de relire un vecteur (réutilisation des chunks identiques)
+            ivf.make_direct_map()
+        return index
+    
+    def _exact_vectors(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Vecteurs exacts des ids [start, stop) : depuis {path}.vectors pour un index avec perte"""
+        stop = self.index.ntotal if stop is None else stop
+        if self._exact_pending is None:
+            return self._all_vectors()[start:stop]
+        written = len(VectorColumn(f"{self.path}.vectors", self.dimension)) if self.path else 0
+        parts = [VectorColumn(f"{self.path}.vectors", self.dimension).read(start, min(stop, written))] if start < written else []
+        offset = written
+        for vectors in self._exact_pending:
+            lo, hi = max(start, offset), min(stop, offset + len(vectors))
+            if lo < hi:
+                parts.append(vectors[lo - offset:hi - offset])
+            offset += len(vectors)
+        return np.concatenate(parts) if parts else np.zeros((0, self.dimension), dtype="float32")
+    
+    def _write_exact(self, path: str):
+        """Écrire les vecteurs exacts en attente (index avec perte seulement)"""
+        if self._exact_pending is None:
+            return
+        column = VectorColumn(f"{path}.vectors", self.dimension)
+        if path != self.path:
+            # Nouvel emplacement (ou premier passage à l'index avec perte) : tout réécrire
+            column.write(self._exact_vectors())
         else:
-            self.metadata.extend([{} for _ in range(len(texts))])
+            for vectors in self._exact_pending:
+                column.append(vectors)
+        self._exact_pending = []
+    
+    def _load_exact(self, path: str, wal: WriteAheadLog, replayed: Optional[np.ndarray]):
+        """Reprendre les vecteurs exacts d'un index avec perte, complétés par le journal"""
+        self._exact_pending = None
+        if index_type_of(self.index) not in LOSSY_INDEX_TYPES:
+            return
+        column = VectorColumn(f"{path}.vectors", self.dimension)
+        n = self.index.ntotal
+        rows = min(len(column), n)
+        column.truncate(rows)
+        if rows < n and replayed is not None and wal.base <= rows and n - wal.base <= len(replayed):
+            # Vecteurs journalisés mais pas encore recopiés
+            column.append(replayed[rows - wal.base:n - wal.base])
+            rows = n
+        if rows < n:
+            logger.warning(f"{path}.vectors incomplet : index IVF-PQ gardé sans réentraînement")
+            return
+        self._exact_pending = []
+    
+    def _all_vectors(self) -> np.ndarray:
+        ntotal = self.index.ntotal
+        if ntotal == 0:
+            return np.zeros((0, self.dimension), dtype="float32")
+        # Nécessaire pour reconstruire depuis un index IVF (approximatif pour PQ)
+        self._ensure_direct_map(self.index)
+        return self.index.reconstruct_n(0, ntotal)
+    
+    def _deleted_selector(self):
+        """Sélecteur FAISS excluant les ids supprimés (None s'il n'y en a pas), avec ces ids"""
+        with self.lock:
+            if not self.deleted:
+                return None, None
+            if self._selector is None:
+                deleted = np.fromiter(self.deleted, dtype="int64", count=len(self.deleted))
+                batch = faiss.IDSelectorBatch(deleted)
+                self._selector = faiss.IDSelectorNot(batch)
+                # Garder une référence : le sélecteur C++ ne possède pas `batch`
+                self._selector.referenced = batch
+                self._selector.deleted = deleted
+                self._delta_deleted = int(np.count_nonzero(deleted >= self.index.ntotal))
+            return self._selector, self._selector.deleted
+    
+    def _search_params(self, index, selector, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                       id_filter: Optional[IdFilter] = None):
+        """Paramètres de recherche par requête selon l'index"""
+        boost = 1.0
+        if id_filter is not None:
+            # Filtre poussé dans FAISS ; les ids d'une URL ou d'un domaine sont tous vivants
+            selector = id_filter.selector(index.ntotal, selector if id_filter.ids is None else None)
+            # Peu d'ids autorisés par liste IVF ou voisinage HNSW : explorer plus large
+            boost = min(FILTER_SEARCH_BOOST_MAX, max(1.0, self.ntotal / max(1, len(id_filter))))
+        
+        if isinstance(index, faiss.IndexHNSWFlat):
+            return faiss.SearchParametersHNSW(efSearch=int((ef_search or SEARCH_EF) * boost), sel=selector)
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            return faiss.SearchParametersIVF(nprobe=min(ivf.nlist, int(np.ceil((nprobe or SEARCH_NPROBE) * boost))), sel=selector)
+        if selector is not None:
+            return faiss.SearchParameters(sel=selector)
+        return None
+    
+    def _search(self, query_np: np.ndarray, k: int, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                id_filter: Optional[IdFilter] = None):
+        if id_filter is not None and id_filter.ids is not None and len(id_filter) <= FILTER_EXACT_MAX:
+            return self._search_exact(query_np, k, id_filter.ids)
+        k = max(1, min(k, self.count if id_filter is None else len(id_filter)))
+        selector, deleted = self._deleted_selector()
+        with self._index_lock.read():
+            index, delta = self.index, self.delta
+            params = self._search_params(index, selector, nprobe, ef_search, id_filter)
+            if params is None:
+                distances, indices = index.search(query_np, k)
+            else:
+                distances, indices = index.search(query_np, k, params=params)
+            if delta is None or delta.ntotal == 0:
+                return distances, indices
+            
+            # Vecteurs journalisés depuis le snapshot : recherche exacte puis fusion
+            # (avec un filtre, tous : le delta est petit et exact)
+            delta_k = delta.ntotal if id_filter is not None else min(delta.ntotal, k + self._delta_deleted)
+            delta_distances, delta_indices = delta.search(query_np, delta_k)
+            base = index.ntotal
+        delta_indices = np.where(delta_indices >= 0, delta_indices + base, -1)
+        if deleted is not None:
+            delta_indices = np.where(np.isin(delta_indices, deleted), -1, delta_indices)
+        if id_filter is not None:
+            delta_indices = np.where(id_filter.mask(delta_indices), delta_indices, -1)
+        distances = np.hstack([distances, delta_distances])
+        indices = np.hstack([indices, delta_indices])
+        distances = np.where(indices >= 0, distances, np.inf)
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(distances, order, axis=1), np.take_along_axis(indices, order, axis=1)
     
-    def search_vector(self, query_vector: List[float], k: int = 5) -> List[str]:
+    def _search_exact(self, query_np: np.ndarray, k: int, ids: np.ndarray):
+        """Peu d'ids autorisés : distances exactes sur leurs seuls vecteurs. Plus rapide
+        qu'un parcours filtré de l'index, et sans la perte de rappel des index approchés
+        (une liste IVF ou un voisinage HNSW peut ne contenir aucun id autorisé)"""
+        distances, positions = faiss.knn(query_np, self._vectors(ids), min(k, len(ids)))
+        return distances, np.where(positions >= 0, ids[positions], -1)
+    
+    def _vectors(self, ids: np.ndarray) -> np.ndarray:
+        """Vecteurs de plusieurs ids triés (approximatifs pour IVF-PQ)"""
+        self._ensure_direct_map(self.index)
+        parts = []
+        with self._index_lock.read():
+            base = self.index.ntotal
+            split = int(np.searchsorted(ids, base))
+            if split:
+                parts.append(self.index.reconstruct_batch(ids[:split]))
+            if split < len(ids):
+                parts.append(self.delta.reconstruct_batch(ids[split:] - base))
+        return np.vstack(parts) if parts else np.zeros((0, self.dimension), dtype="float32")
+    
+    def search_vector(self, query_vector: List[float], k: int = 5,
+                      nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> List[str]:
         """Rechercher les textes similaires"""
-        if self.index.ntotal == 0:
+        if self.count == 0:
             return []
         
         if len(query_vector) != self.dimension:
@@ -62,8 +604,7 @@ class VectorStore:
         query_np = np.array([query_vector]).astype("float32")
         
         # Rechercher
-        k = min(k, self.index.ntotal)
-        distances, indices = self.index.search(query_np, k)
+        distances, indices = self._search(query_np, k, nprobe, ef_search)
         
         # Récupérer les textes
         results = []
@@ -73,64 +614,422 @@ class VectorStore:
         
         return results
     
-    def search(self, query_vector: List[float], k: int = 5) -> List[Dict]:
+    def _result(self, idx: int, distance: float) -> Dict:
+        return {
+            "id": int(idx),
+            "text": self.chunks[idx],
+            "metadata": self.metadata[idx],
+            "distance": float(distance),
+            "score": float(1.0 / (1.0 + distance))
+        }
+    
+    @staticmethod
+    def _as_matrix(query_vectors) -> np.ndarray:
+        # Une seule conversion pour toutes les requêtes (une ligne par requête)
+        return np.atleast_2d(np.asarray(query_vectors, dtype="float32"))
+    
+    def search(self, query_vector: List[float], k: int = 5,
+               nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+               filter: Optional[Dict] = None) -> List[Dict]:
         """Recherche avec métadonnées"""
-        if self.index.ntotal == 0:
+        if self.count == 0:
             return []
+        return self.search_many([query_vector], k, nprobe, ef_search, filter)[0]
+    
+    def search_many(self, query_vectors, k: int = 5,
+                    nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                    filter: Optional[Dict] = None) -> List[List[Dict]]:
+        """Recherche de plusieurs requêtes en un seul appel FAISS, éventuellement
+        restreinte par `filter` (urls, domains, since, until)"""
+        query_np = self._as_matrix(query_vectors)
+        if query_np.shape[1] != self.dimension:
+            raise ValueError(f"Dimension attendue: {self.dimension}, reçue: {query_np.shape[1]}")
+        id_filter = self._resolve(filter)
+        if self.count == 0 or (id_filter is not None and not len(id_filter)):
+            return [[] for _ in range(len(query_np))]
         
-        query_np = np.array([query_vector]).astype("float32")
-        k = min(k, self.index.ntotal)
-        distances, indices = self.index.search(query_np, k)
-        
-        results = []
-        for i, (distance, idx) in enumerate(zip(distances[0], indices[0])):
-            if 0 <= idx < len(self.chunks):
-                results.append({
-                    "text": self.chunks[idx],
-                    "metadata": self.metadata[idx],
-                    "distance": float(distance),
-                    "score": 1.0 / (1.0 + distance)
-                })
+        distances, indices = self._search(query_np, k, nprobe, ef_search, id_filter)
         
-        return results
+        return [
+            [self._result(idx, distance) for distance, idx in zip(row_distances, row_indices) if 0 <= idx < len(self.chunks)]
+            for row_distances, row_indices in zip(distances, indices)
+        ]
     
-    def save(self, path: str = "data/vector_store"):
-        """Sauvegarder"""
-        os.makedirs(os.path.dirname(path), exist_ok=True)
+    def rescore(self, query_vector: List[float], ids: List[int], filter: Optional[Dict] = None) -> List[Dict]:
+        """Chunks déjà connus (tour précédent d'une conversation) classés par distance
+        à la requête, sans recherche dans l'index ; les chunks supprimés ou hors filtre sont ignorés"""
+        id_filter = self._resolve(filter)
+        with self.lock:
+            ids = [int(i) for i in ids if 0 <= i < self.ntotal and i not in self.deleted
+                   and (id_filter is None or i in id_filter)]
+        if not ids:
+            return []
+        vectors = np.asarray([self.get_vector(i) for i in ids], dtype="float32")
+        distances = np.sum((vectors - self._as_matrix(query_vector)) ** 2, axis=1)
+        return sorted((self._result(i, d) for i, d in zip(ids, distances)), key=lambda r: r["distance"])
+    
+    def lexical_search(self, query: str, k: int = 5, filter: Optional[Dict] = None) -> List[Dict]:
+        """Recherche BM25 sur les mots de la requête"""
+        return [
+            {"id": idx, "text": self.chunks[idx], "metadata": self.metadata[idx], "bm25": float(score)}
+            for idx, score in self._ensure_lexical().search(query, k, allowed=self._resolve(filter))
+        ]
+    
+    def hybrid_search(self, query_vector: List[float], query: str, k: int = 5,
+                      candidates: int = HYBRID_CANDIDATES, filter: Optional[Dict] = None) -> List[Dict]:
+        """Fusion (RRF) des classements vectoriel et BM25"""
+        if self.count == 0:
+            return []
+        return self.hybrid_search_many([query_vector], [query], k, candidates, filter)[0]
+    
+    def hybrid_search_many(self, query_vectors, queries: List[str], k: int = 5,
+                           candidates: int = HYBRID_CANDIDATES, filter: Optional[Dict] = None) -> List[List[Dict]]:
+        """Recherche hybride de plusieurs requêtes (partie vectorielle en un seul appel FAISS)"""
+        return [
+            fuse_candidates(dense, lexical, k)
+            for dense, lexical in self.hybrid_candidates(query_vectors, queries, max(k, candidates), filter)
+        ]
+    
+    def hybrid_candidates(self, query_vectors, queries: List[str], candidates: int = HYBRID_CANDIDATES,
+                          filter: Optional[Dict] = None):
+        """Candidats (vectoriels, BM25) de chaque requête, avec leurs distances"""
+        query_np = self._as_matrix(query_vectors)
+        if len(query_np) != len(queries):
+            raise ValueError("Nombre de vecteurs et requêtes doit être égal")
+        id_filter = self._resolve(filter)
+        if self.count == 0 or (id_filter is not None and not len(id_filter)):
+            return [([], []) for _ in queries]
+        
+        distances, indices = self._search(query_np, candidates, id_filter=id_filter)
+        lexical_index = self._ensure_lexical()
         
-        # Sauvegarder index FAISS
-        faiss.write_index(self.index, f"{path}.index")
+        all_candidates = []
+        for query_vector, query, row_distances, row_indices in zip(query_np, queries, distances, indices):
+            dense = [self._result(idx, distance) for distance, idx in zip(row_distances, row_indices) if 0 <= idx < len(self.chunks)]
+            distances_by_id = {result["id"]: result["distance"] for result in dense}
+            
+            lexical = []
+            for idx, score in lexical_index.search(query, candidates, allowed=id_filter):
+                distance = distances_by_id.get(idx)
+                if distance is None:
+                    # Trouvé seulement par BM25 : distance recalculée depuis l'index
+                    vector = np.array(self.get_vector(idx), dtype="float32")
+                    distance = float(np.sum((vector - query_vector) ** 2))
+                result = self._result(idx, distance)
+                result["bm25"] = float(score)
+                lexical.append(result)
+            all_candidates.append((dense, lexical))
         
-        # Sauvegarder données
-        data = {
-            "chunks": self.chunks,
-            "metadata": self.metadata,
-            "dimension": self.dimension
+        return all_candidates
+    
+    def info(self) -> Dict:
+        """Tailles de l'index et du stockage"""
+        return {
+            "count": self.count,
+            "deleted": len(self.deleted),
+            "chunks": len(self.chunks),
+            "ntotal": self.ntotal,
+            "dimension": self.dimension,
+            "index_type": index_type_of(self.index),
+            "index_bytes": index_bytes(self.index) + index_bytes(self.delta)
         }
+    
+    def save(self, path: str = "data/vector_store"):
+        """Sauvegarder : journaliser les nouveaux vecteurs (coût proportionnel
+        aux ajouts), avec un snapshot complet de l'index de temps en temps"""
+        self._check_writable()
+        with self.lock:
+            if path != self.path or self.wal is None or self._needs_snapshot:
+                self.snapshot(path)
+                return
+            
+            # 1. Textes et métadonnées d'abord, puis les vecteurs exacts d'un index avec perte
+            self.store.save(path)
+            self._write_exact(path)
+            
+            # 2. Puis les vecteurs : l'enregistrement du journal valide l'ajout
+            if self._pending_vectors:
+                self.wal.append(np.concatenate(self._pending_vectors))
+                self._pending_vectors = []
+            
+            # 3. Les suppressions
+            if self._pending_deleted:
+                with open(f"{path}.deleted", "ab") as f:
+                    f.write(np.array(self._pending_deleted, dtype="<i8").tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._pending_deleted = []
+            
+            if self.wal.rows >= WAL_SNAPSHOT_ROWS:
+                self.snapshot(path)
+            else:
+                self._publish(path)
+    
+    def _publish(self, path: str):
+        """Nouvelle version visible par les workers lecteurs"""
+        self.version = str(time.time_ns())
+        with open(f"{path}.version.tmp", "w") as f:
+            f.write(self.version)
+        atomic_replace(f"{path}.version.tmp", f"{path}.version")
+    
+    @staticmethod
+    def read_version(path: str) -> Optional[str]:
+        try:
+            with open(f"{path}.version") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+    
+    def snapshot(self, path: str = "data/vector_store"):
+        """Écrire l'index complet (remplacement atomique) et vider le journal"""
+        self._check_writable()
+        if not self.loaded and os.path.exists(f"{path}.index"):
+            # Base existante jamais chargée ici (sauvegarde avant la fin du préchargement,
+            # chargement en échec) : la remplacer perdrait tous ses chunks
+            raise RuntimeError(f"Base {path} non chargée : sauvegarde refusée")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
         
-        with open(f"{path}.data", "wb") as f:
-            pickle.dump(data, f)
+        with self.lock:
+            # Les chunks (et les vecteurs exacts) sont toujours écrits avant l'index
+            self.store.save(path)
+            self._write_exact(path)
+            
+            # Sauvegarder index FAISS
+            tmp_path = f"{path}.index.tmp"
+            faiss.write_index(self.index, tmp_path)
+            with open(tmp_path, "rb") as f:
+                os.fsync(f.fileno())
+            atomic_replace(tmp_path, f"{path}.index")
+            
+            # Petites informations de l'index
+            self.generation += 1
+            info = {
+                "dimension": self.dimension,
+                "index_type": self.index_type,
+                "trained_size": self.trained_size,
+                "generation": self.generation
+            }
+            with open(f"{path}.json.tmp", "w") as f:
+                json.dump(info, f)
+            atomic_replace(f"{path}.json.tmp", f"{path}.json")
+            
+            # Ids supprimés, réécrits en entier
+            with open(f"{path}.deleted.tmp", "wb") as f:
+                f.write(np.array(sorted(self.deleted), dtype="<i8").tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            atomic_replace(f"{path}.deleted.tmp", f"{path}.deleted")
+            self._pending_deleted = []
+            
+            # Le journal repart de la taille actuelle de l'index
+            self.wal = WriteAheadLog(f"{path}.wal", self.dimension)
+            self.wal.reset(self.index.ntotal)
+            self._pending_vectors = []
+            self._needs_snapshot = False
+            self.path = path
+            self.loaded = True
+            self._publish(path)
     
     def load(self, path: str = "data/vector_store") -> bool:
-        """Charger"""
+        """Charger le snapshot puis rejouer le journal"""
+        if self.read_only:
+            return self._load_read_only(path)
         if os.path.exists(f"{path}.index"):
             try:
-                self.index = faiss.read_index(f"{path}.index")
-                
-                with open(f"{path}.data", "rb") as f:
-                    data = pickle.load(f)
-                
-                self.chunks = data["chunks"]
-                self.metadata = data.get("metadata", [{}] * len(self.chunks))
-                self.dimension = data.get("dimension", 384)
+                with self.lock:
+                    index = faiss.read_index(f"{path}.index")
+                    
+                    if not self.store.load(path) and os.path.exists(f"{path}.data"):
+                        # Ancien format : migrer le pickle vers les colonnes
+                        self._migrate_pickle(path)
+                    
+                    info = {}
+                    if os.path.exists(f"{path}.json"):
+                        with open(f"{path}.json") as f:
+                            info = json.load(f)
+                    self.dimension = info.get("dimension", index.d)
+                    self.trained_size = info.get("trained_size", index.ntotal)
+                    self.generation = info.get("generation", 0)
+                    self.version = self.read_version(path)
+                    
+                    # Rejouer les ajouts journalisés après le snapshot
+                    wal = WriteAheadLog(f"{path}.wal", self.dimension)
+                    vectors = wal.replay()
+                    if vectors is not None:
+                        skip = index.ntotal - wal.base
+                        if 0 <= skip < len(vectors):
+                            index.add(vectors[skip:])
+                            logger.info(f"{len(vectors) - skip} vecteurs rejoués depuis {path}.wal")
+                        elif skip < 0:
+                            logger.warning(f"Journal {path}.wal en avance sur l'index, ignoré")
+                    with self._index_lock.write():
+                        self.index = index
+                    
+                    # L'index et les chunks doivent toujours avoir la même taille
+                    self._align()
+                    self._load_deleted(path)
+                    self._load_exact(path, wal, vectors)
+                    
+                    self.path = path
+                    self._pending_vectors = []
+                    self._needs_snapshot = False
+                    # Un journal qui ne prolonge pas exactement l'index sera recréé au prochain save
+                    consistent = vectors is not None and wal.base + wal.rows == self.index.ntotal
+                    self.wal = wal if consistent else None
+                    
+                    # Le type configuré l'emporte : migrer l'index si besoin
+                    self._maybe_rebuild()
+                    self.loaded = True
                 return True
             except Exception as e:
                 print(f"Erreur de chargement: {e}")
+            return False
         
+        # Pas encore de base : la première sauvegarde la crée
+        self.loaded = True
+        return False
+    
+    def _load_deleted(self, path: str):
+        deleted = np.zeros(0, dtype="<i8")
+        if os.path.exists(f"{path}.deleted"):
+            # Un id partiellement écrit est ignoré
+            size = os.path.getsize(f"{path}.deleted") // 8
+            deleted = np.fromfile(f"{path}.deleted", dtype="<i8", count=size)
+        self.deleted = {int(i) for i in deleted if i < self.ntotal}
+        self._pending_deleted = []
+        self._selector = None
+        self._lookup = None
+        self._lexical = None
+    
+    def _read_info(self, path: str) -> Dict:
+        if not os.path.exists(f"{path}.json"):
+            return {}
+        with open(f"{path}.json") as f:
+            return json.load(f)
+    
+    def _load_read_only(self, path: str) -> bool:
+        """Lecteur : mapper le snapshot écrit par le worker écrivain, sans rien modifier"""
+        if not os.path.exists(f"{path}.index"):
+            return False
+        try:
+            with self.lock:
+                # Version lue en premier : les données sur disque sont au moins aussi récentes
+                version = self.read_version(path)
+                info = self._read_info(path)
+                # Pages de l'index partagées entre processus (faiss >= 1.9)
+                index = faiss.read_index(f"{path}.index", getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP))
+                self.dimension = info.get("dimension", index.d)
+                self.trained_size = info.get("trained_size", index.ntotal)
+                self.generation = info.get("generation", 0)
+                
+                wal = WriteAheadLog(f"{path}.wal", self.dimension)
+                vectors = wal.replay(read_only=True)
+                if vectors is None or wal.base != index.ntotal:
+                    # Journal d'un autre snapshot : il sera relu à la prochaine version
+                    vectors = np.zeros((0, self.dimension), dtype="float32")
+                
+                self.store.load(path, read_only=True, limit=index.ntotal + len(vectors))
+                vectors = vectors[:max(0, len(self.store) - index.ntotal)]
+                delta = faiss.IndexFlatL2(self.dimension)
+                delta.add(vectors)
+                with self._index_lock.write():
+                    self.index, self.delta = index, delta
+                self._load_deleted(path)
+                self.path = path
+                self.version = version
+            return True
+        except Exception as e:
+            print(f"Erreur de chargement: {e}")
         return False
+    
+    def refresh(self) -> bool:
+        """Lecteur : prendre en compte les écritures publiées depuis le dernier chargement"""
+        path = self.path or "data/vector_store"
+        version = self.read_version(path)
+        if version is None or version == self.version:
+            return False
+        
+        with self.lock:
+            info = self._read_info(path)
+            base = self.index.ntotal
+            applied = self.delta.ntotal if self.delta is not None else 0
+            wal = WriteAheadLog(f"{path}.wal", self.dimension)
+            vectors = wal.replay(start=applied, read_only=True)
+            if info.get("generation", 0) != self.generation or vectors is None or wal.base != base:
+                # Nouveau snapshot : tout recharger
+                old_deleted = set(self.deleted)
+                self._load_read_only(path)
+                self._notify_deleted(sorted(self.deleted - old_deleted))
+                return True
+            
+            first_id = base + applied
+            self.store.load(path, read_only=True, limit=first_id + len(vectors))
+            vectors = vectors[:max(0, len(self.store) - first_id)]
+            if len(vectors):
+                # Nouvel index delta puis échange : les recherches en cours ne sont pas perturbées
+                delta = faiss.IndexFlatL2(self.dimension)
+                if applied:
+                    delta.add(self.delta.reconstruct_n(0, applied))
+                delta.add(vectors)
+                with self._index_lock.write():
+                    self.delta = delta
+                ids = range(first_id, first_id + len(vectors))
+                self._track(first_id, [self.store.text(i) for i in ids], [self.store.metadata(i) for i in ids])
+            
+            deleted = np.zeros(0, dtype="<i8")
+            if os.path.exists(f"{path}.deleted"):
+                size = os.path.getsize(f"{path}.deleted") // 8
+                deleted = np.fromfile(f"{path}.deleted", dtype="<i8", count=size)
+            removed = self._forget([int(i) for i in deleted if int(i) not in self.deleted])
+            self.version = version
+        
+        self._notify_deleted(removed)
+        return True
+    
+    def _notify_deleted(self, ids: List[int]):
+        if ids:
+            for listener in self.delete_listeners:
+                listener(ids)
+    
+    def _align(self):
+        """Couper ce qui dépasse après une écriture interrompue"""
+        n, count = self.index.ntotal, len(self.store)
+        if count > n:
+            logger.warning(f"{count - n} chunks sans vecteur retirés")
+            self.store.truncate(n)
+        elif count < n:
+            logger.warning(f"{n - count} vecteurs sans chunk retirés")
+            ivf = faiss.try_extract_index_ivf(self.index)
+            if ivf is not None:
+                # Retirer la fin sans réentraîner sur des vecteurs reconstruits
+                with self._index_lock.write():
+                    ivf.set_direct_map_type(faiss.DirectMap.NoMap)
+                    self.index.remove_ids(faiss.IDSelectorRange(count, n))
+                    ivf.make_direct_map()
+                return
+            index_type = index_type_of(self.index) if count >= VECTOR_INDEX_MIN_TRAIN else "flat"
+            index = self._build(index_type, self._all_vectors()[:count])
+            with self._index_lock.write():
+                self.index = index
+    
+    def _migrate_pickle(self, path: str):
+        with open(f"{path}.data", "rb") as f:
+            data = pickle.load(f)
+        
+        chunks = data["chunks"]
+        self.store.append(chunks, data.get("metadata") or [{} for _ in chunks])
+        self.store.save(path)
+        logger.info(f"{len(chunks)} chunks migrés de {path}.data vers le stockage en colonnes")
+
+def _create_store():
+    if VECTOR_SHARDS > 1:
+        # Shards servis par des processus locaux
+        from app.services.sharding import ShardedVectorStore
+        return ShardedVectorStore(VECTOR_SHARDS)
+    # Plusieurs workers : un seul écrit, les autres lisent les fichiers qu'il publie
+    return VectorStore(read_only=not is_writer())
 
 # Instance globale
-vector_store = VectorStore()
+vector_store = _create_store()
 
-# Charger au démarrage si existant
-vector_store.load()
\ No newline at end of file
+# Chargé au démarrage, en arrière-plan (voir app.services.warmup)
\ No newline at end of file
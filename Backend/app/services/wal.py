@@ -0,0 +1,115 @@
+import logging
+import os
+import struct
+import zlib
+from typing import Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# En-tête du fichier : magic, id du premier vecteur journalisé, dimension
+FILE_HEADER = struct.Struct("<4sQI")
+FILE_MAGIC = b"NXWL"
+# En-tête d'un enregistrement : nombre de vecteurs, crc32 des données
+RECORD_HEADER = struct.Struct("<II")
+
+def _fsync_dir(path: str):
+    # Rendre le renommage durable (sans effet sous Windows)
+    if os.name == "nt":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomic_replace(tmp_path: str, path: str):
+    """Remplacer un fichier par sa version temporaire de façon atomique"""
+    os.replace(tmp_path, path)
+    _fsync_dir(path)
+
+class WriteAheadLog:
+    """Journal append-only des vecteurs ajoutés depuis le dernier snapshot de l'index.
+
+    Le fichier commence par l'id (position dans l'index) du premier vecteur
+    journalisé ; chaque enregistrement contient un lot de vecteurs et son crc32."""
+
+    def __init__(self, path: str, dimension: int):
+        self.path = path
+        self.dimension = dimension
+        self.base = 0
+        self.rows = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def reset(self, base: int):
+        """Repartir d'un journal vide commençant à l'id `base`"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(FILE_HEADER.pack(FILE_MAGIC, base, self.dimension))
+            f.flush()
+            os.fsync(f.fileno())
+        atomic_replace(tmp_path, self.path)
+        self.base = base
+        self.rows = 0
+
+    def append(self, vectors: np.ndarray):
+        if len(vectors) == 0:
+            return
+        payload = np.ascontiguousarray(vectors, dtype="<f4").tobytes()
+        with open(self.path, "ab") as f:
+            f.write(RECORD_HEADER.pack(len(vectors), zlib.crc32(payload)) + payload)
+            f.flush()
+            os.fsync(f.fileno())
+        self.rows += len(vectors)
+
+    def replay(self, start: int = 0, read_only: bool = False) -> Optional[np.ndarray]:
+        """Lire les vecteurs valides à partir de la ligne `start` ; un enregistrement
+        incomplet ou corrompu (écriture interrompue) termine le journal et est retiré
+        du fichier, sauf en lecture seule (il peut être en cours d'écriture)"""
+        if not self.exists():
+            return None
+
+        with open(self.path, "rb") as f:
+            header = f.read(FILE_HEADER.size)
+            if len(header) < FILE_HEADER.size:
+                logger.warning(f"Journal {self.path} illisible, ignoré")
+                return None
+            magic, base, dimension = FILE_HEADER.unpack(header)
+            if magic != FILE_MAGIC or dimension != self.dimension:
+                logger.warning(f"Journal {self.path} incompatible, ignoré")
+                return None
+
+            size = os.path.getsize(self.path)
+            blocks = []
+            rows = 0
+            valid_end = f.tell()
+            while True:
+                record = f.read(RECORD_HEADER.size)
+                if len(record) < RECORD_HEADER.size:
+                    break
+                n, crc = RECORD_HEADER.unpack(record)
+                if rows + n <= start and valid_end + RECORD_HEADER.size + n * dimension * 4 <= size:
+                    # Enregistrement déjà lu : on le saute
+                    f.seek(n * dimension * 4, os.SEEK_CUR)
+                    rows += n
+                    valid_end = f.tell()
+                    continue
+                payload = f.read(n * dimension * 4)
+                if len(payload) < n * dimension * 4 or zlib.crc32(payload) != crc:
+                    break
+                block = np.frombuffer(payload, dtype="<f4").reshape(n, dimension)
+                blocks.append(block[max(0, start - rows):])
+                rows += n
+                valid_end = f.tell()
+
+        if valid_end < os.path.getsize(self.path) and not read_only:
+            logger.warning(f"Fin du journal {self.path} tronquée (écriture interrompue)")
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_end)
+
+        vectors = np.concatenate(blocks) if blocks else np.zeros((0, dimension), dtype="float32")
+        self.base = base
+        self.rows = rows
+        return vectors.astype("float32")
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+from app.config import RETRIEVAL_MODE
+from app.services.embeddings import get_model
+from app.services.executor import run_inference
+from app.services.sources import source_registry
+from app.services.vector_store import vector_store
+
+logger = logging.getLogger(__name__)
+
+class Warmup:
+    """Chargement en arrière-plan au démarrage : index, modèle, encodage et recherche d'essai.
+
+    Le serveur répond (liveness) pendant ce temps ; il n'est prêt (readiness)
+    qu'une fois tout chargé."""
+
+    def __init__(self):
+        self.state = "starting"
+        self.error: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+        self.started_at = time.time()
+        self._done: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self):
+        if self._task is None:
+            self._done = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def wait(self):
+        """Attendre la fin du préchargement (réussi ou non), en le lançant si besoin"""
+        self.start()
+        await self._done.wait()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _step(self, name: str, func, *args):
+        self.state = name
+        start = time.perf_counter()
+        result = await func(*args)
+        self.timings[name] = round(time.perf_counter() - start, 3)
+        return result
+
+    def _load_index(self):
+        vector_store.load()
+        if getattr(vector_store, "read_only", False):
+            return
+        # URLs sans chunk dans l'index chargé (nombre de shards modifié, index perdu) :
+        # oubliées du registre, la prochaine ingestion les retélécharge en entier
+        orphans = source_registry.retain({source["url"] for source in vector_store.url_stats()})
+        if orphans:
+            logger.warning(f"{orphans} sources sans chunk retirées du registre")
+
+    async def _run(self):
+        try:
+            await self._step("loading_index", asyncio.to_thread, self._load_index)
+            model = await self._step("loading_model", asyncio.to_thread, get_model)
+            # Premier encodage et première recherche : allocations, threads torch et faiss
+            vector = await self._step("encoding", run_inference, lambda: model.encode(["warmup"])[0].tolist())
+            if vector_store.count:
+                if RETRIEVAL_MODE == "hybrid":
+                    # Construit aussi l'index BM25
+                    await self._step("searching", run_inference, vector_store.hybrid_search, vector, "warmup", 1)
+                else:
+                    await self._step("searching", run_inference, vector_store.search, vector, 1)
+            self.state = "ready"
+            logger.info(f"Préchargement terminé en {time.time() - self.started_at:.1f}s: {self.timings}")
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logger.error(f"Échec du préchargement: {e}")
+        finally:
+            self._done.set()
+
+    def to_dict(self) -> Dict:
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "error": self.error,
+            "timings": self.timings
+        }
+
+# Instance globale
+warmup = Warmup()
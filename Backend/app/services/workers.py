@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+import httpx
+from fastapi import Request, Response
+from app.config import WRITER_SOCKET, INDEX_RELOAD_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+def is_writer() -> bool:
+    """Ce worker ingère et écrit la base (toujours vrai avec un seul processus)"""
+    return os.getenv("WORKER_ROLE", "writer") != "reader"
+
+class WriterProxy:
+    """Relaie les requêtes d'ingestion d'un worker lecteur vers l'écrivain (socket Unix)"""
+
+    def __init__(self, socket_path: str = WRITER_SOCKET):
+        self.socket_path = socket_path
+        self._loop = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        # Le client est lié à la boucle courante
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(uds=self.socket_path),
+                base_url="http://writer",
+                timeout=30
+            )
+        return self._client
+
+    async def forward(self, request: Request) -> Response:
+        client = self._ensure_client()
+        response = await client.request(
+            request.method,
+            request.url.path,
+            params=request.query_params,
+            content=await request.body(),
+            headers={"content-type": request.headers.get("content-type", "application/json")}
+        )
+        return Response(response.content, status_code=response.status_code,
+                        media_type=response.headers.get("content-type"))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+class IndexReloader:
+    """Worker lecteur : relit la base dès que l'écrivain publie une nouvelle version"""
+
+    def __init__(self, interval: float = INDEX_RELOAD_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, store, ready=None, registry=None):
+        """`ready` : attendu avant la première relecture (chargement initial) ;
+        `registry` : registre des sources, relu lui aussi"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(store, ready, registry))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, store, ready, registry):
+        if ready is not None:
+            await ready
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if await asyncio.to_thread(store.refresh):
+                    logger.info(f"Base rechargée (version {store.version}, {store.count} vecteurs)")
+            except Exception as e:
+                logger.error(f"Erreur de rechargement de la base: {e}")
+            if registry is not None:
+                try:
+                    await asyncio.to_thread(registry.refresh)
+                except Exception as e:
+                    logger.error(f"Erreur de rechargement des sources: {e}")
+
+# Instances globales
+writer_proxy = WriterProxy()
+index_reloader = IndexReloader()
@@ -0,0 +1,93 @@
+"""Rappel et latence des index ANN (IVF-Flat, IVF-PQ, HNSW) face à l'index exact.
+
+Corpus synthétique (mélange de gaussiennes normalisées, dimension 384) :
+    python benchmarks/ann_recall.py --size 1000000 --queries 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+import faiss
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.services.vector_store import make_index
+
+def synthetic_corpus(n, dimension, clusters, seed=0):
+    """Vecteurs regroupés autour de centres, comme des embeddings réels"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype("float32")
+    vectors = np.empty((n, dimension), dtype="float32")
+    step = 100_000
+    for start in range(0, n, step):
+        end = min(n, start + step)
+        labels = rng.integers(0, clusters, end - start)
+        vectors[start:end] = centers[labels] + 0.5 * rng.standard_normal((end - start, dimension)).astype("float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+def measure(index, queries, ground_truth, k, params=None):
+    latencies = []
+    found = 0
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        if params is None:
+            _, indices = index.search(query[None, :], k)
+        else:
+            _, indices = index.search(query[None, :], k, params=params)
+        latencies.append(time.perf_counter() - start)
+        found += len(set(indices[0]) & set(ground_truth[i]))
+    latencies = np.array(latencies) * 1000
+    return {
+        "recall_at_k": round(found / (len(queries) * k), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3)
+    }
+
+def main(args):
+    corpus = synthetic_corpus(args.size, args.dimension, args.clusters)
+    queries = synthetic_corpus(args.queries, args.dimension, args.clusters, seed=1)
+
+    results = {"size": args.size, "dimension": args.dimension, "k": args.k, "indexes": {}}
+
+    flat = make_index("flat", args.dimension)
+    flat.add(corpus)
+    _, ground_truth = flat.search(queries, args.k)
+    results["indexes"]["flat"] = {"build_s": 0.0, "runs": [measure(flat, queries, ground_truth, args.k)]}
+    del flat
+
+    sweeps = {
+        "ivf_flat": [("nprobe", n) for n in (1, 4, 16, 64)],
+        "ivf_pq": [("nprobe", n) for n in (1, 4, 16, 64)],
+        "hnsw": [("ef_search", ef) for ef in (16, 32, 64, 128)]
+    }
+    for index_type, settings in sweeps.items():
+        start = time.perf_counter()
+        index = make_index(index_type, args.dimension, args.size)
+        if not index.is_trained:
+            index.train(corpus[:min(args.size, args.train_size)])
+        index.add(corpus)
+        build_s = time.perf_counter() - start
+
+        runs = []
+        for name, value in settings:
+            if name == "nprobe":
+                params = faiss.SearchParametersIVF(nprobe=value)
+            else:
+                params = faiss.SearchParametersHNSW(efSearch=value)
+            runs.append({name: value, **measure(index, queries, ground_truth, args.k, params)})
+        results["indexes"][index_type] = {"build_s": round(build_s, 2), "runs": runs}
+        del index
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--train-size", type=int, default=200_000)
+    parser.add_argument("--k", type=int, default=10)
+    main(parser.parse_args())
@@ -0,0 +1,106 @@
+"""Nettoyage et découpage d'une grande page : ancien traitement (listes complètes)
+face au découpage au fil de l'eau. Mesure le temps, le pic mémoire (tracemalloc,
+passe séparée) et vérifie que les chunks sont identiques, offsets compris :
+    python benchmarks/chunking.py --mb 5 --size 300
+    python benchmarks/chunking.py --mb 5 --size 300 --single-line
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.services.cleaner import clean_text, iter_clean_lines
+from app.services.chunker import iter_chunks
+
+def page(mb, single_line=False):
+    lines = []
+    size = 0
+    i = 0
+    while size < mb * 1024 * 1024:
+        line = f"Paragraphe {i} :   un texte   assez long pour être conservé par le nettoyage, numéro {i * 7}."
+        lines += [line] if single_line else [line, "Menu", "---"]
+        size += len(line) + 10
+        i += 1
+    # Une seule ligne : page sans retours à la ligne (HTML minifié)
+    return (" " if single_line else "\n").join(lines)
+
+def legacy(text, size, overlap):
+    # Traitement d'origine (clean_text puis chunk_text), copié tel quel : les espaces
+    # sont réduits avant la coupure en lignes, le filtre porte donc sur tout le texte
+    text = re.sub(r'\s+', ' ', text)
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    cleaned = ' '.join(line for line in lines if len(line) > 30 and any(c.isalnum() for c in line))
+    words = cleaned.split()
+    if len(words) <= size:
+        return [" ".join(words)]
+    chunks = []
+    i = 0
+    while i < len(words):
+        chunks.append(" ".join(words[i:i + size]))
+        i += size - overlap
+    return chunks
+
+def reference(text, size, overlap):
+    # Résultat attendu du découpage au fil de l'eau, calculé sur des listes complètes :
+    # lignes filtrées puis espaces réduits, pas de chunk fait uniquement de l'overlap
+    words = clean_text(text).split()
+    chunks = []
+    i = 0
+    while i < len(words):
+        chunks.append(" ".join(words[i:i + size]))
+        if i + size >= len(words):
+            break
+        i += size - overlap
+    return chunks
+
+def streaming(text, size, overlap):
+    # Les chunks sont consommés un à un, comme à l'ingestion
+    count = 0
+    for _ in iter_chunks(text, iter_clean_lines(text), size, overlap):
+        count += 1
+    return count
+
+def measure(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": round(elapsed, 3), "peak_mb": round(peak / 1024 / 1024, 1)}
+
+def main(args):
+    text = page(args.mb, args.single_line)
+    expected = reference(text, args.size, args.overlap)
+
+    count = 0
+    identical = True
+    for chunk in iter_chunks(text, iter_clean_lines(text), args.size, args.overlap):
+        # Les offsets encadrent exactement le premier et le dernier mot du chunk
+        words = chunk["text"].split()
+        identical &= text.startswith(words[0], chunk["start"]) and text.endswith(words[-1], 0, chunk["end"])
+        identical &= count < len(expected) and chunk["text"] == expected[count]
+        count += 1
+
+    results = {
+        "page_mb": round(len(text) / 1024 / 1024, 1),
+        "chunks": count,
+        "legacy": {"chunks": len(legacy(text, args.size, args.overlap)), **measure(legacy, text, args.size, args.overlap)},
+        "streaming": measure(streaming, text, args.size, args.overlap),
+        "identical": identical and count == len(expected)
+    }
+    print(json.dumps(results, indent=2))
+    sys.exit(0 if results["identical"] else 1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mb", type=float, default=5)
+    parser.add_argument("--size", type=int, default=300)
+    parser.add_argument("--overlap", type=int, default=2)
+    parser.add_argument("--single-line", action="store_true", help="Page d'une seule ligne")
+    main(parser.parse_args())
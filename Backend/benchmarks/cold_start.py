@@ -0,0 +1,78 @@
+"""Démarrage à froid : temps d'import de app.main, délai avant liveness et readiness,
+latence de la première question.
+
+Chaque mesure lance un nouveau processus (python -m uvicorn) :
+    python benchmarks/cold_start.py --runs 3 --port 8765
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import httpx
+
+BACKEND = os.path.join(os.path.dirname(__file__), "..")
+
+def import_time():
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+def wait_for(client, path, deadline, status=200):
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(path).status_code == status:
+                return True
+        except httpx.TransportError:
+            pass
+        time.sleep(0.02)
+    return False
+
+def one_run(port, question, ask_before_ready, timeout):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND
+    )
+    start = time.perf_counter()
+    deadline = start + timeout
+    result = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            wait_for(client, "/api/health/live", deadline)
+            result["live_s"] = round(time.perf_counter() - start, 3)
+
+            if ask_before_ready:
+                # Question envoyée dès que le processus répond : elle attend la fin du préchargement
+                t = time.perf_counter()
+                client.post("/api/ask", json={"question": question})
+                result["first_ask_s"] = round(time.perf_counter() - t, 3)
+
+            wait_for(client, "/api/health/ready", deadline)
+            result["ready_s"] = round(time.perf_counter() - start, 3)
+            result["warmup"] = client.get("/api/health/ready").json().get("timings")
+
+            if not ask_before_ready:
+                t = time.perf_counter()
+                client.post("/api/ask", json={"question": question})
+                result["first_ask_s"] = round(time.perf_counter() - t, 3)
+    finally:
+        server.terminate()
+        server.wait()
+    return result
+
+def main(args):
+    results = {
+        "import_s": [round(import_time(), 3) for _ in range(args.runs)],
+        "after_ready": [one_run(args.port, args.question, False, args.timeout) for _ in range(args.runs)],
+        "before_ready": [one_run(args.port, args.question, True, args.timeout) for _ in range(args.runs)]
+    }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--question", default="Qu'est-ce que Python ?")
+    parser.add_argument("--timeout", type=float, default=120)
+    main(parser.parse_args())
@@ -0,0 +1,80 @@
+"""Débit et équivalence des backends d'embedding face à la référence PyTorch.
+
+Pour chaque backend : temps de chargement, textes/s par taille de lot, et dérive
+cosinus par rapport à torch (moyenne, pire cas). Le code de sortie vaut 1 si un
+backend dépasse sa borne de dérive :
+    python benchmarks/embedding_backends.py --backends torch int8 onnx onnx_int8 --threads 4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.services.embeddings import make_backend
+from app.config import EMBEDDING_MODEL
+
+# Similarité cosinus minimale (pire cas) attendue face à la référence
+MIN_COSINE = {"torch": 0.9999, "onnx": 0.999, "int8": 0.97, "onnx_int8": 0.97}
+
+SUBJECTS = ["Python", "la photosynthèse", "le protocole HTTP", "la Révolution française", "les bases vectorielles",
+            "le machine learning", "la tour Eiffel", "les réseaux de neurones", "le système solaire", "Linux"]
+TEMPLATES = [
+    "Qu'est-ce que {s} ?",
+    "{s} est un sujet étudié depuis longtemps, avec de nombreuses applications pratiques et théoriques.",
+    "Explique en quelques phrases le fonctionnement de {s} et ses principales limites.",
+    "What is {s} and why does it matter?",
+    "Résumé : " + " ".join(["{s} intervient dans ce contexte."] * 12)
+]
+
+def corpus(n):
+    texts = [template.format(s=subject) for template in TEMPLATES for subject in SUBJECTS]
+    return [texts[i % len(texts)] + f" ({i})" for i in range(n)]
+
+def cosine(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.sum(a * b, axis=1)
+
+def main(args):
+    texts = corpus(args.texts)
+    results = {"model": EMBEDDING_MODEL, "texts": len(texts), "threads": args.threads, "backends": {}}
+    reference = None
+    failed = False
+
+    for name in ["torch"] + [b for b in args.backends if b != "torch"]:
+        start = time.perf_counter()
+        try:
+            backend = make_backend(name, threads=args.threads)
+        except ImportError as e:
+            results["backends"][name] = {"skipped": str(e)}
+            continue
+        entry = {"load_s": round(time.perf_counter() - start, 2), "throughput": {}}
+
+        backend.encode(texts[:8])
+        for batch_size in args.batch_sizes:
+            start = time.perf_counter()
+            vectors = backend.encode(texts, batch_size=batch_size)
+            entry["throughput"][str(batch_size)] = round(len(texts) / (time.perf_counter() - start), 1)
+
+        if reference is None:
+            reference = vectors
+        similarity = cosine(vectors, reference)
+        entry["cosine_mean"] = round(float(similarity.mean()), 6)
+        entry["cosine_min"] = round(float(similarity.min()), 6)
+        entry["within_bounds"] = bool(similarity.min() >= MIN_COSINE.get(name, 0.97))
+        failed |= not entry["within_bounds"]
+        results["backends"][name] = entry
+
+    print(json.dumps(results, indent=2))
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx", "onnx_int8"])
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--threads", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,112 @@
+"""Recherche filtrée (URL, domaine, période d'ajout) face à la recherche sans filtre,
+et face au sur-échantillonnage filtré en Python (top-k x `--overfetch` puis filtre).
+
+Corpus synthétique réparti sur des domaines de tailles inégales (loi de Zipf) ;
+rappel mesuré contre la recherche exacte restreinte aux chunks autorisés :
+    python benchmarks/filtered_search.py --size 1000000 --index-types flat hnsw ivf_flat
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+import faiss
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.services.vector_store import VectorStore
+from ann_recall import synthetic_corpus
+
+def domain_sizes(n, domains):
+    weights = 1.0 / np.arange(1, domains + 1)
+    return np.maximum(1, (weights / weights.sum() * n).astype(int))
+
+def fill(store, vectors, domains, pages):
+    """Chunks regroupés par page (comme à l'ingestion), pages réparties sur les domaines"""
+    labels = np.repeat(np.arange(domains), domain_sizes(len(vectors), domains))[:len(vectors)]
+    labels = np.pad(labels, (0, len(vectors) - len(labels)), constant_values=domains - 1)
+    step = 50_000
+    for start in range(0, len(vectors), step):
+        end = min(len(vectors), start + step)
+        store.add_documents(
+            vectors[start:end],
+            [f"chunk {i}" for i in range(start, end)],
+            [{"url": f"https://site{labels[i]}.example/page{i // pages}"} for i in range(start, end)]
+        )
+    return labels
+
+def filters(store, labels, pages):
+    """Filtres de sélectivité croissante"""
+    counts = np.bincount(labels)
+    big, small = int(np.argmax(counts)), int(np.argsort(counts)[len(counts) // 2])
+    until = store.metadata[len(labels) // 10]["ingested_at"]
+    return {
+        "url": {"urls": [f"https://site{labels[0]}.example/page0"]},
+        "small_domain": {"domains": [f"site{small}.example"]},
+        "large_domain": {"domains": [f"site{big}.example"]},
+        "first_10pct": {"until": until}
+    }
+
+def latencies(func, queries):
+    """Ids trouvés pour chaque requête, et latences"""
+    found, values = [], []
+    for query in queries:
+        start = time.perf_counter()
+        found.append([result["id"] for result in func(query)])
+        values.append(time.perf_counter() - start)
+    values = np.array(values) * 1000
+    return found, {"p50_ms": round(float(np.percentile(values, 50)), 3), "p99_ms": round(float(np.percentile(values, 99)), 3)}
+
+def recall(found, truth):
+    return len(set(found) & set(truth)) / len(truth) if len(truth) else 1.0
+
+def main(args):
+    corpus = synthetic_corpus(args.size, args.dimension, clusters=max(1, args.size // 1000))
+    queries = synthetic_corpus(args.queries, args.dimension, clusters=max(1, args.size // 1000), seed=1)
+    results = {"size": args.size, "k": args.k, "runs": {}}
+
+    for index_type in args.index_types:
+        store = VectorStore(args.dimension, index_type)
+        start = time.perf_counter()
+        labels = fill(store, corpus, args.domains, args.pages)
+        run = {"build_s": round(time.perf_counter() - start, 2)}
+        _, run["unfiltered"] = latencies(lambda q: store.search(q, args.k), queries)
+
+        for name, search_filter in filters(store, labels, args.pages).items():
+            id_filter = store._resolve(search_filter)
+            allowed = id_filter.ids if id_filter.ids is not None else np.arange(id_filter.lo, id_filter.hi)
+            _, truth = faiss.knn(queries, corpus[allowed], min(args.k, len(allowed)))
+            truth = [allowed[row] for row in truth]
+
+            found, timing = latencies(lambda q: store.search(q, args.k, filter=search_filter), queries)
+            entry = {"chunks": len(allowed), **timing,
+                     "recall": round(float(np.mean([recall(f, t) for f, t in zip(found, truth)])), 4)}
+
+            # Référence : top-k élargi sans filtre, puis filtre en Python
+            allowed_set = set(allowed.tolist())
+            found, timing = latencies(lambda q: [r for r in store.search(q, args.k * args.overfetch)
+                                                 if r["id"] in allowed_set][:args.k], queries)
+            entry["overfetch"] = {**timing, "recall": round(float(np.mean([recall(f, t) for f, t in zip(found, truth)])), 4)}
+            run[name] = entry
+
+        # Suppression d'une URL : ids lus dans l'index des métadonnées
+        url = filters(store, labels, args.pages)["url"]["urls"][0]
+        start = time.perf_counter()
+        deleted = store.delete_url(url)
+        run["delete_url"] = {"chunks": deleted, "ms": round((time.perf_counter() - start) * 1000, 3)}
+        results["runs"][index_type] = run
+        del store
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--domains", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=50, help="Chunks par page")
+    parser.add_argument("--overfetch", type=int, default=10)
+    parser.add_argument("--index-types", nargs="+", default=["flat", "hnsw"])
+    main(parser.parse_args())
@@ -0,0 +1,66 @@
+"""Latence de /api/health pendant un trafic concurrent sur /api/ask.
+
+Usage (serveur démarré avec `python run.py`) :
+    python benchmarks/health_under_load.py --base-url http://localhost:8000 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import time
+import httpx
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def summary(latencies):
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 2)
+    }
+
+async def probe_health(client, duration):
+    latencies = []
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        await client.get("/api/health")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.05)
+    return latencies
+
+async def ask_loop(client, duration, question):
+    latencies = []
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        await client.post("/api/ask", json={"question": question})
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120) as client:
+        # Référence : health sans charge
+        idle = await probe_health(client, args.duration / 2)
+
+        tasks = [ask_loop(client, args.duration, args.question) for _ in range(args.concurrency)]
+        loaded, *asks = await asyncio.gather(probe_health(client, args.duration), *tasks)
+
+    print(json.dumps({
+        "concurrency": args.concurrency,
+        "health_idle": summary(idle),
+        "health_under_load": summary(loaded),
+        "ask": summary([latency for latencies in asks for latency in latencies])
+    }, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--question", default="Qu'est-ce que Python ?")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,96 @@
+"""Extraction HTML sur un corpus de pages enregistrées : vitesse de chaque analyseur
+et parité du texte extrait avec l'ancienne extraction (BeautifulSoup + if/elif).
+
+Le corpus est un dossier de fichiers .html ; manifest.json donne l'URL d'origine de
+chaque page (elle choisit la stratégie). Code de sortie 1 si la parité est insuffisante :
+    python benchmarks/html_extraction.py --dir benchmarks/fixtures/html --repeat 20
+"""
+import argparse
+import difflib
+import json
+import os
+import sys
+import time
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.services.extraction import Extractor, make_parser, PARSERS
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "html")
+
+def legacy_extract(html, url):
+    # Extraction d'origine, gardée comme référence
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup(['script', 'style', 'nav', 'footer', 'header',
+                         'iframe', 'noscript', 'svg', 'img', 'form']):
+        element.decompose()
+    if 'wikipedia.org' in url:
+        content_div = soup.find('div', {'id': 'mw-content-text'})
+        if content_div:
+            for ref in content_div.find_all(class_='reference'):
+                ref.decompose()
+            text = content_div.get_text(separator='\n', strip=True)
+        else:
+            text = soup.get_text(separator='\n', strip=True)
+    elif 'docs.python.org' in url:
+        main_content = soup.find('div', {'role': 'main'}) or soup.find('main')
+        text = main_content.get_text(separator='\n', strip=True) if main_content else ""
+    else:
+        main_content = soup.find('main') or soup.find('article') or soup.find('div', class_='content')
+        text = main_content.get_text(separator='\n', strip=True) if main_content else soup.get_text(separator='\n', strip=True)
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    return '\n'.join(line for line in lines if len(line) > 20)
+
+def load_corpus(directory):
+    manifest = {}
+    if os.path.exists(os.path.join(directory, "manifest.json")):
+        with open(os.path.join(directory, "manifest.json")) as f:
+            manifest = json.load(f)
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith((".html", ".htm")):
+            with open(os.path.join(directory, name), encoding="utf-8", errors="replace") as f:
+                pages.append((name, manifest.get(name, f"https://example.invalid/{name}"), f.read()))
+    return pages
+
+def timed(func, html, url, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        text = func(html, url)
+    return text, (time.perf_counter() - start) / repeat
+
+def main(args):
+    pages = load_corpus(args.dir)
+    extractors = {name: Extractor(make_parser(name)) for name in args.parsers}
+    results = {"pages": len(pages), "repeat": args.repeat, "parsers": {}, "per_page": {}}
+    totals = {name: 0.0 for name in ["legacy"] + list(extractors)}
+    failed = False
+
+    for name, url, html in pages:
+        reference, seconds = timed(legacy_extract, html, url, args.repeat)
+        totals["legacy"] += seconds
+        entry = {"url": url, "kb": round(len(html) / 1024, 1), "legacy_ms": round(seconds * 1000, 2)}
+        for parser, extractor in extractors.items():
+            text, seconds = timed(extractor.extract, html, url, args.repeat)
+            totals[parser] += seconds
+            # Parité ligne à ligne avec l'ancienne extraction
+            ratio = difflib.SequenceMatcher(None, reference.split("\n"), text.split("\n"), autojunk=False).ratio()
+            entry[parser] = {"ms": round(seconds * 1000, 2), "identical": text == reference, "line_ratio": round(ratio, 4)}
+            failed |= ratio < args.min_ratio
+        results["per_page"][name] = entry
+
+    for parser, seconds in totals.items():
+        results["parsers"][parser] = {
+            "total_ms": round(seconds * 1000, 2),
+            "speedup": round(totals["legacy"] / seconds, 2) if seconds else None
+        }
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dir", default=FIXTURES)
+    parser.add_argument("--parsers", nargs="+", default=list(PARSERS), choices=PARSERS)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--min-ratio", type=float, default=0.99)
+    main(parser.parse_args())
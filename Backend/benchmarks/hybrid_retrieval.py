@@ -0,0 +1,99 @@
+"""Rappel et latence de la recherche vectorielle, BM25 et hybride (RRF).
+
+Corpus synthétique de fiches produits dont les questions citent un code exact
+(le cas où la recherche vectorielle seule se trompe) :
+    python benchmarks/hybrid_retrieval.py --size 5000 --queries 200 --k 3
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.services.embeddings import embed_batch
+from app.services.vector_store import VectorStore
+
+FAMILIES = ["routeur", "imprimante", "écran", "batterie", "capteur", "serveur", "casque", "clavier"]
+FEATURES = [
+    "une autonomie de {n} heures", "une garantie de {n} mois", "un poids de {n} grammes",
+    "une consommation de {n} watts", "une portée de {n} mètres", "un débit de {n} Mo/s"
+]
+QUESTIONS = [
+    "Quelles sont les caractéristiques du {code} ?",
+    "Le {code} est-il compatible avec mon installation ?",
+    "Donne-moi la fiche technique du {code}"
+]
+
+def synthetic_corpus(n, seed=0):
+    """Fiches quasi identiques qui ne diffèrent que par le code et les chiffres"""
+    rng = np.random.default_rng(seed)
+    codes, texts = [], []
+    for i in range(n):
+        code = f"{chr(65 + rng.integers(26))}{chr(65 + rng.integers(26))}-{1000 + i}"
+        family = FAMILIES[rng.integers(len(FAMILIES))]
+        features = [FEATURES[j].format(n=int(rng.integers(1, 500))) for j in rng.choice(len(FEATURES), 2, replace=False)]
+        codes.append(code)
+        texts.append(f"Le {family} {code} offre {features[0]} et {features[1]}. "
+                     f"Ce {family} est livré avec sa notice et un câble d'alimentation.")
+    return codes, texts
+
+def measure(search, queries, targets, k):
+    latencies = []
+    hits = 0
+    reciprocal_ranks = 0.0
+    for (text, vector), target in zip(queries, targets):
+        start = time.perf_counter()
+        ids = [result["id"] for result in search(text, vector, k)]
+        latencies.append(time.perf_counter() - start)
+        if target in ids:
+            hits += 1
+            reciprocal_ranks += 1.0 / (ids.index(target) + 1)
+    latencies = np.array(latencies) * 1000
+    return {
+        "recall_at_k": round(hits / len(targets), 4),
+        "mrr": round(reciprocal_ranks / len(targets), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3)
+    }
+
+def main(args):
+    codes, texts = synthetic_corpus(args.size)
+    start = time.perf_counter()
+    vectors = embed_batch(texts)
+    embed_s = time.perf_counter() - start
+
+    store = VectorStore(dimension=len(vectors[0]), index_type="flat")
+    store.add_documents(vectors, texts, [{"url": f"synthetic://{i}"} for i in range(len(texts))])
+    start = time.perf_counter()
+    store.lexical_search("warmup", 1)
+    bm25_build_s = time.perf_counter() - start
+
+    rng = np.random.default_rng(1)
+    targets = [int(i) for i in rng.choice(args.size, min(args.queries, args.size), replace=False)]
+    questions = [QUESTIONS[i % len(QUESTIONS)].format(code=codes[target]) for i, target in enumerate(targets)]
+    queries = list(zip(questions, embed_batch(questions)))
+
+    modes = {
+        "dense": lambda text, vector, k: store.search(vector, k),
+        "bm25": lambda text, vector, k: store.lexical_search(text, k),
+        "hybrid": lambda text, vector, k: store.hybrid_search(vector, text, k, args.candidates)
+    }
+    results = {
+        "size": args.size,
+        "k": args.k,
+        "candidates": args.candidates,
+        "embed_s": round(embed_s, 2),
+        "bm25_build_s": round(bm25_build_s, 3),
+        "modes": {name: measure(search, queries, targets, args.k) for name, search in modes.items()}
+    }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--candidates", type=int, default=20)
+    main(parser.parse_args())
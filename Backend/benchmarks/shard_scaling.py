@@ -0,0 +1,83 @@
+"""Latence et débit de la recherche selon le nombre de shards (1 à N processus).
+
+Corpus synthétique réparti sur de nombreux domaines, index exact par shard :
+    python benchmarks/shard_scaling.py --size 1000000 --max-shards 8
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.services.vector_store import VectorStore
+from app.services.sharding import ShardedVectorStore
+
+def synthetic_corpus(n, dimension, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((n, dimension)).astype("float32")
+
+def fill(store, vectors, domains, step=50_000):
+    for start in range(0, len(vectors), step):
+        end = min(len(vectors), start + step)
+        store.add_documents(
+            vectors[start:end],
+            [f"chunk {i}" for i in range(start, end)],
+            [{"url": f"https://site{i % domains}.example/page"} for i in range(start, end)]
+        )
+
+def measure(store, queries, k, batch):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        store.search(query, k)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch):
+        store.search_many(queries[i:i + batch], k)
+    elapsed = time.perf_counter() - start
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "batch_qps": round(len(queries) / elapsed, 1)
+    }
+
+def main(args):
+    corpus = synthetic_corpus(args.size, args.dimension)
+    queries = synthetic_corpus(args.queries, args.dimension, seed=1)
+    results = {"size": args.size, "dimension": args.dimension, "k": args.k, "cpus": os.cpu_count(), "runs": []}
+
+    # Référence : un seul index dans le processus
+    store = VectorStore(args.dimension, "flat")
+    start = time.perf_counter()
+    fill(store, corpus, args.domains)
+    results["runs"].append({"shards": 0, "build_s": round(time.perf_counter() - start, 2), **measure(store, queries, args.k, args.batch)})
+    del store
+
+    n = 1
+    while n <= args.max_shards:
+        with tempfile.TemporaryDirectory() as directory:
+            store = ShardedVectorStore(n, path=os.path.join(directory, "vector_store"), dimension=args.dimension, index_type="flat")
+            start = time.perf_counter()
+            fill(store, corpus, args.domains)
+            build_s = time.perf_counter() - start
+            results["runs"].append({"shards": n, "build_s": round(build_s, 2), **measure(store, queries, args.k, args.batch)})
+            store.close()
+        n *= 2
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--domains", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--max-shards", type=int, default=os.cpu_count() or 1)
+    main(parser.parse_args())
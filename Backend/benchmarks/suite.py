@@ -0,0 +1,307 @@
+"""Suite de référence hors ligne : ingestion, questions sous charge, mémoire et démarrage.
+
+Le serveur (uvicorn) tourne dans un dossier de travail temporaire, sans Gemini ni
+délai de politesse. Deux scénarios :
+- ingest : pages de fixtures/html servies par un serveur local (une variante
+  par copie, pour ne pas être dédupliquées), puis pages/s, chunks/s et temps par étape
+- corpus : base vectorielle synthétique de chaque taille, chargée au démarrage,
+  puis latence des questions (p50/p90/p99) sous `--concurrency` clients
+
+Le résultat (JSON) est comparé à une référence enregistrée ; code de sortie 1
+si une mesure se dégrade de plus de `--tolerance` :
+    python benchmarks/suite.py --sizes 10000 100000 1000000 --save-baseline
+    python benchmarks/suite.py --sizes 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from cold_start import import_time, wait_for
+from health_under_load import percentile
+from ann_recall import synthetic_corpus
+from html_extraction import FIXTURES, load_corpus
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Sens de chaque mesure comparée : plus haut ou plus bas est meilleur
+HIGHER = ("pages_per_s", "chunks_per_s", "qps")
+LOWER = ("_s", "_ms", "_mb")
+
+QUESTIONS = ["Qu'est-ce que Python ?", "Comment fonctionne le ramasse-miettes ?",
+             "Quelle est la différence entre une classe et une instance ?",
+             "Comment déployer une application en production ?", "Que contient la bibliothèque standard ?"]
+
+# Fin des blocs de texte : la variante de chaque copie y est insérée
+BLOCK_END_RE = re.compile(r"(</(?:p|li|td|h[1-6]|dd)>)")
+
+def serve_fixtures(directory):
+    """Serveur HTTP local : /<copie>/<fichier> renvoie la fixture, chaque bloc
+    de texte suffixé du numéro de copie (contenu distinct d'une copie à l'autre)"""
+    pages = {name: html for name, _, html in load_corpus(directory)}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parts = self.path.strip("/").split("/")
+            html = pages.get(parts[-1]) if len(parts) == 2 else None
+            if html is None:
+                self.send_error(404)
+                return
+            body = BLOCK_END_RE.sub(f" (copie {parts[0]})\\1", html).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, sorted(pages)
+
+def memory_mb(pid):
+    """Mémoire résidente et pic (Linux, /proc) ; None ailleurs"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f)
+    except OSError:
+        return {"rss_mb": None, "peak_rss_mb": None}
+    return {
+        "rss_mb": round(int(fields["VmRSS"].split()[0]) / 1024, 1),
+        "peak_rss_mb": round(int(fields["VmHWM"].split()[0]) / 1024, 1)
+    }
+
+class Server:
+    """Backend lancé dans `workdir` (data/ y est créé) ; mesure le démarrage"""
+
+    def __init__(self, workdir, port, timeout, env=None):
+        self.workdir = workdir
+        self.port = port
+        self.timeout = timeout
+        self.env = env or {}
+        self.timings = {}
+
+    def __enter__(self):
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(filter(None, [BACKEND, os.environ.get("PYTHONPATH")])),
+            # Mesurer le pipeline, pas l'API Gemini ni la politesse envers les sites
+            "GEMINI_API_KEY": "",
+            "SCRAPER_HOST_DELAY": "0",
+            **self.env
+        }
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(self.port), "--log-level", "warning"],
+            cwd=self.workdir, env=env
+        )
+        self.client = httpx.Client(base_url=f"http://127.0.0.1:{self.port}", timeout=self.timeout)
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        if not wait_for(self.client, "/api/health/live", deadline):
+            self.__exit__()
+            raise RuntimeError("Le serveur ne répond pas")
+        self.timings["live_s"] = round(time.perf_counter() - start, 3)
+        if not wait_for(self.client, "/api/health/ready", deadline):
+            self.__exit__()
+            raise RuntimeError("Le serveur n'est pas prêt")
+        self.timings["ready_s"] = round(time.perf_counter() - start, 3)
+        return self
+
+    def __exit__(self, *exc):
+        self.client.close()
+        self.process.terminate()
+        self.process.wait()
+
+    def memory(self):
+        return memory_mb(self.process.pid)
+
+    def stage_seconds(self):
+        """Temps cumulé par étape du pipeline, lu sur /api/metrics"""
+        stages = {}
+        for line in self.client.get("/api/metrics").text.splitlines():
+            match = re.match(r'rag_stage_duration_seconds_sum\{stage="([^"]+)"\} (\S+)', line)
+            if match:
+                stages[match.group(1)] = round(float(match.group(2)), 3)
+        return stages
+
+def bench_ingest(args, workdir):
+    fixtures, names = serve_fixtures(args.fixtures)
+    host, port = fixtures.server_address
+    urls = [f"http://{host}:{port}/{copy}/{name}" for copy in range(args.copies) for name in names]
+    try:
+        with Server(workdir, args.port, args.timeout) as server:
+            start = time.perf_counter()
+            job_id = server.client.post("/api/ingest", json={"urls": urls}).json()["job_id"]
+            while True:
+                status = server.client.get(f"/api/ingest/{job_id}").json()
+                if status["status"] in ("completed", "failed", "cancelled"):
+                    break
+                time.sleep(0.05)
+            elapsed = time.perf_counter() - start
+            chunks = status.get("chunks_added", 0)
+            return {
+                "pages": len(urls),
+                "failed_pages": len([r for r in status["results"] if r["status"] == "failed"]),
+                "chunks": chunks,
+                "ingest_s": round(elapsed, 3),
+                "pages_per_s": round(len(urls) / elapsed, 2),
+                "chunks_per_s": round(chunks / elapsed, 2),
+                "stages_s": server.stage_seconds(),
+                **server.timings,
+                **server.memory()
+            }
+    finally:
+        fixtures.shutdown()
+
+def build_corpus(workdir, size, dimension, index_type):
+    """Base synthétique enregistrée dans workdir/data, chargée par le serveur au démarrage"""
+    from app.services.vector_store import VectorStore
+    store = VectorStore(dimension, index_type)
+    vectors = synthetic_corpus(size, dimension, clusters=max(1, size // 1000))
+    step = 50_000
+    for start in range(0, size, step):
+        end = min(size, start + step)
+        store.add_documents(
+            vectors[start:end],
+            [f"Passage synthétique numéro {i}, assez long pour servir de contexte à une réponse." for i in range(start, end)],
+            [{"url": f"https://site{i % 100}.example/page{i // 100}"} for i in range(start, end)]
+        )
+    store.save(os.path.join(workdir, "data", "vector_store"))
+
+async def ask_load(base_url, concurrency, duration, timeout):
+    """`concurrency` clients posent des questions en boucle pendant `duration` secondes ;
+    chaque question est unique (pas de cache d'embedding)"""
+    latencies, errors = [], 0
+    counter = iter(range(10 ** 9))
+
+    async def client_loop(client):
+        nonlocal errors
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            i = next(counter)
+            question = f"{QUESTIONS[i % len(QUESTIONS)]} ({i})"
+            start = time.perf_counter()
+            response = await client.post("/api/ask", json={"question": question})
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "qps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2)
+    }
+
+def bench_corpus(args, workdir, size):
+    start = time.perf_counter()
+    build_corpus(workdir, size, args.dimension, args.index_type)
+    build_s = round(time.perf_counter() - start, 2)
+    with Server(workdir, args.port, args.timeout, {"VECTOR_INDEX_TYPE": args.index_type}) as server:
+        info = server.client.get("/api/stats").json()
+        ask = asyncio.run(ask_load(f"http://127.0.0.1:{args.port}", args.concurrency, args.duration, args.timeout))
+        return {
+            "vectors": info["total_vectors"],
+            "build_s": build_s,
+            **server.timings,
+            "ask": ask,
+            **server.memory()
+        }
+
+def flatten(results, prefix=""):
+    """{"a": {"b": 1}} -> {"a.b": 1}, mesures numériques seulement"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(results, baseline, tolerance):
+    """Écart relatif de chaque mesure à la référence ; dégradation au-delà de `tolerance`"""
+    current, reference = flatten(results["scenarios"]), flatten(baseline["scenarios"])
+    comparison = {}
+    for name, value in current.items():
+        before = reference.get(name)
+        leaf = name.rsplit(".", 1)[-1]
+        higher = leaf.endswith(HIGHER)
+        if before is None or not before or not (higher or leaf.endswith(LOWER)):
+            continue
+        change = (value - before) / before
+        comparison[name] = {
+            "baseline": before,
+            "current": value,
+            "change": round(change, 4),
+            "regression": change < -tolerance if higher else change > tolerance
+        }
+    return comparison
+
+def main(args):
+    results = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("baseline", "save_baseline")},
+        "cpus": os.cpu_count(),
+        "scenarios": {"import_s": round(import_time(), 3)}
+    }
+    if "ingest" in args.scenarios:
+        workdir = tempfile.mkdtemp(prefix="bench-ingest-")
+        try:
+            results["scenarios"]["ingest"] = bench_ingest(args, workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    if "corpus" in args.scenarios:
+        for size in args.sizes:
+            workdir = tempfile.mkdtemp(prefix=f"bench-corpus-{size}-")
+            try:
+                results["scenarios"][f"corpus_{size}"] = bench_corpus(args, workdir, size)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    failed = False
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            results["comparison"] = compare(results, json.load(f), args.tolerance)
+        failed = any(entry["regression"] for entry in results["comparison"].values())
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=["ingest", "corpus"], choices=["ingest", "corpus"])
+    parser.add_argument("--fixtures", default=FIXTURES)
+    parser.add_argument("--copies", type=int, default=20, help="Copies de chaque fixture à ingérer")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000])
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Dégradation relative tolérée")
+    main(parser.parse_args())
@@ -0,0 +1,146 @@
+import json
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+from app.routers import ask
+from app.services import qa
+from app.services.qa import Retrieval, RetrievalError
+
+RESULTS = [{
+    "id": i,
+    "score": 0.9 - i / 10,
+    "text": f"Chunk {i} sur les crêpes bretonnes.",
+    "metadata": {"url": f"https://example.com/page{i}"}
+} for i in range(4)]
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+class FakeModels:
+    """Flux Gemini simulé : morceaux de texte, puis une erreur éventuelle"""
+
+    def __init__(self, pieces, error=None):
+        self.pieces = pieces
+        self.error = error
+        self.prompts = []
+
+    async def generate_content_stream(self, model, contents):
+        self.prompts.append(contents)
+
+        async def stream():
+            for piece in self.pieces:
+                yield Chunk(piece)
+            if self.error is not None:
+                raise self.error
+        return stream()
+
+class FakeClient:
+    def __init__(self, models):
+        self.aio = type("Aio", (), {"models": models})()
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(ask.router)
+    return TestClient(app)
+
+@pytest.fixture
+def llm(monkeypatch):
+    async def retrieve(question, session_id=None, filter=None):
+        return Retrieval([0.0] * 4, RESULTS)
+
+    def install(pieces, error=None):
+        models = FakeModels(pieces, error)
+        monkeypatch.setattr(qa, "get_client", lambda: FakeClient(models))
+        return models
+
+    monkeypatch.setattr(qa, "GEMINI_API_KEY", "test")
+    monkeypatch.setattr(qa, "retrieve", retrieve)
+    monkeypatch.setattr(qa.answer_cache, "get", lambda chunk_ids, vector: None)
+    monkeypatch.setattr(qa.answer_cache, "put", lambda chunk_ids, vector, answer: None)
+    return install
+
+def events(response):
+    """(événement, données) de chaque message server-sent events"""
+    parsed = []
+    for block in response.text.split("\n\n"):
+        if not block:
+            continue
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        parsed.append((fields["event"], json.loads(fields["data"])))
+    return parsed
+
+def test_stream_order(client, llm):
+    models = llm(["Les crêpes ", "sont ", "bretonnes."])
+    response = client.post("/api/ask/stream", json={"question": "D'où viennent les crêpes ?"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    received = events(response)
+    names = [name for name, _ in received]
+    assert names == ["sources", "token", "token", "token", "done"]
+    sources = received[0][1]
+    assert [source["id"] for source in sources] == [0, 1, 2]
+    assert sources[0]["url"] == "https://example.com/page0"
+    assert "".join(data for name, data in received if name == "token") == "Les crêpes sont bretonnes."
+    assert received[-1][1] == {"cached": False, "context_reused": False}
+    assert "D'où viennent les crêpes ?" in models.prompts[0]
+
+def test_stream_error_event(client, llm):
+    llm(["Début "], error=RuntimeError("quota dépassé"))
+    received = events(client.post("/api/ask/stream", json={"question": "Question ?"}))
+
+    assert [name for name, _ in received] == ["sources", "token", "error", "done"]
+    assert "quota dépassé" in received[2][1]
+    assert received[-1][1]["cached"] is False
+
+def test_stream_retrieval_error(client, llm, monkeypatch):
+    async def retrieve(question, session_id=None, filter=None):
+        raise RetrievalError(qa.NO_INFORMATION)
+
+    monkeypatch.setattr(qa, "retrieve", retrieve)
+    received = events(client.post("/api/ask/stream", json={"question": "Question ?"}))
+
+    assert received == [
+        ("sources", []),
+        ("token", qa.NO_INFORMATION),
+        ("done", {"cached": False, "context_reused": False})
+    ]
+
+@pytest.fixture
+def no_llm(monkeypatch):
+    def unexpected(*args, **kwargs):
+        raise AssertionError("ni Gemini ni le cache de réponses sans clé")
+
+    monkeypatch.setattr(qa, "GEMINI_API_KEY", "")
+    monkeypatch.setattr(qa, "get_client", unexpected)
+    monkeypatch.setattr(qa.answer_cache, "get", unexpected)
+    monkeypatch.setattr(qa.answer_cache, "put", unexpected)
+
+    def install(reused=False):
+        async def retrieve(question, session_id=None, filter=None):
+            return Retrieval([0.0] * 4, RESULTS, reused=reused)
+        monkeypatch.setattr(qa, "retrieve", retrieve)
+    return install
+
+def test_stream_fallback_without_llm(client, no_llm):
+    no_llm()
+    received = events(client.post("/api/ask/stream", json={"question": "D'où viennent les crêpes ?"}))
+
+    names = [name for name, _ in received]
+    assert names[0] == "sources" and names[-1] == "done"
+    assert set(names[1:-1]) == {"token"} and len(names) > 3
+    assert [source["id"] for source in received[0][1]] == [0, 1, 2]
+    # Contexte brut (3 premiers chunks), découpé en morceaux
+    context = "\n\n".join(result["text"] for result in RESULTS[:3])
+    tokens = [data for name, data in received if name == "token"]
+    assert "".join(tokens) == qa.fallback_answer(context)
+    assert all(len(token) <= 40 for token in tokens)
+    assert received[-1][1] == {"cached": False, "context_reused": False}
+
+def test_stream_fallback_reused_context(client, no_llm):
+    no_llm(reused=True)
+    received = events(client.post("/api/ask/stream", json={"question": "Et les galettes ?"}))
+
+    assert received[-1] == ("done", {"cached": False, "context_reused": True})
@@ -0,0 +1,35 @@
+import pytest
+
+# Référence PyTorch nécessaire à toutes les comparaisons
+pytest.importorskip("sentence_transformers")
+
+from app.config import EMBEDDING_MODEL
+from app.services.embeddings import OnnxBackend, make_backend
+from benchmarks.embedding_backends import MIN_COSINE, corpus, cosine
+
+@pytest.fixture(scope="module")
+def texts():
+    return corpus(64)
+
+@pytest.fixture(scope="module")
+def reference(texts):
+    return make_backend("torch").encode(texts)
+
+@pytest.fixture(scope="module")
+def onnx_dir(tmp_path_factory):
+    # Export ONNX hors de data/ : il n'est pas réutilisé par le serveur
+    return str(tmp_path_factory.mktemp("onnx"))
+
+def backend_for(name, onnx_dir):
+    if name in ("onnx", "onnx_int8"):
+        pytest.importorskip("onnxruntime")
+        return OnnxBackend(EMBEDDING_MODEL, quantized=name == "onnx_int8", directory=onnx_dir)
+    return make_backend(name)
+
+@pytest.mark.parametrize("name", ["int8", "onnx", "onnx_int8"])
+def test_cosine_drift(name, texts, reference, onnx_dir):
+    vectors = backend_for(name, onnx_dir).encode(texts, batch_size=16)
+    assert vectors.shape == reference.shape
+    similarity = cosine(vectors, reference)
+    # Même borne que benchmarks/embedding_backends.py, sur le pire texte
+    assert similarity.min() >= MIN_COSINE[name], f"{name}: cosinus min {similarity.min():.6f}"
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app.services import scraper
+from app.services.scraper import Fetcher, fetch_page
+
+ARTICLE = "<html><body><article>" + "".join(
+    f"<p>Paragraphe {i} : l'été à Noël, où l'on mange des crêpes près de la forêt.</p>" for i in range(20)
+) + "</article></body></html>"
+
+class Handler(BaseHTTPRequestHandler):
+    flaky = 0
+
+    def do_GET(self):
+        if self.path == "/page":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.reply(ARTICLE.encode("utf-8"), "text/html; charset=utf-8", etag='"v1"')
+        elif self.path == "/latin1":
+            # Pas de charset annoncé
+            self.reply(ARTICLE.encode("latin-1"), "text/html")
+        elif self.path == "/flaky":
+            Handler.flaky += 1
+            if Handler.flaky == 1:
+                self.send_response(503)
+                self.end_headers()
+                return
+            self.reply(ARTICLE.encode("utf-8"), "text/html; charset=utf-8")
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def reply(self, body: bytes, content_type: str, etag=None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"127.0.0.1:{httpd.server_address[1]}", f"localhost:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+@pytest.fixture
+def fetcher(monkeypatch):
+    fetcher = Fetcher(max_concurrency=4, host_delay=0.0, max_retries=2, timeout=5)
+    monkeypatch.setattr(scraper, "fetcher", fetcher)
+    return fetcher
+
+def run(coro, fetcher):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await fetcher.aclose()
+    return asyncio.run(main())
+
+def test_fetch_page_extracts_text_and_validators(server, fetcher):
+    page = run(fetch_page(f"http://{server[0]}/page"), fetcher)
+    assert not page["not_modified"]
+    assert page["etag"] == '"v1"'
+    assert "Paragraphe 19" in page["text"]
+    assert "crêpes" in page["text"]
+
+def test_fetch_page_conditional_request(server, fetcher):
+    page = run(fetch_page(f"http://{server[0]}/page", etag='"v1"'), fetcher)
+    assert page["not_modified"]
+    assert page["text"] == ""
+    assert page["etag"] == '"v1"'
+
+def test_fetch_page_detects_encoding(server, fetcher):
+    page = run(fetch_page(f"http://{server[0]}/latin1"), fetcher)
+    assert "l'été à Noël" in page["text"]
+
+def test_retry_on_server_error(server, fetcher):
+    Handler.flaky = 0
+    page = run(fetch_page(f"http://{server[0]}/flaky"), fetcher)
+    assert Handler.flaky == 2
+    assert "Paragraphe 0" in page["text"]
+
+def test_missing_page_returns_empty_text(server, fetcher):
+    page = run(fetch_page(f"http://{server[0]}/missing"), fetcher)
+    assert page["text"] == ""
+
+def test_host_delay_does_not_hold_semaphore(server):
+    # Une seule place : le second appel au même hôte attend son délai sans la bloquer
+    fetcher = Fetcher(max_concurrency=1, host_delay=1.0, max_retries=0, timeout=5)
+    done = {}
+
+    async def get(name, host):
+        await fetcher.request("GET", f"http://{host}/page")
+        done[name] = time.monotonic()
+
+    async def main():
+        start = time.monotonic()
+        first = asyncio.create_task(get("first", server[0]))
+        await asyncio.sleep(0.05)
+        await asyncio.gather(first, get("same_host", server[0]), get("other_host", server[1]))
+        return start
+
+    start = run(main(), fetcher)
+    assert done["same_host"] - done["first"] >= 0.9
+    assert done["other_host"] - start < 0.5
@@ -0,0 +1,75 @@
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+from app.routers import sources
+from app.services import warmup as warmup_module
+from app.services.sources import SourceRegistry
+from app.services.vector_store import VectorStore
+from app.services.warmup import Warmup
+
+DIMENSION = 8
+PATH = "data/vector_store"
+
+class FakeModel:
+    def encode(self, texts):
+        return np.zeros((len(texts), DIMENSION), dtype="float32")
+
+@pytest.fixture
+def saved(tmp_path, monkeypatch):
+    """Base enregistrée : 6 chunks de /a et 4 de /b, dans un répertoire de travail temporaire"""
+    monkeypatch.chdir(tmp_path)
+    store = VectorStore(dimension=DIMENSION, index_type="flat")
+    urls = ["https://example.com/a"] * 6 + ["https://example.com/b"] * 4
+    vectors = np.random.default_rng(0).random((len(urls), DIMENSION), dtype="float32")
+    store.add_documents(vectors.tolist(), [f"Chunk {i}" for i in range(len(urls))], [{"url": url} for url in urls])
+    store.save(PATH)
+    registry = SourceRegistry()
+    for url in set(urls):
+        registry.update(url, ingested_at=1.0)
+    registry.save(PATH)
+    return registry
+
+@pytest.fixture
+def client(saved, monkeypatch):
+    # Serveur qui démarre : base et registre pas encore chargés
+    store = VectorStore(dimension=DIMENSION, index_type="flat")
+    registry = SourceRegistry()
+    monkeypatch.setattr(warmup_module, "get_model", FakeModel)
+    for module in (sources, warmup_module):
+        monkeypatch.setattr(module, "vector_store", store)
+        monkeypatch.setattr(module, "source_registry", registry)
+    registry.load(PATH)
+    monkeypatch.setattr(sources, "warmup", Warmup())
+    app = FastAPI()
+    app.include_router(sources.router)
+    return TestClient(app)
+
+def test_delete_during_warmup(client):
+    response = client.delete("/api/sources", params={"url": "https://example.com/a"})
+    assert response.status_code == 200
+    assert response.json()["chunks_deleted"] == 6
+
+    reloaded = VectorStore(dimension=DIMENSION, index_type="flat")
+    assert reloaded.load(PATH)
+    assert reloaded.count == 4
+    assert reloaded.ids_for_url("https://example.com/b") == [6, 7, 8, 9]
+
+def test_save_refuses_unloaded_store(saved):
+    with pytest.raises(RuntimeError):
+        VectorStore(dimension=DIMENSION, index_type="flat").save(PATH)
+
+    reloaded = VectorStore(dimension=DIMENSION, index_type="flat")
+    assert reloaded.load(PATH)
+    assert reloaded.count == 10
+
+def test_registry_refresh(saved):
+    reader = SourceRegistry()
+    assert reader.load(PATH)
+    assert not reader.refresh(PATH)
+
+    saved.update("https://example.com/a", ingested_at=2.0)
+    saved.save(PATH)
+    assert reader.refresh(PATH)
+    assert reader.get("https://example.com/a")["ingested_at"] == 2.0
+    assert not reader.refresh(PATH)
@@ -0,0 +1,106 @@
+import multiprocessing
+import threading
+import time
+import numpy as np
+import pytest
+from app.services.vector_store import VectorStore
+
+DIMENSION = 32
+
+def vectors(rng, n):
+    return rng.random((n, DIMENSION), dtype="float32")
+
+def add_while_searching(index_type: str, seconds: float = 2.0):
+    """Un thread ajoute et supprime pendant que trois autres cherchent (même processus)"""
+    store = VectorStore(dimension=DIMENSION, index_type=index_type)
+    rng = np.random.default_rng(0)
+    store.add_documents(vectors(rng, 64).tolist(), ["texte"] * 64)
+    # Type visé dès le départ, sans attendre le seuil d'entraînement
+    store.rebuild()
+    stop = time.time() + seconds
+    errors = []
+
+    def writer():
+        try:
+            while time.time() < stop:
+                first = store.ntotal
+                store.add_documents(vectors(rng, 64).tolist(), ["texte"] * 64)
+                store.delete([first, first + 1])
+        except Exception as e:
+            errors.append(e)
+
+    def searcher(seed):
+        queries = vectors(np.random.default_rng(seed), 8)
+        try:
+            while time.time() < stop:
+                for results in store.search_many(queries, 5):
+                    assert len(results) == 5
+                store.get_vector(int(seed))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=searcher, args=(seed,)) for seed in range(1, 4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+def refresh_while_searching(path: str, seconds: float = 2.0):
+    """Un lecteur applique les ajouts publiés par l'écrivain pendant que deux threads y cherchent"""
+    writer = VectorStore(dimension=DIMENSION, index_type="flat")
+    rng = np.random.default_rng(0)
+    writer.add_documents(vectors(rng, 64).tolist(), ["texte"] * 64)
+    writer.save(path)
+    reader = VectorStore(dimension=DIMENSION, index_type="flat", read_only=True)
+    assert reader.load(path)
+    stop = time.time() + seconds
+    errors = []
+
+    def publisher():
+        try:
+            rounds = 0
+            while time.time() < stop:
+                writer.add_documents(vectors(rng, 64).tolist(), ["texte"] * 64)
+                # Journal ou, de temps en temps, nouveau snapshot (relu en entier)
+                if rounds % 4 == 3:
+                    writer.snapshot(path)
+                else:
+                    writer.save(path)
+                reader.refresh()
+                rounds += 1
+        except Exception as e:
+            errors.append(e)
+
+    def searcher(seed):
+        queries = vectors(np.random.default_rng(seed), 8)
+        try:
+            while time.time() < stop:
+                for results in reader.search_many(queries, 5):
+                    assert len(results) == 5
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=publisher)] + [threading.Thread(target=searcher, args=(seed,)) for seed in range(1, 3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    assert reader.count == writer.count
+
+def run_in_process(target, *args):
+    # Processus séparé : une recherche pendant un ajout FAISS finit en erreur de segmentation
+    process = multiprocessing.get_context("spawn").Process(target=target, args=args)
+    process.start()
+    process.join(60)
+    assert process.exitcode == 0
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_concurrent_add_and_search(index_type):
+    run_in_process(add_while_searching, index_type)
+
+def test_concurrent_refresh_and_search(tmp_path):
+    run_in_process(refresh_while_searching, str(tmp_path / "vector_store"))
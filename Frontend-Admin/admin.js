@@ -165,9 +165,6 @@ async function handleIngest() {
     updateLog(`Début de l'indexation de ${urls.length} URL(s)...`, 'info');
     
     try {
-        // Simuler la progression (première partie)
-        simulateProgress(50);
-        
         const response = await fetch(`${API_BASE}/ingest`, {
             method: 'POST',
             headers: { 
@@ -177,13 +174,14 @@ async function handleIngest() {
             body: JSON.stringify({ urls: urls })
         });
         
-        // Terminer la simulation de progression
-        simulateProgress(100, 50);
-        
         if (response.ok) {
-            const result = await response.json();
+            const job = await response.json();
+            updateLog(`Job d'indexation ${job.job_id} en file d'attente.`, 'info');
+            
+            // Suivre la progression réelle du job
+            const result = await waitForIngestJob(job.job_id);
             displayIngestionResults(result);
-            updateLog(`Indexation terminée: ${result.successful}/${result.total_urls} URL(s) réussies.`, 'success');
+            updateLog(`Indexation ${result.status === 'completed' ? 'terminée' : 'interrompue'}: ${result.successful}/${result.total_urls} URL(s) réussies.`, result.status === 'completed' ? 'success' : 'warning');
         } else {
             const errorText = await response.text();
             throw new Error(`Erreur ${response.status}: ${errorText}`);
@@ -203,24 +201,28 @@ async function handleIngest() {
     }
 }
 
-// Simulation de progression
-function simulateProgress(targetPercent, startFrom = 0) {
-    let width = startFrom;
-    const interval = setInterval(() => {
-        if (width >= targetPercent) {
-            clearInterval(interval);
-            // Cacher la barre de progression après 2 secondes
-            if (targetPercent >= 100) {
-                setTimeout(() => {
-                    progressContainer.style.display = 'none';
-                }, 2000);
-            }
-            return;
+// Attendre la fin d'un job d'indexation en affichant sa progression
+async function waitForIngestJob(jobId) {
+    while (true) {
+        const response = await fetch(`${API_BASE}/ingest/${jobId}`);
+        if (!response.ok) {
+            throw new Error(`Erreur ${response.status}: ${await response.text()}`);
         }
-        width += 5;
-        progressBar.style.width = width + '%';
-        progressPercent.textContent = width + '%';
-    }, 100);
+        
+        const job = await response.json();
+        const percent = job.total_urls ? Math.round(100 * job.processed_urls / job.total_urls) : 100;
+        progressBar.style.width = percent + '%';
+        progressPercent.textContent = percent + '%';
+        
+        if (['completed', 'cancelled', 'failed'].includes(job.status)) {
+            setTimeout(() => {
+                progressContainer.style.display = 'none';
+            }, 2000);
+            return job;
+        }
+        
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
 }
 
 // Effacer tout
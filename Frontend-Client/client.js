@@ -17,6 +17,10 @@ const welcomeTime = document.getElementById('welcomeTime');
 let messageCounter = 0;
 let isTyping = false;
 let isDarkMode = true;
+// Conversation : les questions de suite réutilisent le contexte du tour précédent
+const sessionId = window.crypto && crypto.randomUUID
+    ? crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
 
 // Initialiser la page
 function initPage() {
@@ -211,31 +215,44 @@ async function askQuestion(questionText) {
     const startTime = Date.now();
     
     try {
-        const response = await fetch(`${API_BASE}/ask`, {
+        const response = await fetch(`${API_BASE}/ask/stream`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ question: questionText })
+            body: JSON.stringify({ question: questionText, session_id: sessionId })
         });
         
-        const endTime = Date.now();
-        const timeTaken = (endTime - startTime) / 1000;
-        
-        if (response.ok) {
-            const data = await response.json();
-            
-            hideTypingIndicator();
-            addAiMessage(data.answer, timeTaken);
-            
-            // Animation du temps de réponse
-            animateResponseTime(timeTaken);
-            
-            // Mettre à jour les stats
-            updateStats();
-            
-        } else {
+        if (!response.ok || !response.body) {
             throw new Error(`Erreur: ${response.status}`);
         }
         
+        // Lire le flux SSE : sources, puis tokens au fil de l'eau
+        let messageDiv = null;
+        let answer = '';
+        await readEventStream(response, (event, data) => {
+            if (event === 'token' || event === 'error') {
+                if (!messageDiv) {
+                    hideTypingIndicator();
+                    messageDiv = addAiMessage('', 0);
+                }
+                answer += data;
+                messageDiv.querySelector('.message-text').innerHTML = formatAiResponse(answer);
+                scrollToBottom();
+            }
+        });
+        
+        const timeTaken = (Date.now() - startTime) / 1000;
+        hideTypingIndicator();
+        if (!messageDiv) {
+            messageDiv = addAiMessage(answer, 0);
+        }
+        messageDiv.querySelector('.message-time').textContent = `${formatTime(new Date())} • ${timeTaken.toFixed(1)}s`;
+        
+        // Animation du temps de réponse
+        animateResponseTime(timeTaken);
+        
+        // Mettre à jour les stats
+        updateStats();
+        
     } catch (error) {
         hideTypingIndicator();
         addAiMessage(`Désolé, une erreur est survenue. Veuillez réessayer.`, 0);
@@ -243,6 +260,33 @@ async function askQuestion(questionText) {
     }
 }
 
+// Lire une réponse text/event-stream et appeler onEvent(event, data) pour chaque événement
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let separator;
+        while ((separator = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, separator);
+            buffer = buffer.slice(separator + 2);
+            
+            let event = 'message';
+            let data = '';
+            block.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            onEvent(event, data ? JSON.parse(data) : null);
+        }
+    }
+}
+
 // Ajouter un message utilisateur
 function addUserMessage(text) {
     const messageDiv = document.createElement('div');
@@ -305,6 +349,8 @@ function addAiMessage(text, responseTime = 0) {
         duration: 500,
         easing: 'spring(1, 80, 10, 0)'
     });
+    
+    return messageDiv;
 }
 
 // Formater la réponse de l'IA